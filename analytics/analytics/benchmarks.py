@@ -0,0 +1,286 @@
+"""Benchmarks of the analysis pipeline over synthetic campaign data"""
+
+import importlib.util
+import multiprocessing
+import random
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date
+from datetime import timedelta
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db import connections
+from django.db.models import Max
+from django.test import override_settings
+
+from analytics import tasks
+from analytics.detection import sketch_metrics
+from analytics.detection import update_metric_sketches
+from analytics.instrumentation import QueryStats
+from analytics.models import AnalysisRun
+from analytics.models import Campaign
+from analytics.models import DailyMetric
+
+# Fixture date the last benchmarked day is generated as, inside the fixture's CTR drop
+# of Summer Fashion Collection
+FIXTURE_END_DATE = date(2024, 3, 16)
+CAMPAIGN_BATCH_SIZE = 5000
+# Shares of the synthetic campaigns that are paused and of the days campaigns report
+# metrics on, as in the fixture
+PAUSED_SHARE = 0.1
+REPORTED_DAY_SHARE = 0.95
+# Prefix of the cache keys, leases included, written while benchmarking
+BENCHMARK_CACHE_KEY_PREFIX = "benchmark"
+
+
+@contextmanager
+def isolated_cache():
+    """Give the default cache a key prefix of its own for the block, then clear it
+
+    Seasonal profiles, leases and cached recommendations of the synthetic
+    campaigns then never meet those of the configured environment's campaigns,
+    which share their ids.
+    """
+    default = {**settings.CACHES["default"], "KEY_PREFIX": BENCHMARK_CACHE_KEY_PREFIX}
+    with override_settings(CACHES={**settings.CACHES, "default": default}):
+        try:
+            yield
+        finally:
+            clear_isolated_cache()
+
+
+def clear_isolated_cache():
+    """Delete the keys written under the benchmark's prefix"""
+    if hasattr(cache, "delete_pattern"):
+        # django-redis matches the pattern within the key prefix only
+        cache.delete_pattern("*")
+    else:
+        cache.clear()
+
+
+def load_fixture_generator(path: Path) -> ModuleType:
+    """Import generate_marketing_fixture.py, the distributions the data is drawn from"""
+    if not path.is_file():
+        msg = f"Fixture generator not found at {path}"
+        raise FileNotFoundError(msg)
+
+    spec = importlib.util.spec_from_file_location("generate_marketing_fixture", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate_dataset(
+    generator: ModuleType,
+    campaign_count: int,
+    days: int,
+    end_date: date,
+) -> int:
+    """Create campaigns and their daily metrics for the ``days`` days up to ``end_date``
+
+    Campaigns cycle through the fixture's campaign profiles and every day is
+    drawn with the fixture's seasonal, noise and anomaly distributions, shifted
+    so that ``end_date`` is generated as FIXTURE_END_DATE. Metrics are copied
+    into the table, bypassing the signals that maintain the derived tables.
+
+    Returns the number of daily metrics created.
+    """
+    fixture = generator.MarketingDataGenerator()
+    profiles = generator.CAMPAIGNS
+    start_date = end_date - timedelta(days=days - 1)
+    fixture_offset = FIXTURE_END_DATE - end_date
+
+    campaigns = Campaign.objects.bulk_create(
+        [
+            Campaign(
+                name=f"{profiles[i % len(profiles)]['name']} {i + 1}",
+                platform=profiles[i % len(profiles)]["platform"],
+                objective=profiles[i % len(profiles)]["objective"],
+                start_date=start_date,
+                end_date=end_date,
+                budget=profiles[i % len(profiles)]["budget"],
+                audience_segment=profiles[i % len(profiles)]["audience"],
+                status="active" if random.random() > PAUSED_SHARE else "paused",
+            )
+            for i in range(campaign_count)
+        ],
+        batch_size=CAMPAIGN_BATCH_SIZE,
+    )
+
+    columns = [
+        "campaign_id",
+        "date",
+        "impressions",
+        "clicks",
+        "conversions",
+        "spend",
+        "ctr",
+        "cpc",
+        "cpa",
+        "roas",
+        "device_breakdown",
+        "geography",
+    ]
+    created = 0
+    # COPY loads the 18 million metrics of the largest scale an order of magnitude
+    # faster than bulk_create
+    with (
+        connection.cursor() as cursor,
+        cursor.copy(
+            f"COPY {DailyMetric._meta.db_table} ({', '.join(columns)}) FROM STDIN",
+        ) as copy,
+    ):
+        for day in range(days):
+            metric_date = start_date + timedelta(days=day)
+            for i, campaign in enumerate(campaigns):
+                # Campaigns skip a day now and then, as in the fixture
+                if random.random() >= REPORTED_DAY_SHARE:
+                    continue
+                metrics = fixture.generate_daily_metrics(
+                    profiles[i % len(profiles)],
+                    campaign.id,
+                    metric_date + fixture_offset,
+                )
+                copy.write_row(
+                    [
+                        campaign.id,
+                        metric_date,
+                        *(metrics[column] for column in columns[2:]),
+                    ],
+                )
+                created += 1
+    return created
+
+
+def prepare_derived_tables(analysis_date: date, days_back: int):
+    """Build the rollups, profiles, segments and sketches signals and tasks maintain"""
+    tasks.refresh_campaign_metric_rollups()
+    tasks.refresh_campaign_seasonal_profiles()
+    if settings.ANALYTICS_SEGMENT_ANOMALIES:
+        # Only the analyzed window is scanned for segment shifts
+        tasks.refresh_daily_metric_segments(
+            list(
+                DailyMetric.objects.filter(
+                    date__gte=analysis_date - timedelta(days=days_back),
+                )
+                .order_by("id")
+                .values_list("id", flat=True),
+            ),
+        )
+    if settings.ANALYTICS_PERCENTILE_THRESHOLDS:
+        last_id = DailyMetric.objects.aggregate(last=Max("id"))["last"] or 0
+        update_metric_sketches(sketch_metrics(0, last_id), 0, last_id)
+
+
+def measure_analysis(days_back: int, backend: str) -> dict[str, Any]:
+    """Run analyze_campaign_performance over every active campaign, LLM and AMQP stubbed
+
+    The analysis runs in a forked process so that its peak RSS is measured
+    apart from the data generation and from other benchmarked scales.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    # The forked process opens its own database connections
+    connections.close_all()
+    process = multiprocessing.get_context("fork").Process(
+        target=_measure_analysis_process,
+        args=(sender, days_back, backend),
+    )
+    process.start()
+    sender.close()
+    try:
+        outcome = receiver.recv()
+    except EOFError:
+        outcome = {"error": f"Analysis process exited with code {process.exitcode}"}
+    process.join()
+
+    if "error" in outcome:
+        raise RuntimeError(outcome["error"])
+    return outcome
+
+
+def _measure_analysis_process(sender, days_back: int, backend: str):
+    try:
+        sender.send(_measure_analysis(days_back, backend))
+    except Exception as exc:
+        sender.send({"error": f"{type(exc).__name__}: {exc}"})
+    finally:
+        sender.close()
+
+
+def _measure_analysis(days_back: int, backend: str) -> dict[str, Any]:
+    calls = {"enrichment_tasks": 0, "recommendation_prompts": 0, "notifications": 0}
+
+    def enrich_recommendations(result_prompts=None, incident_prompts=None):
+        calls["enrichment_tasks"] += 1
+        calls["recommendation_prompts"] += len(result_prompts or []) + len(
+            incident_prompts or [],
+        )
+
+    def publish_notification(notification):
+        calls["notifications"] += 1
+
+    query_stats = QueryStats()
+    with (
+        mock.patch.object(
+            tasks.enrich_recommendations,
+            "delay",
+            enrich_recommendations,
+        ),
+        mock.patch.object(tasks, "_publish_notification", publish_notification),
+        connection.execute_wrapper(query_stats),
+    ):
+        start = time.perf_counter()
+        run_id = tasks.analyze_campaign_performance.apply(
+            kwargs={"days_back": days_back, "backend": backend, "force": True},
+            throw=True,
+        ).get()
+        wall_seconds = time.perf_counter() - start
+
+    analysis_run = AnalysisRun.objects.get(id=run_id)
+    if analysis_run.status != AnalysisRun.STATUS_COMPLETED:
+        msg = f"Analysis run {run_id} ended {analysis_run.status}: {analysis_run.error}"
+        raise RuntimeError(msg)
+
+    return {
+        "wall_seconds": round(wall_seconds, 3),
+        "query_count": query_stats.count,
+        "query_seconds": round(query_stats.seconds, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rows_read": analysis_run.rows_read,
+        "rows_per_second": round(analysis_run.rows_read / wall_seconds)
+        if wall_seconds
+        else None,
+        "campaigns_scanned": analysis_run.campaigns_scanned,
+        "alerts_generated": analysis_run.alerts_generated,
+        "stage_seconds": analysis_run.stage_seconds,
+        **calls,
+    }
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_commit() -> str:
+    """Short hash of the checked out commit, empty outside of a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
@@ -0,0 +1,45 @@
+from .backends import BACKENDS
+from .backends import run_detection
+from .backfill import detect_anomalies_range
+from .detectors import detect_anomalies
+from .percentiles import active_thresholds
+from .percentiles import merge_sketches
+from .percentiles import sketch_metrics
+from .percentiles import update_metric_sketches
+from .replay import replay_thresholds
+from .rollups import detect_anomalies_rollup
+from .rollups import refresh_metric_rollups
+from .seasonality import load_seasonal_profiles
+from .seasonality import refresh_seasonal_profiles
+from .segments import detect_segment_shifts
+from .segments import refresh_metric_segments
+from .sketches import QuantileSketch
+from .sql import detect_anomalies_sql
+from .thresholds import DEFAULT_THRESHOLDS
+from .thresholds import ThresholdSet
+from .windows import MetricFrame
+from .windows import MetricWindows
+
+__all__ = [
+    "BACKENDS",
+    "DEFAULT_THRESHOLDS",
+    "MetricFrame",
+    "MetricWindows",
+    "QuantileSketch",
+    "ThresholdSet",
+    "active_thresholds",
+    "detect_anomalies",
+    "detect_anomalies_range",
+    "detect_anomalies_rollup",
+    "detect_anomalies_sql",
+    "detect_segment_shifts",
+    "load_seasonal_profiles",
+    "merge_sketches",
+    "refresh_metric_rollups",
+    "refresh_metric_segments",
+    "refresh_seasonal_profiles",
+    "replay_thresholds",
+    "run_detection",
+    "sketch_metrics",
+    "update_metric_sketches",
+]
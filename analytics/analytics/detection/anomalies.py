@@ -0,0 +1,219 @@
+"""Anomaly payloads shared by every detection backend"""
+
+from typing import Any
+
+ALERT_SEVERITIES = ("medium", "high", "critical")
+
+# Order in which a campaign's anomalies are reported
+ANOMALY_TYPES = (
+    "ctr_drop",
+    "cpc_spike",
+    "spend_spike",
+    "conversion_drop",
+    "performance_threshold",
+    "segment_share_drop",
+)
+
+# Platform-specific thresholds
+PLATFORM_THRESHOLDS = {
+    "Facebook": {"min_ctr": 1.0, "max_cpa": 50, "min_roas": 2.0},
+    "Google": {"min_ctr": 2.0, "max_cpa": 40, "min_roas": 3.0},
+    "Instagram": {"min_ctr": 1.2, "max_cpa": 45, "min_roas": 2.5},
+    "LinkedIn": {"min_ctr": 0.8, "max_cpa": 100, "min_roas": 2.0},
+    "YouTube": {"min_ctr": 3.0, "max_cpa": 30, "min_roas": 2.5},
+}
+DEFAULT_PLATFORM = "Facebook"
+
+# Drops and increases (in percent) above which an anomaly gets its higher severity
+CTR_DROP_HIGH_PERCENT = 60
+CPC_SPIKE_CRITICAL_PERCENT = 100
+SEGMENT_SHARE_DROP_HIGH_PERCENT = 80
+
+
+def platform_thresholds(platform: str) -> dict[str, float]:
+    """Return the thresholds of a platform, falling back to the default platform"""
+    return PLATFORM_THRESHOLDS.get(platform, PLATFORM_THRESHOLDS[DEFAULT_PLATFORM])
+
+
+def ctr_drop(
+    recent_ctr: float,
+    baseline_ctr: float,
+    historical_values: list[float],
+) -> dict[str, Any]:
+    """Build a CTR drop anomaly"""
+    drop_percent = ((baseline_ctr - recent_ctr) / baseline_ctr) * 100
+    return {
+        "type": "ctr_drop",
+        "severity": "high" if drop_percent > CTR_DROP_HIGH_PERCENT else "medium",
+        "metric": "ctr",
+        "description": (
+            f"CTR dropped by {drop_percent:.1f}% - "
+            "possible ad fatigue or audience saturation"
+        ),
+        "metric_data": {
+            "recent_value": recent_ctr,
+            "baseline_value": baseline_ctr,
+            "drop_percentage": drop_percent,
+            "historical_values": historical_values,
+        },
+    }
+
+
+def cpc_spike(
+    recent_cpc: float,
+    baseline_cpc: float,
+    historical_values: list[float],
+) -> dict[str, Any]:
+    """Build a CPC spike anomaly"""
+    increase_percent = ((recent_cpc - baseline_cpc) / baseline_cpc) * 100
+    return {
+        "type": "cpc_spike",
+        "severity": "critical"
+        if increase_percent > CPC_SPIKE_CRITICAL_PERCENT
+        else "medium",
+        "metric": "cpc",
+        "description": (
+            f"CPC increased by {increase_percent:.1f}% - "
+            "competition surge or bidding issues"
+        ),
+        "metric_data": {
+            "recent_value": recent_cpc,
+            "baseline_value": baseline_cpc,
+            "increase_percentage": increase_percent,
+            "historical_values": historical_values,
+        },
+    }
+
+
+def spend_spike(
+    recent_spend: float,
+    baseline_spend: float,
+    daily_budget: float,
+    historical_values: list[float],
+) -> dict[str, Any]:
+    """Build a spend spike anomaly"""
+    return {
+        "type": "spend_spike",
+        "severity": "high",
+        "metric": "spend",
+        "description": (
+            f"Daily spend of ${recent_spend:.2f} is unusually high "
+            f"(baseline: ${baseline_spend:.2f})"
+        ),
+        "metric_data": {
+            "recent_value": recent_spend,
+            "baseline_value": baseline_spend,
+            "daily_budget": daily_budget,
+            "budget_utilization": (recent_spend / daily_budget) * 100,
+            "historical_values": historical_values,
+        },
+    }
+
+
+def conversion_drop(
+    recent_rate: float,
+    baseline_rate: float,
+    historical_values: list[float],
+    clicks: int,
+    conversions: int,
+) -> dict[str, Any]:
+    """Build a conversion rate drop anomaly"""
+    drop_percent = ((baseline_rate - recent_rate) / baseline_rate) * 100
+    return {
+        "type": "conversion_drop",
+        "severity": "critical",
+        "metric": "conversion_rate",
+        "description": (
+            f"Conversion rate dropped by {drop_percent:.1f}% - "
+            "landing page or tracking issues suspected"
+        ),
+        "metric_data": {
+            "recent_value": recent_rate,
+            "baseline_value": baseline_rate,
+            "drop_percentage": drop_percent,
+            "historical_values": historical_values,
+            "clicks": clicks,
+            "conversions": conversions,
+        },
+    }
+
+
+def performance_threshold(
+    platform: str,
+    ctr: float,
+    cpa: float,
+    roas: float,
+    thresholds: dict[str, float] | None = None,
+) -> dict[str, Any] | None:
+    """Build a threshold anomaly if the latest metrics breach the platform thresholds"""
+    thresholds = thresholds or platform_thresholds(platform)
+
+    issues = []
+    if ctr < thresholds["min_ctr"]:
+        issues.append(f"CTR ({ctr}%) below threshold ({thresholds['min_ctr']}%)")
+    if cpa > thresholds["max_cpa"]:
+        issues.append(f"CPA (${cpa}) above threshold (${thresholds['max_cpa']})")
+    if roas < thresholds["min_roas"]:
+        issues.append(f"ROAS ({roas}) below threshold ({thresholds['min_roas']})")
+
+    if not issues:
+        return None
+
+    return {
+        "type": "performance_threshold",
+        "severity": "medium",
+        "metric": "multiple",
+        "description": f"Performance below thresholds: {'; '.join(issues)}",
+        "metric_data": {
+            "platform": platform,
+            "thresholds": thresholds,
+            "current_values": {
+                "ctr": ctr,
+                "cpa": cpa,
+                "roas": roas,
+            },
+        },
+    }
+
+
+def segment_share_drop(
+    dimension: str,
+    segment: str,
+    recent_share: float,
+    baseline_share: float,
+    historical_values: list[float],
+) -> dict[str, Any]:
+    """Build a device or geography segment share drop anomaly"""
+    drop_percent = ((baseline_share - recent_share) / baseline_share) * 100
+    return {
+        "type": "segment_share_drop",
+        "severity": "high"
+        if drop_percent >= SEGMENT_SHARE_DROP_HIGH_PERCENT
+        else "medium",
+        "metric": f"{dimension}:{segment}"[:50],
+        "description": (
+            f"{segment} share of {dimension} traffic dropped by {drop_percent:.1f}% "
+            f"({baseline_share:.0%} to {recent_share:.0%}) - "
+            "check targeting, placements or tracking for it"
+        ),
+        "metric_data": {
+            "dimension": dimension,
+            "segment": segment,
+            "recent_value": recent_share,
+            "baseline_value": baseline_share,
+            "drop_percentage": drop_percent,
+            "historical_values": historical_values,
+        },
+    }
+
+
+def group_by_campaign(anomalies: list[tuple]) -> dict[int, list[dict[str, Any]]]:
+    """Group (campaign_id, anomaly) pairs into alert-worthy anomalies per campaign"""
+    grouped: dict[int, list[dict[str, Any]]] = {}
+    for campaign_id, anomaly in sorted(
+        anomalies,
+        key=lambda item: (item[0], ANOMALY_TYPES.index(item[1]["type"])),
+    ):
+        if anomaly["severity"] in ALERT_SEVERITIES:
+            grouped.setdefault(campaign_id, []).append(anomaly)
+    return grouped
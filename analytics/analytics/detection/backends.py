@@ -0,0 +1,105 @@
+"""Selectable execution backends for the anomaly detectors"""
+
+from datetime import date
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+
+from analytics.models import Campaign
+
+from .detectors import detect_anomalies
+from .percentiles import active_thresholds
+from .rollups import detect_anomalies_rollup
+from .seasonality import load_seasonal_profiles
+from .segments import detect_segment_shifts
+from .sql import detect_anomalies_sql
+from .thresholds import ThresholdSet
+from .windows import MetricFrame
+
+
+def _detect_python(
+    campaigns,
+    campaigns_by_id: dict[int, Campaign],
+    analysis_date: date,
+    days_back: int,
+    thresholds: ThresholdSet,
+):
+    """Load the windows into NumPy arrays and run the vectorized detectors
+
+    Only this backend applies day-of-week baselines, when
+    ANALYTICS_SEASONAL_BASELINES is on; run_detection refuses the others then.
+    """
+    lookback_date = analysis_date - timedelta(days=days_back)
+    windows = MetricFrame.load(campaigns, lookback_date, analysis_date).window(
+        analysis_date,
+        days_back,
+    )
+    profiles = None
+    if settings.ANALYTICS_SEASONAL_BASELINES:
+        profiles = load_seasonal_profiles(windows.campaign_ids.tolist(), analysis_date)
+    return detect_anomalies(windows, campaigns_by_id, thresholds, profiles)
+
+
+def _detect_sql(
+    campaigns,
+    campaigns_by_id: dict[int, Campaign],
+    analysis_date: date,
+    days_back: int,
+    thresholds: ThresholdSet,
+):
+    """Run the detectors as window-function queries next to the data"""
+    lookback_date = analysis_date - timedelta(days=days_back)
+    return detect_anomalies_sql(campaigns, lookback_date, analysis_date, thresholds)
+
+
+BACKENDS = {
+    "python": _detect_python,
+    "sql": _detect_sql,
+    "rollup": detect_anomalies_rollup,
+}
+# Backends that apply day-of-week baselines
+SEASONAL_BACKENDS = {"python"}
+
+
+def run_detection(
+    campaigns,
+    campaigns_by_id: dict[int, Campaign],
+    analysis_date: date,
+    days_back: int,
+    backend: str = "python",
+) -> dict[int, list[dict[str, Any]]]:
+    """Detect the alert-worthy anomalies of the campaigns with the selected backend
+
+    Device and geography share shifts are scanned from the metric segments
+    whichever backend runs the metric detectors. The backends raise the same
+    anomalies; with ANALYTICS_SEASONAL_BASELINES on, only the ones applying
+    day-of-week baselines may run, rather than silently comparing against flat
+    baselines.
+    """
+    if backend not in BACKENDS:
+        msg = f"Unknown detection backend: {backend}"
+        raise ValueError(msg)
+    if settings.ANALYTICS_SEASONAL_BASELINES and backend not in SEASONAL_BACKENDS:
+        msg = (
+            f"The {backend} detection backend does not apply "
+            "ANALYTICS_SEASONAL_BASELINES; use the python backend"
+        )
+        raise ValueError(msg)
+    thresholds = active_thresholds()
+    found = BACKENDS[backend](
+        campaigns,
+        campaigns_by_id,
+        analysis_date,
+        days_back,
+        thresholds,
+    )
+    if settings.ANALYTICS_SEGMENT_ANOMALIES:
+        for campaign_id, segment_anomalies in detect_segment_shifts(
+            campaigns_by_id,
+            analysis_date,
+            days_back,
+            thresholds,
+        ).items():
+            found.setdefault(campaign_id, []).extend(segment_anomalies)
+    return found
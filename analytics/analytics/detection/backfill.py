@@ -0,0 +1,62 @@
+"""Detection over a range of past analysis dates from a single metrics load"""
+
+from datetime import date
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+
+from analytics.models import Campaign
+
+from .detectors import detect_anomalies
+from .percentiles import active_thresholds
+from .seasonality import seasonal_profiles_from_frame
+from .windows import MetricFrame
+
+
+def detect_anomalies_range(
+    campaigns,
+    campaigns_by_id: dict[int, Campaign],
+    start_date: date,
+    end_date: date,
+    days_back: int,
+) -> dict[date, dict[int, list[dict[str, Any]]]]:
+    """Run the detectors for every analysis date between two dates, grouped by date
+
+    The metrics covering all of the dates' lookback windows are loaded once and
+    each day's windows are sliced from them in memory. Day-of-week baselines
+    use profiles computed from the same metrics as of each analysis date, so
+    that no date sees later metrics. They are not cached, so live runs keep
+    reading the current ones.
+    """
+    seasonal = settings.ANALYTICS_SEASONAL_BASELINES
+    weeks = settings.ANALYTICS_SEASONAL_PROFILE_WEEKS
+    history_days = max(days_back, weeks * 7 - 1) if seasonal else days_back
+    frame = MetricFrame.load(
+        campaigns,
+        start_date - timedelta(days=history_days),
+        end_date,
+    )
+    thresholds = active_thresholds()
+
+    found = {}
+    analysis_date = start_date
+    while analysis_date <= end_date:
+        profiles = None
+        if seasonal:
+            profiles = seasonal_profiles_from_frame(
+                frame,
+                list(campaigns_by_id),
+                analysis_date,
+                weeks,
+            )
+        anomalies = detect_anomalies(
+            frame.window(analysis_date, days_back),
+            campaigns_by_id,
+            thresholds,
+            profiles,
+        )
+        if anomalies:
+            found[analysis_date] = anomalies
+        analysis_date += timedelta(days=1)
+    return found
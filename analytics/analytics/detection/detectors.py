@@ -0,0 +1,340 @@
+"""Vectorized anomaly detectors evaluated across all campaign windows at once"""
+
+from typing import Any
+
+import numpy as np
+
+from analytics.models import Campaign
+
+from . import anomalies
+from .thresholds import DEFAULT_THRESHOLDS
+from .thresholds import ThresholdSet
+from .windows import MetricWindows
+
+# Metrics the detectors compare against a baseline, in the row order of a day-of-week
+# profile
+BASELINE_METRICS = ("ctr", "cpc", "spend", "conversion_rate")
+
+# Fewest valid values of a series the detectors compare with its baseline
+MIN_SERIES_VALUES = 3
+
+
+def metric_series(windows: MetricWindows, metric: str):
+    """Return the values of a detector metric and the mask of the values it considers"""
+    if metric == "conversion_rate":
+        clicks = windows.column("clicks")
+        valid = clicks > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(
+                valid,
+                windows.column("conversions") / clicks * 100,
+                np.nan,
+            ), valid
+
+    values = windows.column(metric)
+    return values, values > 0
+
+
+def series_stats(
+    values: np.ndarray,
+    valid: np.ndarray,
+    seasonal: np.ndarray | None = None,
+):
+    """Most recent valid value, mean of the other valid values and valid count per row
+
+    With seasonal indexes (one per value) the other values are deseasonalized
+    before averaging and the mean is rescaled to the weekday of the recent value.
+    """
+    rows = np.arange(len(values))
+    counts = valid.sum(axis=1)
+    first = valid.argmax(axis=1)
+    recent = values[rows, first]
+
+    rest = valid.copy()
+    rest[rows, first] = False
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if seasonal is None:
+            baseline = np.where(rest, values, 0.0).sum(axis=1) / (counts - 1)
+        else:
+            baseline = (
+                np.where(rest, values / seasonal, 0.0).sum(axis=1)
+                / (counts - 1)
+                * seasonal[rows, first]
+            )
+
+    return recent, baseline, counts
+
+
+def seasonal_indexes(
+    windows: MetricWindows,
+    profiles: dict[int, np.ndarray] | None,
+    metric: str,
+):
+    """Day-of-week index of every window value of a metric, or None without profiles
+
+    A profile is a (len(BASELINE_METRICS), 7) array of weekday indexes, Monday
+    first; campaigns without a profile get a flat index of 1.
+    """
+    if profiles is None:
+        return None
+
+    flat = np.ones((len(BASELINE_METRICS), 7))
+    metric_index = BASELINE_METRICS.index(metric)
+    weekday_indexes = np.array(
+        [
+            profiles.get(cid, flat)[metric_index]
+            for cid in windows.campaign_ids.tolist()
+        ],
+        dtype=float,
+    ).reshape(len(windows), 7)
+    weekdays = (windows.dates - 1) % 7  # Ordinal 1 is a Monday
+    return np.take_along_axis(weekday_indexes, weekdays, axis=1)
+
+
+def campaign_array(
+    campaign_ids: np.ndarray,
+    campaigns: dict[int, Campaign],
+    getter,
+) -> np.ndarray:
+    """Build a per-row float array from campaign attributes"""
+    return np.array(
+        [float(getter(campaigns[cid])) for cid in campaign_ids],
+        dtype=float,
+    )
+
+
+def ctr_drop_mask(
+    recent,
+    baseline,
+    counts,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> np.ndarray:
+    """Check for significant CTR drops (>40% decrease by default)"""
+    return (counts >= MIN_SERIES_VALUES) & (
+        recent < baseline * thresholds.ctr_drop_factor
+    )
+
+
+def cpc_spike_mask(
+    recent,
+    baseline,
+    counts,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> np.ndarray:
+    """Check for significant CPC increases (>50% increase by default)"""
+    return (counts >= MIN_SERIES_VALUES) & (
+        recent > baseline * thresholds.cpc_spike_factor
+    )
+
+
+def spend_spike_mask(
+    recent,
+    baseline,
+    counts,
+    daily_budget,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> np.ndarray:
+    """Check for spend spikes (>200% of baseline or >150% of daily budget by default)"""
+    return (counts >= MIN_SERIES_VALUES) & (
+        (recent > baseline * thresholds.spend_baseline_factor)
+        | (recent > daily_budget * thresholds.spend_budget_factor)
+    )
+
+
+def conversion_drop_mask(
+    recent,
+    baseline,
+    counts,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> np.ndarray:
+    """Check for significant conversion rate drops (>50% decrease by default)"""
+    return (
+        (counts >= MIN_SERIES_VALUES)
+        & (recent < baseline * thresholds.conversion_drop_factor)
+        & (baseline > thresholds.min_conversion_baseline)
+    )
+
+
+def detect_ctr_anomalies(
+    windows: MetricWindows,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+    profiles: dict[int, np.ndarray] | None = None,
+) -> dict[int, dict[str, Any]]:
+    """Detect CTR anomalies using statistical analysis"""
+    ctr, valid = metric_series(windows, "ctr")
+    recent, baseline, counts = series_stats(
+        ctr,
+        valid,
+        seasonal_indexes(windows, profiles, "ctr"),
+    )
+    flagged = ctr_drop_mask(recent, baseline, counts, thresholds)
+
+    return {
+        int(windows.campaign_ids[i]): anomalies.ctr_drop(
+            float(recent[i]),
+            float(baseline[i]),
+            ctr[i][valid[i]].tolist(),
+        )
+        for i in np.flatnonzero(flagged)
+    }
+
+
+def detect_cpc_anomalies(
+    windows: MetricWindows,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+    profiles: dict[int, np.ndarray] | None = None,
+) -> dict[int, dict[str, Any]]:
+    """Detect CPC spikes that indicate increased competition or bidding issues"""
+    cpc, valid = metric_series(windows, "cpc")
+    recent, baseline, counts = series_stats(
+        cpc,
+        valid,
+        seasonal_indexes(windows, profiles, "cpc"),
+    )
+    flagged = cpc_spike_mask(recent, baseline, counts, thresholds)
+
+    return {
+        int(windows.campaign_ids[i]): anomalies.cpc_spike(
+            float(recent[i]),
+            float(baseline[i]),
+            cpc[i][valid[i]].tolist(),
+        )
+        for i in np.flatnonzero(flagged)
+    }
+
+
+def detect_spend_anomalies(
+    windows: MetricWindows,
+    campaigns: dict[int, Campaign],
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+    profiles: dict[int, np.ndarray] | None = None,
+) -> dict[int, dict[str, Any]]:
+    """Detect unusual spending patterns"""
+    spend, valid = metric_series(windows, "spend")
+    recent, baseline, counts = series_stats(
+        spend,
+        valid,
+        seasonal_indexes(windows, profiles, "spend"),
+    )
+    daily_budget = (
+        campaign_array(windows.campaign_ids, campaigns, lambda c: c.budget) / 30
+    )  # Approximate daily budget
+    flagged = spend_spike_mask(recent, baseline, counts, daily_budget, thresholds)
+
+    return {
+        int(windows.campaign_ids[i]): anomalies.spend_spike(
+            float(recent[i]),
+            float(baseline[i]),
+            float(daily_budget[i]),
+            spend[i][valid[i]].tolist(),
+        )
+        for i in np.flatnonzero(flagged)
+    }
+
+
+def detect_conversion_anomalies(
+    windows: MetricWindows,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+    profiles: dict[int, np.ndarray] | None = None,
+) -> dict[int, dict[str, Any]]:
+    """Detect conversion rate drops that suggest landing page or tracking issues"""
+    clicks = windows.column("clicks")
+    conversions = windows.column("conversions")
+    conversion_rates, valid = metric_series(windows, "conversion_rate")
+    recent, baseline, counts = series_stats(
+        conversion_rates,
+        valid,
+        seasonal_indexes(windows, profiles, "conversion_rate"),
+    )
+    flagged = conversion_drop_mask(recent, baseline, counts, thresholds)
+
+    return {
+        int(windows.campaign_ids[i]): anomalies.conversion_drop(
+            float(recent[i]),
+            float(baseline[i]),
+            conversion_rates[i][valid[i]].tolist(),
+            clicks=int(clicks[i, 0]),
+            conversions=int(conversions[i, 0]),
+        )
+        for i in np.flatnonzero(flagged)
+    }
+
+
+def threshold_mask(
+    campaigns: list[Campaign],
+    ctr,
+    cpa,
+    roas,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> np.ndarray:
+    """Check if the latest CTR, CPA or ROAS breach the campaigns' platform and objective
+    thresholds
+    """
+    limits = [
+        thresholds.for_campaign(campaign.platform, campaign.objective)
+        for campaign in campaigns
+    ]
+    min_ctr = np.array([t["min_ctr"] for t in limits], dtype=float)
+    max_cpa = np.array([t["max_cpa"] for t in limits], dtype=float)
+    min_roas = np.array([t["min_roas"] for t in limits], dtype=float)
+    return (ctr < min_ctr) | (cpa > max_cpa) | (roas < min_roas)
+
+
+def check_performance_thresholds(
+    windows: MetricWindows,
+    campaigns: dict[int, Campaign],
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> dict[int, dict[str, Any]]:
+    """Check if key metrics of the latest day are below acceptable thresholds"""
+    window_campaigns = [campaigns[cid] for cid in windows.campaign_ids]
+    ctr = windows.column("ctr")[:, 0]
+    cpa = windows.column("cpa")[:, 0]
+    roas = windows.column("roas")[:, 0]
+    flagged = threshold_mask(window_campaigns, ctr, cpa, roas, thresholds)
+
+    return {
+        int(windows.campaign_ids[i]): anomalies.performance_threshold(
+            window_campaigns[i].platform,
+            float(ctr[i]),
+            float(cpa[i]),
+            float(roas[i]),
+            thresholds.for_campaign(
+                window_campaigns[i].platform,
+                window_campaigns[i].objective,
+            ),
+        )
+        for i in np.flatnonzero(flagged)
+    }
+
+
+def detect_anomalies(
+    windows: MetricWindows,
+    campaigns: dict[int, Campaign],
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+    profiles: dict[int, np.ndarray] | None = None,
+) -> dict[int, list[dict[str, Any]]]:
+    """Run every detector over the windows and group alert-worthy anomalies by campaign
+
+    With day-of-week profiles the latest value is compared against the
+    baseline expected for its weekday instead of the flat mean.
+    """
+    # Need at least 3 days of data
+    windows = windows.select(windows.row_counts >= MIN_SERIES_VALUES)
+    if not len(windows):
+        return {}
+
+    results = [
+        detect_ctr_anomalies(windows, thresholds, profiles),
+        detect_cpc_anomalies(windows, thresholds, profiles),
+        detect_spend_anomalies(windows, campaigns, thresholds, profiles),
+        detect_conversion_anomalies(windows, thresholds, profiles),
+        check_performance_thresholds(windows, campaigns, thresholds),
+    ]
+
+    return anomalies.group_by_campaign(
+        [
+            (campaign_id, anomaly)
+            for result in results
+            for campaign_id, anomaly in result.items()
+        ],
+    )
@@ -0,0 +1,185 @@
+"""Percentile thresholds from incrementally maintained metric sketches"""
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from analytics.models import DailyMetric
+from analytics.models import MetricSketch
+
+from .anomalies import DEFAULT_PLATFORM
+from .anomalies import PLATFORM_THRESHOLDS
+from .sketches import QuantileSketch
+from .thresholds import DEFAULT_THRESHOLDS
+from .thresholds import ThresholdSet
+
+SKETCH_RELATIVE_ACCURACY = 0.01
+# Platform key of the thresholds computed from all platforms' sketches, used for unknown
+# platforms
+ALL_PLATFORMS = "*"
+# Platforms with fewer sketched values keep their static thresholds
+MIN_SKETCH_VALUES = 100
+# Metric each platform threshold is a percentile of
+THRESHOLD_METRICS = {"min_ctr": "ctr", "max_cpa": "cpa", "min_roas": "roas"}
+
+SketchKey = tuple[str, str, str]  # (platform, objective, metric)
+
+
+def sketch_metrics(min_id: int, max_id: int) -> dict[SketchKey, QuantileSketch]:
+    """Sketch the metrics with ids in (min_id, max_id] by platform, objective, metric"""
+    rows = list(
+        DailyMetric.objects.filter(id__gt=min_id, id__lte=max_id).values_list(
+            "campaign__platform",
+            "campaign__objective",
+            *MetricSketch.METRICS,
+        ),
+    )
+
+    grouped: dict[tuple[str, str], list[tuple]] = {}
+    for platform, objective, *values in rows:
+        grouped.setdefault((platform, objective), []).append(values)
+
+    sketches = {}
+    for (platform, objective), values in grouped.items():
+        columns = np.array(values, dtype=float)
+        for i, metric in enumerate(MetricSketch.METRICS):
+            sketches[(platform, objective, metric)] = QuantileSketch(
+                SKETCH_RELATIVE_ACCURACY,
+            ).add(columns[:, i])
+    return sketches
+
+
+def merge_sketches(
+    shards: list[dict[SketchKey, QuantileSketch]],
+) -> dict[SketchKey, QuantileSketch]:
+    """Merge the sketches of several shards key by key"""
+    merged: dict[SketchKey, QuantileSketch] = {}
+    for shard in shards:
+        for key, sketch in shard.items():
+            merged.setdefault(key, QuantileSketch(SKETCH_RELATIVE_ACCURACY)).merge(
+                sketch,
+            )
+    return merged
+
+
+@transaction.atomic
+def update_metric_sketches(
+    sketches: dict[SketchKey, QuantileSketch],
+    start_id: int,
+    end_id: int,
+) -> int | None:
+    """Merge sketches of the metrics with ids in (start_id, end_id] into the stored ones
+
+    Returns the number of stored sketches, or None without updating anything
+    if the stored sketches no longer end at ``start_id`` (another refresh
+    got there first).
+    """
+    stored = {
+        (row.platform, row.objective, row.metric): row
+        for row in MetricSketch.objects.select_for_update()
+    }
+    if any(row.last_metric_id != start_id for row in stored.values()):
+        return None
+
+    created = []
+    for key, new_values in sketches.items():
+        row = stored.get(key)
+        if row is None:
+            platform, objective, metric = key
+            row = MetricSketch(platform=platform, objective=objective, metric=metric)
+            created.append(row)
+            sketch = new_values
+        else:
+            sketch = QuantileSketch.from_dict(row.sketch).merge(new_values)
+        row.sketch = sketch.to_dict()
+        row.value_count = sketch.count
+
+    # Every sketch now covers the metrics up to end_id, including those without new
+    # values
+    now = timezone.now()
+    for row in [*stored.values(), *created]:
+        row.last_metric_id = end_id
+        row.updated_at = now
+
+    MetricSketch.objects.bulk_create(created)
+    MetricSketch.objects.bulk_update(
+        list(stored.values()),
+        ["sketch", "value_count", "last_metric_id", "updated_at"],
+    )
+    return len(stored) + len(created)
+
+
+def percentile_thresholds(percentiles: dict[str, float]) -> ThresholdSet:
+    """Build a threshold set from percentiles of the platforms' sketched metrics
+
+    ``percentiles`` maps min_ctr, max_cpa and min_roas to the percentile of
+    CTR, CPA and ROAS they are set at, e.g. {"min_ctr": 10, "max_cpa": 90,
+    "min_roas": 10}. Campaigns are held to the percentiles of their platform
+    and objective where enough values were sketched for them, and otherwise
+    to those of their platform, the merge of its objectives' sketches.
+    Unknown platforms are held to the merge of all platforms.
+    """
+    by_objective: dict[tuple[str, str], dict[str, QuantileSketch]] = {}
+    by_platform: dict[str, dict[str, QuantileSketch]] = {}
+    for row in MetricSketch.objects.all():
+        sketch = QuantileSketch.from_dict(row.sketch)
+        by_objective.setdefault((row.platform, row.objective), {})[row.metric] = sketch
+        for platform in (row.platform, ALL_PLATFORMS):
+            by_platform.setdefault(platform, {}).setdefault(
+                row.metric,
+                QuantileSketch(SKETCH_RELATIVE_ACCURACY),
+            ).merge(sketch)
+
+    platform_thresholds = dict(PLATFORM_THRESHOLDS)
+    for platform, sketches in by_platform.items():
+        limits = dict(
+            PLATFORM_THRESHOLDS.get(platform, PLATFORM_THRESHOLDS[DEFAULT_PLATFORM]),
+        )
+        platform_thresholds[platform] = _percentile_limits(
+            sketches,
+            percentiles,
+            limits,
+        )
+
+    objective_thresholds: dict[str, dict[str, dict[str, float]]] = {}
+    for (platform, objective), sketches in by_objective.items():
+        limits = _percentile_limits(
+            sketches,
+            percentiles,
+            platform_thresholds[platform],
+        )
+        if limits != platform_thresholds[platform]:
+            objective_thresholds.setdefault(platform, {})[objective] = limits
+
+    return ThresholdSet(
+        platform_thresholds=platform_thresholds,
+        default_platform=ALL_PLATFORMS
+        if ALL_PLATFORMS in platform_thresholds
+        else DEFAULT_PLATFORM,
+        objective_thresholds=objective_thresholds,
+    )
+
+
+def _percentile_limits(
+    sketches: dict[str, QuantileSketch],
+    percentiles: dict[str, float],
+    fallback: dict[str, float],
+) -> dict[str, float]:
+    """Thresholds at the percentiles of the sketched metrics
+
+    Thresholds whose metric has too few sketched values keep ``fallback``'s.
+    """
+    limits = dict(fallback)
+    for threshold, metric in THRESHOLD_METRICS.items():
+        sketch = sketches.get(metric)
+        if sketch is not None and sketch.count >= MIN_SKETCH_VALUES:
+            limits[threshold] = sketch.quantile(percentiles[threshold] / 100)
+    return limits
+
+
+def active_thresholds() -> ThresholdSet:
+    """Threshold set alerts are raised with, static or from the metric sketches"""
+    if settings.ANALYTICS_PERCENTILE_THRESHOLDS:
+        return percentile_thresholds(settings.ANALYTICS_THRESHOLD_PERCENTILES)
+    return DEFAULT_THRESHOLDS
@@ -0,0 +1,160 @@
+"""What-if replay of candidate detector thresholds over the metrics history"""
+
+from collections import Counter
+from datetime import date
+from datetime import timedelta
+from typing import Any
+
+import numpy as np
+from django.db.models import Max
+from django.db.models import Min
+
+from analytics.models import Campaign
+from analytics.models import DailyMetric
+
+from . import anomalies
+from .detectors import BASELINE_METRICS
+from .detectors import MIN_SERIES_VALUES
+from .detectors import campaign_array
+from .detectors import conversion_drop_mask
+from .detectors import cpc_spike_mask
+from .detectors import ctr_drop_mask
+from .detectors import metric_series
+from .detectors import series_stats
+from .detectors import spend_spike_mask
+from .detectors import threshold_mask
+from .thresholds import ThresholdSet
+from .windows import MetricFrame
+from .windows import MetricWindows
+
+# Analysis dates replayed per pass, bounding the size of the packed windows
+REPLAY_CHUNK_DAYS = 90
+
+
+def replay_thresholds(
+    campaigns,
+    threshold_sets: dict[str, ThresholdSet],
+    start_date: date | None = None,
+    end_date: date | None = None,
+    days_back: int = 7,
+) -> dict[str, Any]:
+    """Count the alerts each threshold set would have raised daily between two dates
+
+    The dates default to the full metrics history of the campaigns. The detector
+    statistics of every campaign and analysis date are computed once and shared
+    by all threshold sets; nothing is persisted or sent.
+    """
+    campaigns_by_id = {campaign.id: campaign for campaign in campaigns}
+    bounds = DailyMetric.objects.filter(
+        campaign_id__in=list(campaigns_by_id),
+    ).aggregate(first=Min("date"), last=Max("date"))
+    start_date = start_date or bounds["first"]
+    end_date = end_date or bounds["last"]
+
+    counters = {
+        name: {"by_type": Counter(), "by_severity": Counter(), "by_platform": Counter()}
+        for name in threshold_sets
+    }
+    campaign_days = 0
+
+    chunk_start = start_date
+    while start_date and end_date and chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=REPLAY_CHUNK_DAYS - 1), end_date)
+        frame = MetricFrame.load(
+            list(campaigns_by_id),
+            chunk_start - timedelta(days=days_back),
+            chunk_end,
+        )
+        windows, _ = frame.daily_windows(chunk_start, chunk_end, days_back)
+
+        # Need at least 3 days of data
+        windows = windows.select(windows.row_counts >= MIN_SERIES_VALUES)
+        campaign_days += len(windows)
+        _count_alerts(windows, campaigns_by_id, threshold_sets, counters)
+        chunk_start = chunk_end + timedelta(days=1)
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "campaign_days": campaign_days,
+        "threshold_sets": {
+            name: {
+                "alerts": sum(counter["by_type"].values()),
+                **{
+                    group: dict(sorted(counts.items()))
+                    for group, counts in counter.items()
+                },
+            }
+            for name, counter in counters.items()
+        },
+    }
+
+
+def _count_alerts(
+    windows: MetricWindows,
+    campaigns_by_id: dict[int, Campaign],
+    threshold_sets: dict[str, ThresholdSet],
+    counters: dict[str, dict[str, Counter]],
+):
+    """Add the alerts every threshold set raises on the windows to its counters"""
+    if not len(windows):
+        return
+
+    window_campaigns = [campaigns_by_id[cid] for cid in windows.campaign_ids.tolist()]
+    platforms = np.array([campaign.platform for campaign in window_campaigns])
+    daily_budget = (
+        campaign_array(windows.campaign_ids, campaigns_by_id, lambda c: c.budget) / 30
+    )
+    stats = {
+        metric: series_stats(*metric_series(windows, metric))
+        for metric in BASELINE_METRICS
+    }
+    latest = [windows.column(field)[:, 0] for field in ("ctr", "cpa", "roas")]
+
+    # Severities only depend on the statistics, not on the thresholds
+    ctr_recent, ctr_baseline, _ = stats["ctr"]
+    cpc_recent, cpc_baseline, _ = stats["cpc"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ctr_drop_percent = ((ctr_baseline - ctr_recent) / ctr_baseline) * 100
+        cpc_increase_percent = ((cpc_recent - cpc_baseline) / cpc_baseline) * 100
+    severities = {
+        "ctr_drop": np.where(
+            ctr_drop_percent > anomalies.CTR_DROP_HIGH_PERCENT,
+            "high",
+            "medium",
+        ),
+        "cpc_spike": np.where(
+            cpc_increase_percent > anomalies.CPC_SPIKE_CRITICAL_PERCENT,
+            "critical",
+            "medium",
+        ),
+        "spend_spike": np.full(len(windows), "high"),
+        "conversion_drop": np.full(len(windows), "critical"),
+        "performance_threshold": np.full(len(windows), "medium"),
+    }
+
+    for name, thresholds in threshold_sets.items():
+        flagged = {
+            "ctr_drop": ctr_drop_mask(*stats["ctr"], thresholds),
+            "cpc_spike": cpc_spike_mask(*stats["cpc"], thresholds),
+            "spend_spike": spend_spike_mask(*stats["spend"], daily_budget, thresholds),
+            "conversion_drop": conversion_drop_mask(
+                *stats["conversion_rate"],
+                thresholds,
+            ),
+            "performance_threshold": threshold_mask(
+                window_campaigns,
+                *latest,
+                thresholds,
+            ),
+        }
+        for anomaly_type, flagged_mask in flagged.items():
+            mask = flagged_mask & np.isin(
+                severities[anomaly_type],
+                anomalies.ALERT_SEVERITIES,
+            )
+            counters[name]["by_type"][anomaly_type] += int(mask.sum())
+            counters[name]["by_severity"].update(
+                severities[anomaly_type][mask].tolist(),
+            )
+            counters[name]["by_platform"].update(platforms[mask].tolist())
@@ -0,0 +1,189 @@
+"""Trailing metric statistics, recomputed after writes, and the rollup backend"""
+
+from collections.abc import Iterable
+from datetime import date
+from datetime import timedelta
+from typing import Any
+
+import numpy as np
+from django.db.models import Max
+
+from analytics.models import Campaign
+from analytics.models import CampaignMetricRollup
+from analytics.models import DailyMetric
+
+from .detectors import campaign_array
+from .detectors import conversion_drop_mask
+from .detectors import cpc_spike_mask
+from .detectors import ctr_drop_mask
+from .detectors import detect_anomalies
+from .detectors import metric_series
+from .detectors import series_stats
+from .detectors import spend_spike_mask
+from .detectors import threshold_mask
+from .thresholds import DEFAULT_THRESHOLDS
+from .thresholds import ThresholdSet
+from .windows import MetricFrame
+
+ROLLUP_UPDATE_FIELDS = [
+    "window_end",
+    "row_count",
+    *(
+        f"{metric}_{stat}"
+        for metric in CampaignMetricRollup.METRICS
+        for stat in ("sum", "count", "last")
+    ),
+    "latest_clicks",
+    "latest_conversions",
+    "latest_ctr",
+    "latest_cpa",
+    "latest_roas",
+    "updated_at",
+]
+
+
+def refresh_metric_rollups(campaign_ids: Iterable[int]) -> int:
+    """Recompute the rollups of the given campaigns from their trailing metrics"""
+    campaign_ids = list(campaign_ids)
+    latest_dates = dict(
+        DailyMetric.objects.filter(campaign_id__in=campaign_ids)
+        .values("campaign_id")
+        .annotate(latest=Max("date"))
+        .values_list("campaign_id", "latest"),
+    )
+
+    # Campaigns without metrics keep no rollups
+    CampaignMetricRollup.objects.filter(campaign_id__in=campaign_ids).exclude(
+        campaign_id__in=latest_dates,
+    ).delete()
+    if not latest_dates:
+        return 0
+
+    longest_window = max(CampaignMetricRollup.WINDOW_SIZES)
+    frame = MetricFrame.load(
+        list(latest_dates),
+        min(latest_dates.values()) - timedelta(days=longest_window),
+        max(latest_dates.values()),
+    )
+
+    rollups = []
+    for window_days in CampaignMetricRollup.WINDOW_SIZES:
+        windows = frame.trailing_windows(window_days)
+        stats = {}
+        for metric in CampaignMetricRollup.METRICS:
+            values, valid = metric_series(windows, metric)
+            recent, _, counts = series_stats(values, valid)
+            stats[metric] = (np.where(valid, values, 0.0).sum(axis=1), counts, recent)
+
+        latest = {
+            field: windows.column(field)[:, 0]
+            for field in ("clicks", "conversions", "ctr", "cpa", "roas")
+        }
+        for i, campaign_id in enumerate(windows.campaign_ids.tolist()):
+            fields: dict[str, Any] = {}
+            for metric, (sums, counts, recent) in stats.items():
+                fields[f"{metric}_sum"] = float(sums[i])
+                fields[f"{metric}_count"] = int(counts[i])
+                fields[f"{metric}_last"] = float(recent[i]) if counts[i] else None
+
+            rollups.append(
+                CampaignMetricRollup(
+                    campaign_id=campaign_id,
+                    window_days=window_days,
+                    window_end=date.fromordinal(int(windows.dates[i, 0])),
+                    row_count=int(windows.row_counts[i]),
+                    latest_clicks=int(latest["clicks"][i]),
+                    latest_conversions=int(latest["conversions"][i]),
+                    latest_ctr=float(latest["ctr"][i]),
+                    latest_cpa=float(latest["cpa"][i]),
+                    latest_roas=float(latest["roas"][i]),
+                    **fields,
+                ),
+            )
+
+    CampaignMetricRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=["campaign", "window_days"],
+        update_fields=ROLLUP_UPDATE_FIELDS,
+    )
+    return len(rollups)
+
+
+def _rollup_stats(rollups: list[CampaignMetricRollup], metric: str):
+    """Latest value, baseline and value count of a metric read from the rollups"""
+    sums = np.array(
+        [getattr(rollup, f"{metric}_sum") for rollup in rollups],
+        dtype=float,
+    )
+    counts = np.array([getattr(rollup, f"{metric}_count") for rollup in rollups])
+    recent = np.array(
+        [getattr(rollup, f"{metric}_last") for rollup in rollups],
+        dtype=float,
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        baseline = (sums - recent) / (counts - 1)
+    return recent, baseline, counts
+
+
+def detect_anomalies_rollup(
+    campaigns,
+    campaigns_by_id: dict[int, Campaign],
+    analysis_date: date,
+    days_back: int,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> dict[int, list[dict[str, Any]]]:
+    """Screen campaigns with their O(1) rollup baselines, fully analyzing flagged ones
+
+    Each campaign's window ends at its latest metric date rather than at the
+    analysis date, which only differs for campaigns whose data is lagging.
+    """
+    if days_back not in CampaignMetricRollup.WINDOW_SIZES:
+        msg = f"No rollups are maintained for a {days_back} day window"
+        raise ValueError(msg)
+
+    lookback_date = analysis_date - timedelta(days=days_back)
+    rollups = list(
+        CampaignMetricRollup.objects.filter(
+            campaign__in=campaigns,
+            window_days=days_back,
+            window_end__gte=lookback_date,
+            window_end__lte=analysis_date,
+            row_count__gte=3,
+        ),
+    )
+    if not rollups:
+        return {}
+
+    campaign_ids = np.array([rollup.campaign_id for rollup in rollups])
+    daily_budget = (
+        campaign_array(campaign_ids, campaigns_by_id, lambda c: c.budget) / 30
+    )
+    flagged = (
+        ctr_drop_mask(*_rollup_stats(rollups, "ctr"), thresholds)
+        | cpc_spike_mask(*_rollup_stats(rollups, "cpc"), thresholds)
+        | spend_spike_mask(*_rollup_stats(rollups, "spend"), daily_budget, thresholds)
+        | conversion_drop_mask(*_rollup_stats(rollups, "conversion_rate"), thresholds)
+        | threshold_mask(
+            [campaigns_by_id[rollup.campaign_id] for rollup in rollups],
+            np.array([rollup.latest_ctr for rollup in rollups]),
+            np.array([rollup.latest_cpa for rollup in rollups]),
+            np.array([rollup.latest_roas for rollup in rollups]),
+            thresholds,
+        )
+    )
+    if not flagged.any():
+        return {}
+
+    # Only flagged campaigns need their series, to build the anomaly payloads
+    flagged_ids = campaign_ids[flagged].tolist()
+    frame = MetricFrame.load(
+        flagged_ids,
+        lookback_date - timedelta(days=days_back),
+        analysis_date,
+    )
+    return detect_anomalies(
+        frame.trailing_windows(days_back),
+        campaigns_by_id,
+        thresholds,
+    )
@@ -0,0 +1,131 @@
+"""Per-campaign day-of-week baseline profiles, precomputed and cached"""
+
+from collections.abc import Iterable
+from datetime import date
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .detectors import BASELINE_METRICS
+from .detectors import metric_series
+from .windows import MetricFrame
+
+PROFILE_CACHE_KEY = "analytics:seasonal-profile:{campaign_id}"
+# Profiles outlive one missed nightly refresh
+PROFILE_CACHE_TIMEOUT = 60 * 60 * 48
+# Weekdays with fewer values in the profile history keep a flat index
+MIN_WEEKDAY_VALUES = 2
+# Weekday indexes are shrunk towards 1 as if this many flat values had been observed,
+# so that day-to-day noise in short histories does not pass for a weekly pattern
+PRIOR_WEEKDAY_VALUES = 12
+
+
+def compute_seasonal_profiles(
+    campaign_ids: Iterable[int],
+    end_date: date,
+    weeks: int,
+) -> dict[int, np.ndarray]:
+    """Compute the weekday indexes of every metric from the campaigns' trailing weeks
+
+    The index of a weekday is the metric's median on that weekday over its
+    median on all days, so 0.8 means the weekday usually runs 20% below a
+    typical day. Medians keep anomalous days out of the profiles.
+    """
+    campaign_ids = list(campaign_ids)
+    frame = MetricFrame.load(
+        campaign_ids,
+        end_date - timedelta(days=weeks * 7 - 1),
+        end_date,
+    )
+    return seasonal_profiles_from_frame(frame, campaign_ids, end_date, weeks)
+
+
+def seasonal_profiles_from_frame(
+    frame: MetricFrame,
+    campaign_ids: Iterable[int],
+    end_date: date,
+    weeks: int,
+) -> dict[int, np.ndarray]:
+    """Compute the profiles as of ``end_date`` from metrics loaded beforehand
+
+    The frame must cover the ``weeks`` weeks up to ``end_date``; later metrics
+    in it are left out.
+    """
+    history_days = weeks * 7 - 1
+    windows = frame.window(end_date, history_days)
+    weekdays = (windows.dates - 1) % 7  # Ordinal 1 is a Monday
+
+    profiles = np.ones((len(windows), len(BASELINE_METRICS), 7))
+    for metric_index, metric in enumerate(BASELINE_METRICS):
+        values, valid = metric_series(windows, metric)
+        values = np.where(valid, values, np.nan)
+        overall_median = _row_medians(values)
+        for weekday in range(7):
+            on_weekday = valid & (weekdays == weekday)
+            weekday_count = on_weekday.sum(axis=1)
+            weekday_median = _row_medians(np.where(on_weekday, values, np.nan))
+            usable = (weekday_count >= MIN_WEEKDAY_VALUES) & (overall_median > 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                index = 1 + (weekday_median / overall_median - 1) * weekday_count / (
+                    weekday_count + PRIOR_WEEKDAY_VALUES
+                )
+            profiles[usable, metric_index, weekday] = index[usable]
+
+    # Campaigns without metrics get flat profiles so they are cached too
+    flat = np.ones((len(BASELINE_METRICS), 7))
+    computed = dict(zip(windows.campaign_ids.tolist(), profiles, strict=True))
+    return {
+        campaign_id: computed.get(campaign_id, flat) for campaign_id in campaign_ids
+    }
+
+
+def _row_medians(values: np.ndarray) -> np.ndarray:
+    """Median of the non-NaN values of every row, NaN for rows without any"""
+    medians = np.full(len(values), np.nan)
+    has_values = ~np.isnan(values).all(axis=1)
+    medians[has_values] = np.nanmedian(values[has_values], axis=1)
+    return medians
+
+
+def refresh_seasonal_profiles(
+    campaign_ids: Iterable[int],
+    end_date: date,
+) -> dict[int, np.ndarray]:
+    """Recompute the profiles of the given campaigns and cache them"""
+    profiles = compute_seasonal_profiles(
+        campaign_ids,
+        end_date,
+        settings.ANALYTICS_SEASONAL_PROFILE_WEEKS,
+    )
+    cache.set_many(
+        {
+            PROFILE_CACHE_KEY.format(campaign_id=campaign_id): profile.tolist()
+            for campaign_id, profile in profiles.items()
+        },
+        timeout=PROFILE_CACHE_TIMEOUT,
+    )
+    return profiles
+
+
+def load_seasonal_profiles(
+    campaign_ids: Iterable[int],
+    analysis_date: date,
+) -> dict[int, np.ndarray]:
+    """Read the cached profiles of the campaigns, computing and caching missing ones"""
+    keys = {
+        PROFILE_CACHE_KEY.format(campaign_id=campaign_id): campaign_id
+        for campaign_id in campaign_ids
+    }
+    profiles = {
+        keys[key]: np.array(profile)
+        for key, profile in cache.get_many(list(keys)).items()
+    }
+
+    missing = [
+        campaign_id for campaign_id in keys.values() if campaign_id not in profiles
+    ]
+    if missing:
+        profiles.update(refresh_seasonal_profiles(missing, analysis_date))
+    return profiles
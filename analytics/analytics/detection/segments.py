@@ -0,0 +1,155 @@
+"""Device and geography segments of the daily metrics and the segment shift detector"""
+
+import json
+from collections.abc import Iterable
+from datetime import date
+from datetime import timedelta
+from typing import Any
+
+import numpy as np
+from django.db import transaction
+
+from analytics.models import DailyMetric
+from analytics.models import DailyMetricSegment
+
+from . import anomalies
+from .detectors import MIN_SERIES_VALUES
+from .detectors import series_stats
+from .thresholds import DEFAULT_THRESHOLDS
+from .thresholds import ThresholdSet
+
+
+def breakdown_shares(breakdown) -> dict[str, float]:
+    """Segment shares of a breakdown stored as a JSON object or a JSON-encoded string"""
+    if isinstance(breakdown, str):
+        breakdown = json.loads(breakdown or "{}")
+    if not isinstance(breakdown, dict):
+        return {}
+    return {
+        str(segment)[:50]: float(share)
+        for segment, share in breakdown.items()
+        if isinstance(share, (int, float)) and not isinstance(share, bool)
+    }
+
+
+@transaction.atomic
+def refresh_metric_segments(metric_ids: Iterable[int]) -> int:
+    """Rewrite the segments of the given daily metrics from their breakdowns"""
+    metric_ids = list(metric_ids)
+    fields = DailyMetricSegment.DIMENSION_FIELDS
+    segments = [
+        DailyMetricSegment(
+            daily_metric_id=metric["id"],
+            campaign_id=metric["campaign_id"],
+            date=metric["date"],
+            dimension=dimension,
+            segment=segment,
+            share=share,
+        )
+        for metric in DailyMetric.objects.filter(id__in=metric_ids).values(
+            "id",
+            "campaign_id",
+            "date",
+            *fields.values(),
+        )
+        for dimension, field in fields.items()
+        for segment, share in breakdown_shares(metric[field]).items()
+    ]
+
+    DailyMetricSegment.objects.filter(daily_metric_id__in=metric_ids).delete()
+    DailyMetricSegment.objects.bulk_create(segments)
+    return len(segments)
+
+
+def segment_share_drop_mask(
+    recent,
+    baseline,
+    counts,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> np.ndarray:
+    """Check for collapsing segment shares
+
+    By default a share of at least 15% collapses when it decreases by over 50%.
+    """
+    return (
+        (counts >= MIN_SERIES_VALUES)
+        & (baseline >= thresholds.min_segment_share)
+        & (recent < baseline * thresholds.segment_share_drop_factor)
+    )
+
+
+def detect_segment_shifts(
+    campaign_ids: Iterable[int],
+    analysis_date: date,
+    days_back: int,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> dict[int, list[dict[str, Any]]]:
+    """Find collapsing device and geography shares across all campaigns in one pass
+
+    The segments of the window are packed into one (segment series, day) array,
+    most recent day first. A segment missing from a day the campaign reported
+    its dimension on counts as a zero share, so a segment vanishing entirely is
+    caught as well; its latest share is compared against its mean share over
+    the rest of the window.
+    """
+    rows = list(
+        DailyMetricSegment.objects.filter(
+            campaign_id__in=list(campaign_ids),
+            date__gte=analysis_date - timedelta(days=days_back),
+            date__lte=analysis_date,
+        ).values_list("campaign_id", "date", "dimension", "segment", "share"),
+    )
+    if not rows:
+        return {}
+
+    campaign_col, date_col, dimension_col, segment_col, share_col = zip(
+        *rows,
+        strict=True,
+    )
+    slots = analysis_date.toordinal() - np.array([day.toordinal() for day in date_col])
+    campaign_ids, campaign_codes = np.unique(
+        np.array(campaign_col),
+        return_inverse=True,
+    )
+    dimensions, dimension_codes = np.unique(
+        np.array(dimension_col),
+        return_inverse=True,
+    )
+    segments, segment_codes = np.unique(np.array(segment_col), return_inverse=True)
+
+    # A series is one segment of one campaign's dimension
+    dimension_keys = campaign_codes * len(dimensions) + dimension_codes
+    series_keys, series_codes = np.unique(
+        dimension_keys * len(segments) + segment_codes,
+        return_inverse=True,
+    )
+
+    reported = np.zeros(
+        (len(campaign_ids) * len(dimensions), days_back + 1),
+        dtype=bool,
+    )
+    reported[dimension_keys, slots] = True
+    shares = np.zeros((len(series_keys), days_back + 1))
+    np.add.at(shares, (series_codes, slots), np.array(share_col, dtype=float))
+
+    valid = reported[series_keys // len(segments)]
+    recent, baseline, counts = series_stats(shares, valid)
+    flagged = segment_share_drop_mask(recent, baseline, counts, thresholds)
+
+    found = []
+    for i in np.flatnonzero(flagged):
+        dimension_key, segment_code = divmod(int(series_keys[i]), len(segments))
+        campaign_code, dimension_code = divmod(dimension_key, len(dimensions))
+        found.append(
+            (
+                int(campaign_ids[campaign_code]),
+                anomalies.segment_share_drop(
+                    str(dimensions[dimension_code]),
+                    str(segments[segment_code]),
+                    float(recent[i]),
+                    float(baseline[i]),
+                    shares[i][valid[i]].tolist(),
+                ),
+            ),
+        )
+    return anomalies.group_by_campaign(found)
@@ -0,0 +1,108 @@
+"""Mergeable quantile sketches of metric distributions"""
+
+import math
+from typing import Any
+
+import numpy as np
+
+# Values at or below this are counted as zeros rather than in a logarithmic bucket
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch (DDSketch) over non-negative values
+
+    Values are counted in logarithmically sized buckets, so every quantile is
+    answered within ``relative_accuracy`` of a true value of that rank and the
+    size only grows with the log of the value range. Sketches with the same
+    accuracy merge exactly by adding their bucket counts, which lets shards
+    sketch disjoint rows independently and new rows be added at any time.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values) -> "QuantileSketch":
+        """Count an array of values, ignoring NaNs and treating negatives as zeros"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        positive = values[values > MIN_INDEXABLE_VALUE]
+        keys, counts = np.unique(
+            np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+            return_counts=True,
+        )
+        for key, count in zip(keys.tolist(), counts.tolist(), strict=True):
+            self.bins[key] = self.bins.get(key, 0) + count
+
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        self.min = min(self.min, max(float(values.min()), 0.0))
+        self.max = max(self.max, float(values.max()), 0.0)
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Add the counts of another sketch of the same accuracy to this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            msg = "Only sketches of the same relative accuracy can be merged"
+            raise ValueError(msg)
+
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate the value at quantile ``q`` (0 to 1), None for an empty sketch"""
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Bucket key covers (gamma^(key-1), gamma^key]
+                estimate = 2 * self.gamma**key / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        """Compact JSON representation"""
+        keys = sorted(self.bins)
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "zero_count": self.zero_count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "keys": keys,
+            "counts": [self.bins[key] for key in keys],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "QuantileSketch":
+        """Rebuild a sketch from its to_dict representation"""
+        sketch = cls(data["relative_accuracy"])
+        sketch.bins = dict(zip(data["keys"], data["counts"], strict=True))
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        if data["count"]:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
@@ -0,0 +1,226 @@
+"""SQL pushdown backend running the detectors as window-function queries in Postgres"""
+
+from datetime import date
+from typing import Any
+
+from django.db import connection
+
+from . import anomalies
+from .thresholds import DEFAULT_THRESHOLDS
+from .thresholds import ThresholdSet
+
+# Every metric series is reduced to its most recent positive value (position 1)
+# and the mean of the values that precede it inside the lookback window.
+# Only the rows breaching a detector condition are returned.
+DETECTION_QUERY = """
+WITH windowed AS (
+    SELECT
+        dm.id,
+        dm.campaign_id,
+        dm.date,
+        dm.clicks,
+        dm.conversions,
+        dm.spend::double precision AS spend,
+        dm.ctr,
+        dm.cpc,
+        dm.cpa,
+        dm.roas,
+        ROW_NUMBER() OVER latest AS position,
+        COUNT(*) OVER (PARTITION BY dm.campaign_id) AS row_count
+    FROM daily_metrics dm
+    WHERE dm.campaign_id IN ({campaigns})
+        AND dm.date BETWEEN %s AND %s
+    WINDOW latest AS (PARTITION BY dm.campaign_id ORDER BY dm.date DESC, dm.id DESC)
+),
+series AS (
+    SELECT campaign_id, 'ctr' AS metric, date, id, ctr AS value
+    FROM windowed WHERE row_count >= 3 AND ctr > 0
+    UNION ALL
+    SELECT campaign_id, 'cpc', date, id, cpc
+    FROM windowed WHERE row_count >= 3 AND cpc > 0
+    UNION ALL
+    SELECT campaign_id, 'spend', date, id, spend
+    FROM windowed WHERE row_count >= 3 AND spend > 0
+    UNION ALL
+    SELECT
+        campaign_id, 'conversion_rate', date, id,
+        conversions::double precision / clicks * 100
+    FROM windowed WHERE row_count >= 3 AND clicks > 0
+),
+stats AS (
+    SELECT
+        campaign_id,
+        metric,
+        value AS recent_value,
+        ROW_NUMBER() OVER latest AS position,
+        COUNT(*) OVER (PARTITION BY campaign_id, metric) AS value_count,
+        AVG(value) OVER (
+            latest ROWS BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING
+        ) AS baseline_value,
+        ARRAY_AGG(value) OVER (
+            latest ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+        ) AS historical_values
+    FROM series
+    WINDOW latest AS (PARTITION BY campaign_id, metric ORDER BY date DESC, id DESC)
+),
+thresholds (platform, objective, min_ctr, max_cpa, min_roas) AS (
+    VALUES {thresholds}
+)
+SELECT
+    s.campaign_id,
+    s.metric,
+    s.recent_value,
+    s.baseline_value,
+    s.historical_values,
+    c.platform,
+    c.objective,
+    c.budget::double precision / 30 AS daily_budget,
+    l.clicks,
+    l.conversions,
+    l.ctr,
+    l.cpa,
+    l.roas
+FROM stats s
+JOIN campaigns c ON c.id = s.campaign_id
+JOIN windowed l ON l.campaign_id = s.campaign_id AND l.position = 1
+WHERE s.position = 1
+    AND s.value_count >= 3
+    AND (
+        (s.metric = 'ctr' AND s.recent_value < s.baseline_value * %s)
+        OR (s.metric = 'cpc' AND s.recent_value > s.baseline_value * %s)
+        OR (s.metric = 'spend' AND (
+            s.recent_value > s.baseline_value * %s
+            OR s.recent_value > c.budget::double precision / 30 * %s
+        ))
+        OR (s.metric = 'conversion_rate'
+            AND s.recent_value < s.baseline_value * %s
+            AND s.baseline_value > %s)
+    )
+UNION ALL
+SELECT
+    l.campaign_id,
+    'thresholds',
+    NULL,
+    NULL,
+    NULL,
+    c.platform,
+    c.objective,
+    NULL,
+    l.clicks,
+    l.conversions,
+    l.ctr,
+    l.cpa,
+    l.roas
+FROM windowed l
+JOIN campaigns c ON c.id = l.campaign_id
+LEFT JOIN thresholds o ON o.platform = c.platform AND o.objective = c.objective
+LEFT JOIN thresholds t ON t.platform = c.platform AND t.objective IS NULL
+JOIN thresholds d ON d.platform = %s AND d.objective IS NULL
+WHERE l.position = 1
+    AND l.row_count >= 3
+    AND (
+        l.ctr < COALESCE(o.min_ctr, t.min_ctr, d.min_ctr)
+        OR l.cpa > COALESCE(o.max_cpa, t.max_cpa, d.max_cpa)
+        OR l.roas < COALESCE(o.min_roas, t.min_roas, d.min_roas)
+    )
+"""
+
+
+def detect_anomalies_sql(
+    campaigns,
+    start_date: date,
+    end_date: date,
+    thresholds: ThresholdSet = DEFAULT_THRESHOLDS,
+) -> dict[int, list[dict[str, Any]]]:
+    """Run the detectors in Postgres and build anomalies of breaching campaigns only"""
+    campaigns_sql, campaigns_params = campaigns.values("id").query.sql_with_params()
+    # Platform thresholds have no objective; objective thresholds take precedence over
+    # them
+    threshold_rows = [
+        (platform, None, limits)
+        for platform, limits in thresholds.platform_thresholds.items()
+    ] + [
+        (platform, objective, limits)
+        for platform, objectives in thresholds.objective_thresholds.items()
+        for objective, limits in objectives.items()
+    ]
+    thresholds_row = (
+        "(%s, %s::varchar, %s::double precision, %s::double precision, "
+        "%s::double precision)"
+    )
+    thresholds_sql = ", ".join([thresholds_row] * len(threshold_rows))
+    thresholds_params = [
+        value
+        for platform, objective, limits in threshold_rows
+        for value in (
+            platform,
+            objective,
+            limits["min_ctr"],
+            limits["max_cpa"],
+            limits["min_roas"],
+        )
+    ]
+    factor_params = [
+        thresholds.ctr_drop_factor,
+        thresholds.cpc_spike_factor,
+        thresholds.spend_baseline_factor,
+        thresholds.spend_budget_factor,
+        thresholds.conversion_drop_factor,
+        thresholds.min_conversion_baseline,
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            DETECTION_QUERY.format(campaigns=campaigns_sql, thresholds=thresholds_sql),
+            [
+                *campaigns_params,
+                start_date,
+                end_date,
+                *thresholds_params,
+                *factor_params,
+                thresholds.default_platform,
+            ],
+        )
+        rows = cursor.fetchall()
+
+    found = []
+    for (
+        campaign_id,
+        metric,
+        recent,
+        baseline,
+        history,
+        platform,
+        objective,
+        daily_budget,
+        clicks,
+        conversions,
+        ctr,
+        cpa,
+        roas,
+    ) in rows:
+        if metric == "ctr":
+            anomaly = anomalies.ctr_drop(recent, baseline, history)
+        elif metric == "cpc":
+            anomaly = anomalies.cpc_spike(recent, baseline, history)
+        elif metric == "spend":
+            anomaly = anomalies.spend_spike(recent, baseline, daily_budget, history)
+        elif metric == "conversion_rate":
+            anomaly = anomalies.conversion_drop(
+                recent,
+                baseline,
+                history,
+                clicks=clicks,
+                conversions=conversions,
+            )
+        else:
+            anomaly = anomalies.performance_threshold(
+                platform,
+                ctr,
+                cpa,
+                roas,
+                thresholds.for_campaign(platform, objective),
+            )
+        found.append((campaign_id, anomaly))
+
+    return anomalies.group_by_campaign(found)
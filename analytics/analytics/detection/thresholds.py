@@ -0,0 +1,77 @@
+"""Tunable factors and platform thresholds the detectors flag anomalies with"""
+
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+
+from .anomalies import DEFAULT_PLATFORM
+from .anomalies import PLATFORM_THRESHOLDS
+
+
+@dataclass(frozen=True)
+class ThresholdSet:
+    """One set of detector thresholds, the defaults being those alerts are raised at"""
+
+    ctr_drop_factor: float = 0.6  # Recent CTR below 60% of the baseline
+    cpc_spike_factor: float = 1.5  # Recent CPC above 150% of the baseline
+    spend_baseline_factor: float = 2.0  # Recent spend above 200% of the baseline
+    spend_budget_factor: float = 1.5  # Recent spend above 150% of the daily budget
+    conversion_drop_factor: float = (
+        0.5  # Recent conversion rate below 50% of the baseline
+    )
+    min_conversion_baseline: float = (
+        1.0  # Conversion drops need a baseline rate above 1%
+    )
+    segment_share_drop_factor: float = (
+        0.5  # Recent segment share below 50% of the baseline
+    )
+    min_segment_share: float = 0.15  # Share drops need a baseline share of at least 15%
+    platform_thresholds: dict[str, dict[str, float]] = field(
+        default_factory=lambda: dict(PLATFORM_THRESHOLDS),
+    )
+    default_platform: str = (
+        DEFAULT_PLATFORM  # Platform whose thresholds apply to unknown platforms
+    )
+    # Thresholds of a platform's campaigns with a given objective, by platform and
+    # objective
+    objective_thresholds: dict[str, dict[str, dict[str, float]]] = field(
+        default_factory=dict,
+    )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ThresholdSet":
+        """Build a threshold set overriding default factors and platform thresholds"""
+        data = dict(data)
+        overrides = data.pop("platform_thresholds", {})
+        platform_thresholds = {
+            platform: {
+                **PLATFORM_THRESHOLDS.get(
+                    platform,
+                    PLATFORM_THRESHOLDS[DEFAULT_PLATFORM],
+                ),
+                **values,
+            }
+            for platform, values in overrides.items()
+        }
+        return cls(
+            **data,
+            platform_thresholds={**PLATFORM_THRESHOLDS, **platform_thresholds},
+        )
+
+    def for_platform(self, platform: str) -> dict[str, float]:
+        """Return the thresholds of a platform, falling back to the default platform"""
+        return self.platform_thresholds.get(
+            platform,
+            self.platform_thresholds[self.default_platform],
+        )
+
+    def for_campaign(self, platform: str, objective: str) -> dict[str, float]:
+        """Return the thresholds of a platform's campaigns with an objective
+
+        Objectives without thresholds of their own fall back to the platform's.
+        """
+        limits = self.objective_thresholds.get(platform, {}).get(objective)
+        return limits if limits is not None else self.for_platform(platform)
+
+
+DEFAULT_THRESHOLDS = ThresholdSet()
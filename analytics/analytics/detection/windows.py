@@ -0,0 +1,165 @@
+"""Columnar loading of daily metrics for batch anomaly detection"""
+
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from analytics.models import DailyMetric
+
+# Numeric DailyMetric columns loaded into the value arrays (JSON columns are never read)
+METRIC_FIELDS = (
+    "impressions",
+    "clicks",
+    "conversions",
+    "spend",
+    "ctr",
+    "cpc",
+    "cpa",
+    "roas",
+)
+
+
+@dataclass
+class MetricWindows:
+    """Per-campaign lookback windows packed into dense arrays
+
+    Row ``i`` belongs to ``campaign_ids[i]``; column ``0`` is the most recent
+    metric of that campaign. Positions past ``row_counts[i]`` are NaN padded.
+    """
+
+    campaign_ids: np.ndarray  # (campaigns,)
+    dates: np.ndarray  # (campaigns, days) date ordinals, 0 padded
+    values: np.ndarray  # (campaigns, days, len(METRIC_FIELDS))
+    row_counts: np.ndarray  # (campaigns,)
+
+    def __len__(self):
+        return len(self.campaign_ids)
+
+    def column(self, field: str) -> np.ndarray:
+        """Return a (campaigns, days) array for one metric field"""
+        return self.values[:, :, METRIC_FIELDS.index(field)]
+
+    def select(self, mask: np.ndarray) -> "MetricWindows":
+        """Return the windows of the campaigns selected by a boolean mask"""
+        return MetricWindows(
+            campaign_ids=self.campaign_ids[mask],
+            dates=self.dates[mask],
+            values=self.values[mask],
+            row_counts=self.row_counts[mask],
+        )
+
+
+@dataclass
+class MetricFrame:
+    """Flat daily metric columns sorted by campaign and then by date descending"""
+
+    campaign_ids: np.ndarray  # (rows,)
+    dates: np.ndarray  # (rows,) date ordinals
+    values: np.ndarray  # (rows, len(METRIC_FIELDS))
+
+    @classmethod
+    def load(cls, campaigns, start_date: date, end_date: date) -> "MetricFrame":
+        """Load metrics of campaigns (queryset or ids) between two dates in one query"""
+        rows = list(
+            DailyMetric.objects.filter(
+                campaign__in=campaigns,
+                date__gte=start_date,
+                date__lte=end_date,
+            )
+            .order_by("campaign_id", "-date", "-id")
+            .values_list("campaign_id", "date", *METRIC_FIELDS),
+        )
+
+        if not rows:
+            return cls(
+                campaign_ids=np.empty(0, dtype=np.int64),
+                dates=np.empty(0, dtype=np.int64),
+                values=np.empty((0, len(METRIC_FIELDS)), dtype=float),
+            )
+
+        return cls(
+            campaign_ids=np.fromiter(
+                (row[0] for row in rows),
+                dtype=np.int64,
+                count=len(rows),
+            ),
+            dates=np.fromiter(
+                (row[1].toordinal() for row in rows),
+                dtype=np.int64,
+                count=len(rows),
+            ),
+            values=np.array([row[2:] for row in rows], dtype=float),
+        )
+
+    def window(self, end_date: date, days_back: int) -> MetricWindows:
+        """Slice the lookback window ending at ``end_date`` for every campaign"""
+        end = end_date.toordinal()
+        return self._pack((self.dates >= end - days_back) & (self.dates <= end))
+
+    def trailing_windows(self, days_back: int) -> MetricWindows:
+        """Slice the lookback window ending at each campaign's own latest metric date"""
+        _, starts, counts = np.unique(
+            self.campaign_ids,
+            return_index=True,
+            return_counts=True,
+        )
+        latest = np.repeat(self.dates[starts], counts)
+        return self._pack(self.dates >= latest - days_back)
+
+    def daily_windows(self, start_date: date, end_date: date, days_back: int):
+        """Slice the lookback windows of every analysis date between two dates at once
+
+        Returns the windows, one row per campaign and analysis date with data,
+        and the analysis date ordinal of every row.
+        """
+        # Every metric falls into the windows of the days_back + 1 analysis dates
+        # following it
+        offsets = np.arange(days_back + 1)
+        rows = np.repeat(np.arange(len(self.dates)), len(offsets))
+        analysis_dates = (self.dates[:, None] + offsets).ravel()
+        keep = (analysis_dates >= start_date.toordinal()) & (
+            analysis_dates <= end_date.toordinal()
+        )
+        rows, analysis_dates = rows[keep], analysis_dates[keep]
+
+        # Group by analysis date and campaign; frame order keeps the most recent metric
+        # first
+        order = np.lexsort((rows, self.campaign_ids[rows], analysis_dates))
+        rows, analysis_dates = rows[order], analysis_dates[order]
+
+        group_starts = np.ones(len(rows), dtype=bool)
+        group_starts[1:] = (analysis_dates[1:] != analysis_dates[:-1]) | (
+            self.campaign_ids[rows[1:]] != self.campaign_ids[rows[:-1]]
+        )
+        return self._pack_rows(rows, group_starts), analysis_dates[group_starts]
+
+    def _pack(self, mask: np.ndarray) -> MetricWindows:
+        """Pack the selected rows into one dense window per campaign"""
+        rows = np.flatnonzero(mask)
+        campaign_ids = self.campaign_ids[rows]
+        group_starts = np.ones(len(rows), dtype=bool)
+        group_starts[1:] = campaign_ids[1:] != campaign_ids[:-1]
+        return self._pack_rows(rows, group_starts)
+
+    def _pack_rows(self, rows: np.ndarray, group_starts: np.ndarray) -> MetricWindows:
+        """Pack rows, sorted by window and latest metric first, into dense windows"""
+        starts = np.flatnonzero(group_starts)
+        counts = np.diff(np.append(starts, len(rows)))
+        width = int(counts.max()) if len(counts) else 0
+
+        # Position of every row inside its window (0 = most recent)
+        groups = np.repeat(np.arange(len(starts)), counts)
+        positions = np.arange(len(rows)) - np.repeat(starts, counts)
+
+        packed_dates = np.zeros((len(starts), width), dtype=np.int64)
+        packed_values = np.full((len(starts), width, len(METRIC_FIELDS)), np.nan)
+        packed_dates[groups, positions] = self.dates[rows]
+        packed_values[groups, positions] = self.values[rows]
+
+        return MetricWindows(
+            campaign_ids=self.campaign_ids[rows[starts]],
+            dates=packed_dates,
+            values=packed_values,
+            row_counts=counts,
+        )
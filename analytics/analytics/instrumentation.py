@@ -0,0 +1,116 @@
+"""Timing, query accounting and profiling of analysis runs and API views"""
+
+import cProfile
+import io
+import logging
+import pstats
+import time
+from contextlib import contextmanager
+from typing import Self
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when code runs more queries than its budget allows with strict budgets"""
+
+
+class StageTimer:
+    """Accumulate the wall time spent in named stages of a run"""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = (
+                self.seconds.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    def rounded(self, digits: int = 4) -> dict[str, float]:
+        """Stage timings rounded for storage"""
+        return {name: round(seconds, digits) for name, seconds in self.seconds.items()}
+
+
+class QueryStats:
+    """Database execute wrapper counting queries, their time and the rows they return
+
+    Install it with ``connection.execute_wrapper(stats)`` around the code to
+    account for.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+            rowcount = getattr(context.get("cursor"), "rowcount", -1)
+            if rowcount > 0 and sql.lstrip()[:6].upper() in ("SELECT", "WITH"):
+                self.rows += rowcount
+
+
+def check_query_budget(name: str, stats: QueryStats, budget: int | None = None):
+    """Warn, or raise with strict budgets, when ``name`` runs over its query budget
+
+    The budget defaults to the entry of ``name`` in ANALYTICS_QUERY_BUDGETS;
+    names without one are not checked.
+    """
+    if budget is None:
+        budget = settings.ANALYTICS_QUERY_BUDGETS.get(name)
+    if budget is None or stats.count <= budget:
+        return
+
+    msg = (
+        f"{name} ran {stats.count} queries ({stats.seconds:.3f}s), "
+        f"over its budget of {budget}"
+    )
+    if settings.ANALYTICS_QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(msg)
+    logger.warning(msg)
+
+
+@contextmanager
+def query_budget(name: str, budget: int | None = None):
+    """Count the queries of the block and check them against the budget of ``name``"""
+    stats = QueryStats()
+    with connection.execute_wrapper(stats):
+        yield stats
+    check_query_budget(name, stats, budget)
+
+
+class Profiler:
+    """Deterministic cProfile profiler keeping its report as text, off unless enabled"""
+
+    def __init__(self, *, enabled: bool = True):
+        self.enabled = enabled
+        self.report = ""
+        self._profile = cProfile.Profile() if enabled else None
+
+    def __enter__(self) -> Self:
+        if self.enabled:
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.enabled:
+            return
+        self._profile.disable()
+        stream = io.StringIO()
+        pstats.Stats(self._profile, stream=stream).sort_stats("cumulative").print_stats(
+            settings.ANALYTICS_PROFILE_LINES,
+        )
+        self.report = stream.getvalue()
@@ -0,0 +1,150 @@
+"""Redis leases that keep overlapping analysis runs from processing the same work"""
+
+import logging
+import threading
+import uuid
+from collections.abc import Iterable
+from typing import Self
+
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+LEASE_KEY = "analytics:lease:{name}"
+
+# Claim every free key, or a key the token already holds (a retry of the same run)
+ACQUIRE_SCRIPT = """
+local claimed = {}
+for i, key in ipairs(KEYS) do
+    if redis.call("set", key, ARGV[1], "NX", "PX", ARGV[2])
+        or redis.call("get", key) == ARGV[1] then
+        redis.call("pexpire", key, ARGV[2])
+        claimed[#claimed + 1] = i
+    end
+end
+return claimed
+"""
+# Extend the keys the token still holds and count them
+RENEW_SCRIPT = """
+local renewed = 0
+for _, key in ipairs(KEYS) do
+    if redis.call("get", key) == ARGV[1] then
+        redis.call("pexpire", key, ARGV[2])
+        renewed = renewed + 1
+    end
+end
+return renewed
+"""
+# Delete the keys the token still holds, leaving ones that expired and were claimed by
+# others
+RELEASE_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call("get", key) == ARGV[1] then
+        redis.call("del", key)
+        released = released + 1
+    end
+end
+return released
+"""
+
+
+class LeaseGroup:
+    """Expiring Redis leases on named pieces of work, all held with one token
+
+    Leases expire after ``ttl`` seconds unless renewed, so work claimed by a
+    worker that died is freed again; while used as a context manager a
+    heartbeat thread renews them every third of the TTL and they are released
+    on exit. A retry of a run passing the same token reclaims its own leases.
+
+    Redis being unavailable must not stop the analysis, so every lease is then
+    considered claimed and overlapping runs may duplicate work again.
+    """
+
+    def __init__(self, token: str | None, ttl: int):
+        self.token = token or uuid.uuid4().hex
+        self.ttl_ms = int(ttl * 1000)
+        self.names: list[str] = []
+        self._heartbeat: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def __enter__(self) -> Self:
+        self._stopped.clear()
+        self._heartbeat = threading.Thread(
+            target=self._renew_until_stopped,
+            name="lease-heartbeat",
+            daemon=True,
+        )
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._heartbeat.join()
+        self.release()
+
+    def acquire(self, names: Iterable[str]) -> list[str]:
+        """Claim the named leases that are free and return the names now held"""
+        names = list(names)
+        if not names:
+            return []
+        try:
+            claimed = self._run(ACQUIRE_SCRIPT, names)
+        except RedisError as exc:
+            logger.warning("Could not acquire leases, proceeding without them: %s", exc)
+            claimed = range(1, len(names) + 1)
+
+        held = [names[i - 1] for i in claimed]
+        self.names.extend(held)
+        return held
+
+    def renew(self) -> int:
+        """Extend the held leases by the TTL and return how many are still held"""
+        names = list(self.names)
+        if not names:
+            return 0
+        try:
+            return self._run(RENEW_SCRIPT, names)
+        except RedisError as exc:
+            logger.warning("Could not renew leases: %s", exc)
+            return len(names)
+
+    def release(self) -> int:
+        """Give up the held leases"""
+        names, self.names = self.names, []
+        if not names:
+            return 0
+        try:
+            return self._run(RELEASE_SCRIPT, names)
+        except RedisError as exc:
+            logger.warning(
+                "Could not release leases, they expire in %.0fs: %s",
+                self.ttl_ms / 1000,
+                exc,
+            )
+            return 0
+
+    def _run(self, script: str, names: list[str]):
+        # Prefixed like cache keys, so that environments sharing a Redis keep their
+        # leases apart
+        keys = [cache.make_key(LEASE_KEY.format(name=name)) for name in names]
+        return get_redis_connection("default").eval(
+            script,
+            len(keys),
+            *keys,
+            self.token,
+            self.ttl_ms,
+        )
+
+    def _renew_until_stopped(self):
+        while not self._stopped.wait(self.ttl_ms / 3000):
+            expected = len(self.names)
+            held = self.renew()
+            if held < expected:
+                logger.warning(
+                    "%d leases of %s expired before renewal",
+                    expected - held,
+                    self.token,
+                )
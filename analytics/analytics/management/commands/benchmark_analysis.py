@@ -0,0 +1,150 @@
+import json
+import random
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection
+from django.utils import timezone
+
+from analytics.benchmarks import clear_isolated_cache
+from analytics.benchmarks import current_commit
+from analytics.benchmarks import generate_dataset
+from analytics.benchmarks import isolated_cache
+from analytics.benchmarks import load_fixture_generator
+from analytics.benchmarks import measure_analysis
+from analytics.benchmarks import prepare_derived_tables
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark analyze_campaign_performance on synthetic datasets of increasing "
+        "size in a separate database and report its wall time, query count, peak RSS "
+        "and rows per second as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            type=int,
+            nargs="+",
+            default=[10, 1000, 10000, 100000],
+            help="Numbers of campaigns to benchmark",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=180,
+            help="Days of daily metrics per campaign",
+        )
+        parser.add_argument(
+            "--days-back",
+            type=int,
+            default=7,
+            help="Number of days to look back for analysis",
+        )
+        parser.add_argument(
+            "--backend",
+            help="Detection backend (default: settings.ANALYTICS_DETECTION_BACKEND)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed of the generated data",
+        )
+        # The generator lives at the repository root, outside the application image
+        parser.add_argument(
+            "--generator",
+            type=Path,
+            required=True,
+            help=(
+                "Path of generate_marketing_fixture.py, whose distributions the data "
+                "is drawn from (at the root of the repository)"
+            ),
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write the JSON report to (default: stdout)",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Reuse the benchmark database and keep it afterwards",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            generator = load_fixture_generator(options["generator"])
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc)) from exc
+
+        backend = options["backend"] or settings.ANALYTICS_DETECTION_BACKEND
+        analysis_date = timezone.localdate()
+        report = {
+            "commit": current_commit(),
+            "backend": backend,
+            "days": options["days"],
+            "days_back": options["days_back"],
+            "scales": [],
+        }
+
+        # The generated data never touches the configured database or cache
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0,
+            keepdb=options["keepdb"],
+            serialize=False,
+        )
+        try:
+            with isolated_cache():
+                for campaign_count in options["scales"]:
+                    self.stderr.write(f"Benchmarking {campaign_count} campaigns")
+                    call_command("flush", interactive=False, verbosity=0)
+                    clear_isolated_cache()
+                    random.seed(options["seed"])
+
+                    start = time.perf_counter()
+                    metric_rows = generate_dataset(
+                        generator,
+                        campaign_count,
+                        options["days"],
+                        analysis_date,
+                    )
+                    load_seconds = time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    prepare_derived_tables(analysis_date, options["days_back"])
+                    prepare_seconds = time.perf_counter() - start
+
+                    try:
+                        measured = measure_analysis(options["days_back"], backend)
+                    except RuntimeError as exc:
+                        msg = f"Benchmark of {campaign_count} campaigns failed: {exc}"
+                        raise CommandError(msg) from exc
+
+                    report["scales"].append(
+                        {
+                            "campaigns": campaign_count,
+                            "metric_rows": metric_rows,
+                            "load_seconds": round(load_seconds, 3),
+                            "prepare_seconds": round(prepare_seconds, 3),
+                            **measured,
+                        },
+                    )
+        finally:
+            connection.creation.destroy_test_db(
+                old_name,
+                verbosity=0,
+                keepdb=options["keepdb"],
+            )
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with Path(options["output"]).open("w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
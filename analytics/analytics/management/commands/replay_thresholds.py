@@ -0,0 +1,66 @@
+import json
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from analytics.detection import ThresholdSet
+from analytics.detection import active_thresholds
+from analytics.detection import replay_thresholds
+from analytics.models import Campaign
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay candidate detector thresholds over the metrics history and report "
+        "the alerts they would raise"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "threshold_sets",
+            help=(
+                "JSON file mapping set names to overrides of the default thresholds, "
+                'e.g. {"strict": {"ctr_drop_factor": 0.5, '
+                '"platform_thresholds": {"Google": {"min_ctr": 1.5}}}}'
+            ),
+        )
+        parser.add_argument(
+            "--start-date",
+            type=date.fromisoformat,
+            help="First ISO date to replay",
+        )
+        parser.add_argument(
+            "--end-date",
+            type=date.fromisoformat,
+            help="Last ISO date to replay",
+        )
+        parser.add_argument(
+            "--days-back",
+            type=int,
+            default=7,
+            help="Number of days to look back for analysis",
+        )
+
+    def handle(self, *args, **options):
+        with Path(options["threshold_sets"]).open() as f:
+            candidates = json.load(f)
+
+        # The thresholds alerts are raised with are always replayed as the reference,
+        # percentile ones included
+        threshold_sets = {"current": active_thresholds()}
+        threshold_sets.update(
+            {
+                name: ThresholdSet.from_dict(values)
+                for name, values in candidates.items()
+            },
+        )
+
+        report = replay_thresholds(
+            Campaign.objects.filter(status="active"),
+            threshold_sets,
+            start_date=options["start_date"],
+            end_date=options["end_date"],
+            days_back=options["days_back"],
+        )
+        self.stdout.write(json.dumps(report, indent=2, default=str))
@@ -0,0 +1,97 @@
+"""Prometheus metrics of the analysis tasks and the API
+
+The web process serves them at /metrics. Celery's prefork pool records them
+in child processes, so workers run with PROMETHEUS_MULTIPROC_DIR set and an
+exporter in the main worker process aggregates the children's metric files.
+"""
+
+import os
+
+from prometheus_client import REGISTRY
+from prometheus_client import CollectorRegistry
+from prometheus_client import Counter
+from prometheus_client import Histogram
+from prometheus_client import generate_latest
+from prometheus_client import multiprocess
+from prometheus_client import start_http_server
+
+# Task stages and LLM requests take from milliseconds to minutes on large sweeps
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+ANALYSIS_STAGE_SECONDS = Histogram(
+    "analytics_analysis_stage_seconds",
+    "Seconds analysis task executions spent in each stage",
+    ["task", "stage"],
+    buckets=SLOW_BUCKETS,
+)
+ANALYSIS_RUN_SECONDS = Histogram(
+    "analytics_analysis_run_seconds",
+    "Seconds analysis task executions took, by outcome",
+    ["task", "status"],
+    buckets=SLOW_BUCKETS,
+)
+CAMPAIGNS_ANALYZED = Counter(
+    "analytics_campaigns_analyzed",
+    "Campaigns scanned by analysis task executions",
+    ["task"],
+)
+ALERTS_CREATED = Counter(
+    "analytics_alerts_created",
+    "Analysis results created, by severity and type",
+    ["severity", "analysis_type"],
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "analytics_llm_request_seconds",
+    "Seconds requests for recommendations to the LLM service took",
+    buckets=SLOW_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "analytics_llm_prompt_tokens",
+    "Estimated tokens of the prompts sent to the LLM service",
+    buckets=(50, 100, 200, 400, 600, 800, 1200, 1600, 2400, 3200),
+)
+LLM_REQUEST_FAILURES = Counter(
+    "analytics_llm_request_failures",
+    "Failed requests for recommendations to the LLM service, by exception",
+    ["error"],
+)
+RECOMMENDATION_CACHE_LOOKUPS = Counter(
+    "analytics_recommendation_cache_lookups",
+    "Anomaly fingerprints looked up in the recommendation cache, by hit or miss",
+    ["result"],
+)
+NOTIFICATION_PUBLISH_SECONDS = Histogram(
+    "analytics_notification_publish_seconds",
+    "Seconds publishing a notification to RabbitMQ took",
+)
+API_REQUEST_SECONDS = Histogram(
+    "analytics_api_request_seconds",
+    "Seconds API requests took, by route, method and status code",
+    ["route", "method", "status"],
+)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry of this process, or of all processes sharing PROMETHEUS_MULTIPROC_DIR"""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> bytes:
+    """Metrics in the Prometheus text exposition format"""
+    return generate_latest(metrics_registry())
+
+
+def start_worker_exporter(port: int):
+    """Serve the metrics of a Celery worker and its pool processes on ``port``"""
+    start_http_server(port, registry=metrics_registry())
+
+
+def mark_process_dead(pid: int):
+    """Drop the live metrics of a pool process that exited"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.9 on 2026-10-18 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignMetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_days', models.PositiveSmallIntegerField()),
+                ('window_end', models.DateField()),
+                ('row_count', models.IntegerField()),
+                ('ctr_sum', models.FloatField()),
+                ('ctr_count', models.IntegerField()),
+                ('ctr_last', models.FloatField(null=True)),
+                ('cpc_sum', models.FloatField()),
+                ('cpc_count', models.IntegerField()),
+                ('cpc_last', models.FloatField(null=True)),
+                ('spend_sum', models.FloatField()),
+                ('spend_count', models.IntegerField()),
+                ('spend_last', models.FloatField(null=True)),
+                ('conversion_rate_sum', models.FloatField()),
+                ('conversion_rate_count', models.IntegerField()),
+                ('conversion_rate_last', models.FloatField(null=True)),
+                ('latest_clicks', models.IntegerField()),
+                ('latest_conversions', models.IntegerField()),
+                ('latest_ctr', models.FloatField()),
+                ('latest_cpa', models.FloatField()),
+                ('latest_roas', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_rollups', to='analytics.campaign')),
+            ],
+            options={
+                'verbose_name': 'Campaign Metric Rollup',
+                'verbose_name_plural': 'Campaign Metric Rollups',
+                'db_table': 'campaign_metric_rollups',
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'window_days'), name='unique_campaign_rollup_window')],
+            },
+        ),
+    ]
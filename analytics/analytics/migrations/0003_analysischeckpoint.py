@@ -0,0 +1,35 @@
+# Generated by Django 5.1.9 on 2026-10-18 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_campaignmetricrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('completed_types', models.JSONField(default=list)),
+                ('result_ids', models.JSONField(default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='analytics.campaign')),
+            ],
+            options={
+                'verbose_name': 'Analysis Checkpoint',
+                'verbose_name_plural': 'Analysis Checkpoints',
+                'db_table': 'analysis_checkpoints',
+                'constraints': [models.UniqueConstraint(fields=('run_id', 'campaign'), name='unique_run_campaign_checkpoint')],
+            },
+        ),
+    ]
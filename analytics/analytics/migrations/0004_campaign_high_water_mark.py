@@ -0,0 +1,23 @@
+# Generated by Django 5.1.9 on 2026-10-18 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_analysischeckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='last_analyzed_metric_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='last_analyzed_metric_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
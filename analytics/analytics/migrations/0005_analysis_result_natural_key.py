@@ -0,0 +1,33 @@
+# Generated by Django 5.1.9 on 2026-10-18 01:53
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_results(apps, schema_editor):
+    """Keep only the first alert of every campaign, anomaly type, metric and day"""
+    AnalysisResult = apps.get_model('analytics', 'AnalysisResult')
+    duplicates = (
+        AnalysisResult.objects.values('campaign_id', 'analysis_type', 'metric_affected', 'date_detected')
+        .annotate(first_id=Min('id'), result_count=Count('id'))
+        .filter(result_count__gt=1)
+    )
+    for duplicate in duplicates:
+        first_id = duplicate.pop('first_id')
+        duplicate.pop('result_count')
+        AnalysisResult.objects.filter(**duplicate).exclude(id=first_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_campaign_high_water_mark'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='analysisresult',
+            constraint=models.UniqueConstraint(fields=('campaign', 'analysis_type', 'metric_affected', 'date_detected'), name='unique_campaign_daily_analysis_result'),
+        ),
+    ]
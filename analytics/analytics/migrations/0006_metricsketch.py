@@ -0,0 +1,32 @@
+# Generated by Django 5.1.9 on 2026-10-18 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_analysis_result_natural_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('platform', models.CharField(max_length=50)),
+                ('objective', models.CharField(max_length=50)),
+                ('metric', models.CharField(max_length=20)),
+                ('sketch', models.JSONField()),
+                ('value_count', models.BigIntegerField()),
+                ('last_metric_id', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Metric Sketch',
+                'verbose_name_plural': 'Metric Sketches',
+                'db_table': 'metric_sketches',
+                'constraints': [models.UniqueConstraint(fields=('platform', 'objective', 'metric'), name='unique_metric_sketch')],
+            },
+        ),
+    ]
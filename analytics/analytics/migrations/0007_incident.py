@@ -0,0 +1,39 @@
+# Generated by Django 5.1.9 on 2026-10-18 02:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_metricsketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Incident',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('platform', models.CharField(max_length=50)),
+                ('analysis_type', models.CharField(max_length=50)),
+                ('metric_affected', models.CharField(max_length=50)),
+                ('date_detected', models.DateField()),
+                ('severity', models.CharField(max_length=20)),
+                ('description', models.TextField()),
+                ('recommendations', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Incident',
+                'verbose_name_plural': 'Incidents',
+                'db_table': 'incidents',
+                'constraints': [models.UniqueConstraint(fields=('platform', 'analysis_type', 'metric_affected', 'date_detected'), name='unique_platform_daily_incident')],
+            },
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='incident',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analysis_results', to='analytics.incident'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.9 on 2026-10-18 02:08
+
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+POPULATE_CHUNK_SIZE = 5000
+
+
+def populate_segments(apps, schema_editor):
+    """Copy the device and geography breakdowns of the existing daily metrics into segments
+
+    Metrics are streamed and their segments inserted every POPULATE_CHUNK_SIZE
+    rows, so memory stays flat however large the metrics table is.
+    """
+    DailyMetric = apps.get_model('analytics', 'DailyMetric')
+    DailyMetricSegment = apps.get_model('analytics', 'DailyMetricSegment')
+    fields = {'device': 'device_breakdown', 'geography': 'geography'}
+
+    segments = []
+    metrics = DailyMetric.objects.values('id', 'campaign_id', 'date', *fields.values()).order_by('id')
+    for metric in metrics.iterator(chunk_size=POPULATE_CHUNK_SIZE):
+        for dimension, field in fields.items():
+            breakdown = metric[field]
+            if isinstance(breakdown, str):
+                breakdown = json.loads(breakdown or '{}')
+            for segment, share in (breakdown or {}).items():
+                if isinstance(share, (int, float)):
+                    segments.append(DailyMetricSegment(
+                        daily_metric_id=metric['id'],
+                        campaign_id=metric['campaign_id'],
+                        date=metric['date'],
+                        dimension=dimension,
+                        segment=str(segment)[:50],
+                        share=float(share),
+                    ))
+        if len(segments) >= POPULATE_CHUNK_SIZE:
+            DailyMetricSegment.objects.bulk_create(segments)
+            segments = []
+    DailyMetricSegment.objects.bulk_create(segments)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_incident'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetricSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('dimension', models.CharField(choices=[('device', 'Device'), ('geography', 'Geography')], max_length=20)),
+                ('segment', models.CharField(max_length=50)),
+                ('share', models.FloatField()),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_segments', to='analytics.campaign')),
+                ('daily_metric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='analytics.dailymetric')),
+            ],
+            options={
+                'verbose_name': 'Daily Metric Segment',
+                'verbose_name_plural': 'Daily Metric Segments',
+                'db_table': 'daily_metric_segments',
+                'indexes': [models.Index(fields=['campaign', 'date'], name='metric_segment_campaign_date')],
+                'constraints': [models.UniqueConstraint(fields=('daily_metric', 'dimension', 'segment'), name='unique_daily_metric_segment')],
+            },
+        ),
+        migrations.RunPython(populate_segments, migrations.RunPython.noop),
+    ]
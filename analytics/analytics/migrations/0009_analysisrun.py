@@ -0,0 +1,41 @@
+# Generated by Django 5.1.9 on 2026-10-18 02:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_dailymetricsegment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.CharField(blank=True, max_length=255)),
+                ('task', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='running', max_length=20)),
+                ('analysis_date', models.DateField()),
+                ('backend', models.CharField(blank=True, max_length=20)),
+                ('campaigns_scanned', models.IntegerField(default=0)),
+                ('campaigns_skipped', models.IntegerField(default=0)),
+                ('rows_read', models.BigIntegerField(default=0)),
+                ('alerts_generated', models.IntegerField(default=0)),
+                ('stage_seconds', models.JSONField(default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shard_runs', to='analytics.analysisrun')),
+            ],
+            options={
+                'verbose_name': 'Analysis Run',
+                'verbose_name_plural': 'Analysis Runs',
+                'db_table': 'analysis_runs',
+                'indexes': [models.Index(fields=['task', 'started_at'], name='analysis_run_task_started')],
+            },
+        ),
+    ]
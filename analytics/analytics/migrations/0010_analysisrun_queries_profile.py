@@ -0,0 +1,28 @@
+# Generated by Django 5.1.9 on 2026-10-18 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0009_analysisrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisrun',
+            name='profile',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='analysisrun',
+            name='query_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='analysisrun',
+            name='query_seconds',
+            field=models.FloatField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.9 on 2026-10-18 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_analysisrun_queries_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysischeckpoint',
+            name='notified',
+            field=models.BooleanField(default=False),
+        ),
+    ]
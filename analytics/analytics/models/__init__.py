@@ -1,5 +1,21 @@
 from .campaigns import Campaign
 from .daily_metrics import DailyMetric
+from .incidents import Incident
 from .analysis_results import AnalysisResult
+from .metric_rollups import CampaignMetricRollup
+from .analysis_checkpoints import AnalysisCheckpoint
+from .metric_sketches import MetricSketch
+from .metric_segments import DailyMetricSegment
+from .analysis_runs import AnalysisRun
 
-__all__ = ["Campaign", "DailyMetric", "AnalysisResult"]
+__all__ = [
+    "Campaign",
+    "DailyMetric",
+    "AnalysisResult",
+    "Incident",
+    "CampaignMetricRollup",
+    "AnalysisCheckpoint",
+    "MetricSketch",
+    "DailyMetricSegment",
+    "AnalysisRun",
+]
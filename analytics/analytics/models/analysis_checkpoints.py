@@ -0,0 +1,48 @@
+from django.db import models
+
+from .campaigns import Campaign
+
+
+class AnalysisCheckpoint(models.Model):
+    """Progress of one campaign within an analysis run
+
+    ``run_id`` is the Celery task ID of the run, which is stable across the
+    task's retries, so a retried or timed-out run skips the campaigns it has
+    already completed and the anomalies it has already persisted. ``notified``
+    records that the campaign's new alerts were notified, so a run interrupted
+    between saving and notifying them notifies them when it resumes.
+    """
+
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    run_id = models.CharField(max_length=255)
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    completed_types = models.JSONField(default=list)
+    result_ids = models.JSONField(default=list)
+    notified = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "analysis_checkpoints"
+        verbose_name = "Analysis Checkpoint"
+        verbose_name_plural = "Analysis Checkpoints"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["run_id", "campaign"],
+                name="unique_run_campaign_checkpoint",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.run_id} - {self.campaign.name} ({self.status})"
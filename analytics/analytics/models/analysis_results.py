@@ -1,8 +1,15 @@
 from django.db import models
 from .campaigns import Campaign
+from .incidents import Incident
 
 
 class AnalysisResult(models.Model):
+    """An alert raised for a campaign anomaly
+
+    A campaign gets at most one alert per anomaly type, metric and day, so
+    re-running the analysis of a day updates its alerts instead of repeating them.
+    """
+
     analysis_type = models.CharField(max_length=50)
     campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE)
     date_detected = models.DateField()
@@ -10,12 +17,30 @@ class AnalysisResult(models.Model):
     metric_affected = models.CharField(max_length=50)
     description = models.TextField()
     recommendations = models.JSONField()
+    incident = models.ForeignKey(
+        Incident,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="analysis_results",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "analysis_results"
         verbose_name = "Analysis Result"
         verbose_name_plural = "Analysis Results"
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "campaign",
+                    "analysis_type",
+                    "metric_affected",
+                    "date_detected",
+                ],
+                name="unique_campaign_daily_analysis_result",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.campaign.name} - {self.date_detected}"
@@ -0,0 +1,67 @@
+from django.db import models
+from django.utils import timezone
+
+
+class AnalysisRun(models.Model):
+    """One execution of an analysis task with its counts and per-stage timings
+
+    Runs of a dispatched sweep record their coordinator as ``parent``, which
+    holds the totals of its shards once they are merged. ``stage_seconds``
+    maps each stage (query, detection, alerts, db_write, notification) to the
+    seconds spent in it; ``query_count`` and ``query_seconds`` cover every
+    database query of the run.
+    """
+
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_SKIPPED = "skipped"
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_SKIPPED, "Skipped"),
+    ]
+
+    run_id = models.CharField(max_length=255, blank=True)
+    task = models.CharField(max_length=100)
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="shard_runs",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_RUNNING,
+    )
+    analysis_date = models.DateField()
+    backend = models.CharField(max_length=20, blank=True)
+    campaigns_scanned = models.IntegerField(default=0)
+    campaigns_skipped = models.IntegerField(default=0)
+    rows_read = models.BigIntegerField(default=0)
+    alerts_generated = models.IntegerField(default=0)
+    stage_seconds = models.JSONField(default=dict)
+    query_count = models.IntegerField(default=0)
+    query_seconds = models.FloatField(default=0)
+    # cProfile report of profiled runs
+    profile = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "analysis_runs"
+        verbose_name = "Analysis Run"
+        verbose_name_plural = "Analysis Runs"
+        indexes = [
+            models.Index(
+                fields=["task", "started_at"],
+                name="analysis_run_task_started",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} {self.run_id} ({self.status})"
@@ -1,5 +1,25 @@
 from django.db import models
 
+
+class CampaignQuerySet(models.QuerySet):
+    def with_new_metrics(self):
+        """Campaigns that received daily metrics since their last analysis"""
+        from .daily_metrics import DailyMetric
+
+        new_metrics = DailyMetric.objects.filter(campaign=models.OuterRef("pk"))
+        return self.filter(
+            models.Exists(new_metrics)
+            & (
+                models.Q(last_analyzed_metric_id__isnull=True)
+                | models.Exists(
+                    new_metrics.filter(
+                        id__gt=models.OuterRef("last_analyzed_metric_id"),
+                    ),
+                )
+            ),
+        )
+
+
 class Campaign(models.Model):
     name = models.CharField(max_length=200)
     platform = models.CharField(max_length=50)
@@ -9,9 +29,14 @@ class Campaign(models.Model):
     budget = models.DecimalField(max_digits=10, decimal_places=2)
     audience_segment = models.CharField(max_length=200)
     status = models.CharField(max_length=20)
+    # High-water mark of the daily metrics covered by the last analysis
+    last_analyzed_metric_id = models.BigIntegerField(null=True, blank=True)
+    last_analyzed_metric_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CampaignQuerySet.as_manager()
+
     class Meta:
         db_table = "campaigns"
         verbose_name = "Campaign"
@@ -0,0 +1,38 @@
+from django.db import models
+
+
+class Incident(models.Model):
+    """Simultaneous anomalies of the same kind across a platform's campaigns
+
+    Platform outages make many campaigns raise the same anomaly on the same
+    day; their alerts link to one incident, which gets the recommendations
+    and the notification instead of every alert getting its own.
+    """
+
+    platform = models.CharField(max_length=50)
+    analysis_type = models.CharField(max_length=50)
+    metric_affected = models.CharField(max_length=50)
+    date_detected = models.DateField()
+    severity = models.CharField(max_length=20)
+    description = models.TextField()
+    recommendations = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "incidents"
+        verbose_name = "Incident"
+        verbose_name_plural = "Incidents"
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "platform",
+                    "analysis_type",
+                    "metric_affected",
+                    "date_detected",
+                ],
+                name="unique_platform_daily_incident",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.platform} {self.analysis_type} - {self.date_detected}"
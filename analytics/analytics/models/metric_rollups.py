@@ -0,0 +1,63 @@
+from django.db import models
+
+from .campaigns import Campaign
+
+
+class CampaignMetricRollup(models.Model):
+    """Statistics of a campaign's detector metrics over a trailing window
+
+    The window covers ``window_days`` days back from ``window_end``, the date
+    of the campaign's latest metric. For every metric the sum and count of the
+    values the detectors consider (positive values, or days with clicks for the
+    conversion rate) are kept together with the most recent of those values.
+    They are not updated in place: writes to a campaign's daily metrics schedule
+    a recompute of its rollups from the trailing metrics.
+    """
+
+    WINDOW_SIZES = (7, 14, 30)
+    METRICS = ("ctr", "cpc", "spend", "conversion_rate")
+
+    campaign = models.ForeignKey(
+        Campaign,
+        on_delete=models.CASCADE,
+        related_name="metric_rollups",
+    )
+    window_days = models.PositiveSmallIntegerField()
+    window_end = models.DateField()
+    row_count = models.IntegerField()
+
+    ctr_sum = models.FloatField()
+    ctr_count = models.IntegerField()
+    ctr_last = models.FloatField(null=True)
+    cpc_sum = models.FloatField()
+    cpc_count = models.IntegerField()
+    cpc_last = models.FloatField(null=True)
+    spend_sum = models.FloatField()
+    spend_count = models.IntegerField()
+    spend_last = models.FloatField(null=True)
+    conversion_rate_sum = models.FloatField()
+    conversion_rate_count = models.IntegerField()
+    conversion_rate_last = models.FloatField(null=True)
+
+    # Latest day of the window, used by the threshold check
+    latest_clicks = models.IntegerField()
+    latest_conversions = models.IntegerField()
+    latest_ctr = models.FloatField()
+    latest_cpa = models.FloatField()
+    latest_roas = models.FloatField()
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "campaign_metric_rollups"
+        verbose_name = "Campaign Metric Rollup"
+        verbose_name_plural = "Campaign Metric Rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["campaign", "window_days"],
+                name="unique_campaign_rollup_window",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign.name} - {self.window_days} days to {self.window_end}"
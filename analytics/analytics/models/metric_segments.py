@@ -0,0 +1,61 @@
+from django.db import models
+
+from .campaigns import Campaign
+from .daily_metrics import DailyMetric
+
+
+class DailyMetricSegment(models.Model):
+    """Share of a daily metric's traffic falling into one device or geography segment
+
+    A narrow, typed copy of the ``device_breakdown`` and ``geography`` JSON of
+    every daily metric, denormalized with the campaign and date so that the
+    segments of all campaigns over a window are scanned with a single indexed
+    query instead of decoding the JSON row by row.
+    """
+
+    DIMENSION_DEVICE = "device"
+    DIMENSION_GEOGRAPHY = "geography"
+    DIMENSION_CHOICES = [
+        (DIMENSION_DEVICE, "Device"),
+        (DIMENSION_GEOGRAPHY, "Geography"),
+    ]
+    # DailyMetric field every dimension is read from
+    DIMENSION_FIELDS = {
+        DIMENSION_DEVICE: "device_breakdown",
+        DIMENSION_GEOGRAPHY: "geography",
+    }
+
+    daily_metric = models.ForeignKey(
+        DailyMetric,
+        on_delete=models.CASCADE,
+        related_name="segments",
+    )
+    campaign = models.ForeignKey(
+        Campaign,
+        on_delete=models.CASCADE,
+        related_name="metric_segments",
+    )
+    date = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    segment = models.CharField(max_length=50)
+    share = models.FloatField()
+
+    class Meta:
+        db_table = "daily_metric_segments"
+        verbose_name = "Daily Metric Segment"
+        verbose_name_plural = "Daily Metric Segments"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["daily_metric", "dimension", "segment"],
+                name="unique_daily_metric_segment",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["campaign", "date"],
+                name="metric_segment_campaign_date",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign.name} - {self.date} {self.dimension} {self.segment}"
@@ -0,0 +1,38 @@
+from django.db import models
+
+
+class MetricSketch(models.Model):
+    """Quantile sketch of a metric's daily values over the campaigns of a platform and
+    objective
+
+    Sketches are updated incrementally: ``last_metric_id`` is the highest
+    DailyMetric id already counted, so a refresh only reads newer rows. Edits
+    to metrics that were already counted are not reflected.
+    """
+
+    METRICS = ("ctr", "cpa", "roas")
+
+    platform = models.CharField(max_length=50)
+    objective = models.CharField(max_length=50)
+    metric = models.CharField(max_length=20)
+    sketch = models.JSONField()
+    value_count = models.BigIntegerField()
+    last_metric_id = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "metric_sketches"
+        verbose_name = "Metric Sketch"
+        verbose_name_plural = "Metric Sketches"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["platform", "objective", "metric"],
+                name="unique_metric_sketch",
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.platform} {self.objective} - {self.metric} "
+            f"({self.value_count} values)"
+        )
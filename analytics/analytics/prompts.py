@@ -0,0 +1,229 @@
+"""Prompts asking the LLM service for the recommendations of anomalies within a budget
+
+Metric series are summarized to their min, max, mean, trend and last values
+rather than sent in full, and prompts over ANALYTICS_LLM_PROMPT_TOKEN_BUDGET
+are compacted further by trimming the summaries, then the metric data, and
+batches of anomalies are split into several prompts.
+"""
+
+import json
+import logging
+import math
+import re
+from typing import Any
+
+from django.conf import settings
+
+from .models import Campaign
+from .recommendations import MAX_RECOMMENDATIONS
+
+logger = logging.getLogger(__name__)
+
+# Last values of a series and significant digits of numbers kept at each compaction
+# level; None drops the metric data and leaves the description
+COMPACTION_LEVELS = [(7, 4), (3, 3), (0, 2), None]
+# Tokens of the JSON keys and punctuation around each anomaly's recommendations in a
+# batched response
+BATCHED_RESPONSE_OVERHEAD_TOKENS = 10
+
+# Words, numbers and single punctuation marks, each a token or more for BPE tokenizers
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens of ``text`` without a model tokenizer
+
+    Words are counted as a token per four letters, numbers as a token per
+    three digits and every punctuation mark as a token, which stays close to,
+    and mostly above, BPE tokenizer counts for English prompts with metric data.
+    """
+    tokens = 0
+    for piece in TOKEN_PATTERN.findall(text):
+        if piece.isalpha():
+            tokens += math.ceil(len(piece) / 4)
+        elif piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+
+def response_max_tokens(anomaly_count: int) -> int:
+    """Tokens a response may spend on MAX_RECOMMENDATIONS recommendations per anomaly"""
+    per_anomaly = MAX_RECOMMENDATIONS * settings.ANALYTICS_LLM_TOKENS_PER_RECOMMENDATION
+    if anomaly_count > 1:
+        per_anomaly += BATCHED_RESPONSE_OVERHEAD_TOKENS
+    return per_anomaly * anomaly_count
+
+
+def summarize_series(values: list[float], tail: int, digits: int) -> dict[str, Any]:
+    """Min, max, mean, least-squares slope and last ``tail`` values of a series"""
+    values = [value for value in values if value is not None]
+    if not values:
+        return {"points": 0}
+
+    count = len(values)
+    mean = sum(values) / count
+    x_mean = (count - 1) / 2
+    x_variance = sum((x - x_mean) ** 2 for x in range(count))
+    slope = (
+        sum((x - x_mean) * (value - mean) for x, value in enumerate(values))
+        / x_variance
+        if x_variance
+        else 0.0
+    )
+    summary = {
+        "points": count,
+        "min": _round(min(values), digits),
+        "max": _round(max(values), digits),
+        "mean": _round(mean, digits),
+        "trend": _round(slope, digits),
+    }
+    if tail:
+        summary["last"] = [_round(value, digits) for value in values[-tail:]]
+    return summary
+
+
+def compact_metric_data(
+    metric_data: dict[str, Any],
+    tail: int,
+    digits: int,
+) -> dict[str, Any]:
+    """Metric data with summarized series and rounded numbers
+
+    Numbers are rounded to ``digits`` significant digits.
+    """
+    compacted = {}
+    for key, value in metric_data.items():
+        if isinstance(value, dict):
+            compacted[key] = compact_metric_data(value, tail, digits)
+        elif isinstance(value, list) and all(
+            isinstance(item, (int, float)) or item is None for item in value
+        ):
+            compacted[key] = summarize_series(value, tail, digits)
+        elif isinstance(value, float):
+            compacted[key] = _round(value, digits)
+        else:
+            compacted[key] = value
+    return compacted
+
+
+def recommendation_prompts(
+    campaign: Campaign,
+    anomalies: list[dict[str, Any]],
+) -> list[tuple[str, int]]:
+    """Prompts for the recommendations of a campaign's anomalies within the token budget
+
+    All anomalies go in one prompt when it fits ANALYTICS_LLM_PROMPT_TOKEN_BUDGET
+    at some compaction level; otherwise they are split into consecutive
+    batches that do. Returns (prompt, number of anomalies) pairs in order.
+    """
+    budget = settings.ANALYTICS_LLM_PROMPT_TOKEN_BUDGET
+    prompts = []
+    batch = []
+    for anomaly_data in anomalies:
+        if batch and _fitted_prompt(campaign, [*batch, anomaly_data], budget) is None:
+            prompts.append((_compacted_prompt(campaign, batch, budget), len(batch)))
+            batch = []
+        batch.append(anomaly_data)
+    if batch:
+        prompts.append((_compacted_prompt(campaign, batch, budget), len(batch)))
+    return prompts
+
+
+def _compacted_prompt(
+    campaign: Campaign,
+    anomalies: list[dict[str, Any]],
+    budget: int,
+) -> str:
+    prompt = _fitted_prompt(campaign, anomalies, budget)
+    if prompt is None:
+        # Even a lone anomaly without metric data can overrun a tight budget; it is sent
+        # as compact as it gets
+        prompt = _render_prompt(campaign, anomalies, COMPACTION_LEVELS[-1])
+        logger.warning(
+            "Recommendation prompt for campaign %s takes ~%d tokens, over the budget "
+            "of %d",
+            campaign.id,
+            estimate_tokens(prompt),
+            budget,
+        )
+    return prompt
+
+
+def _fitted_prompt(
+    campaign: Campaign,
+    anomalies: list[dict[str, Any]],
+    budget: int,
+) -> str | None:
+    """Prompt at the least compaction level that fits the budget, None if none does"""
+    for level in COMPACTION_LEVELS:
+        prompt = _render_prompt(campaign, anomalies, level)
+        if estimate_tokens(prompt) <= budget:
+            return prompt
+    return None
+
+
+def _render_prompt(
+    campaign: Campaign,
+    anomalies: list[dict[str, Any]],
+    level: tuple[int, int] | None,
+) -> str:
+    lines = [f"Campaign: {campaign.name}", f"Platform: {campaign.platform}", ""]
+    if len(anomalies) == 1:
+        lines += _anomaly_lines(anomalies[0], level)
+        lines += [
+            "",
+            (
+                "Based on this campaign anomaly and the metric data provided, provide "
+                "3-4 specific, actionable recommendations for improving campaign "
+                "performance. Focus on practical steps that can be taken immediately. "
+                "Format each recommendation as a separate item."
+            ),
+        ]
+        return "\n".join(lines)
+
+    lines.append("Anomalies:")
+    for number, anomaly_data in enumerate(anomalies, start=1):
+        lines.append(f"{number}.")
+        lines += _anomaly_lines(anomaly_data, level)
+    lines += [
+        "",
+        (
+            "Based on these campaign anomalies and the metric data provided, provide "
+            "3-4 specific, actionable recommendations for improving campaign "
+            "performance for each anomaly. Focus on practical steps that can be taken "
+            "immediately. Respond with only a JSON object mapping each anomaly number "
+            'to its list of recommendations, like {"1": ["...", "..."], '
+            '"2": ["...", "..."]}.'
+        ),
+    ]
+    return "\n".join(lines)
+
+
+def _anomaly_lines(
+    anomaly_data: dict[str, Any],
+    level: tuple[int, int] | None,
+) -> list[str]:
+    lines = [
+        f"Issue Type: {anomaly_data['type']}",
+        f"Severity: {anomaly_data['severity']}",
+        f"Metric Affected: {anomaly_data['metric']}",
+        f"Description: {anomaly_data['description']}",
+    ]
+    if level is not None:
+        tail, digits = level
+        metric_data = compact_metric_data(
+            anomaly_data.get("metric_data", {}),
+            tail,
+            digits,
+        )
+        lines.append(f"Metric Data: {json.dumps(metric_data, separators=(',', ':'))}")
+    return lines
+
+
+def _round(value: float, digits: int) -> float:
+    """Round to ``digits`` significant digits"""
+    if not value or not math.isfinite(value):
+        return value
+    return round(value, digits - 1 - math.floor(math.log10(abs(value))))
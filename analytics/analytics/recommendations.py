@@ -0,0 +1,237 @@
+"""Recommendations alerts get without a request to the LLM service
+
+Alerts carry rule-based recommendations until the LLM service's replace
+them, and alerts like earlier ones are served the LLM recommendations cached
+under their anomaly fingerprint.
+"""
+
+import logging
+import math
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .metrics import RECOMMENDATION_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Most recommendations kept per alert, as for the LLM service's
+MAX_RECOMMENDATIONS = 4
+
+PLAYBOOKS = {
+    "ctr_drop": [
+        "Refresh the ad creatives, the current ones may be suffering from ad fatigue",
+        "Review the frequency cap and audience overlap of the campaign",
+        "Test new headlines and calls to action against the current ones",
+    ],
+    "cpc_spike": [
+        "Review the bidding strategy and bid caps of the campaign",
+        (
+            "Check auction insights for new competitors on the targeted audience or "
+            "keywords"
+        ),
+        "Shift budget towards placements and keywords with a lower CPC",
+    ],
+    "spend_spike": [
+        "Check the campaign budget and bid settings for unintended changes",
+        "Set a daily spend cap until the cause of the spike is found",
+        "Review automated rules and budget optimization that may have raised spend",
+    ],
+    "conversion_drop": [
+        "Check that the landing page loads and its forms submit",
+        "Verify that conversion tracking still fires on the landing page",
+        "Compare the landing page traffic quality against the previous week",
+    ],
+    "segment_share_drop": [
+        "Check the targeting and placements of the segment for recent changes",
+        "Verify that ads are approved and deliverable for the segment",
+        "Check tracking on the devices or regions of the segment",
+    ],
+}
+# Recommendations for each threshold a performance_threshold alert breaches
+THRESHOLD_PLAYBOOKS = {
+    "min_ctr": "Refresh the creatives and narrow the targeting to raise the CTR",
+    "max_cpa": "Pause the placements and keywords with the highest CPA",
+    "min_roas": "Shift budget towards the audiences and products with the best ROAS",
+}
+DEFAULT_PLAYBOOK = [
+    "Review the campaign settings and the metrics of the affected period",
+]
+
+RECOMMENDATION_CACHE_KEY = "analytics:recommendations:{fingerprint}"
+# Sorted set of the cached fingerprints scored by their last use, to evict the least
+# recently used
+RECOMMENDATION_CACHE_INDEX = "analytics:recommendations:index"
+
+
+def rule_based_recommendations(anomaly_data: dict[str, Any]) -> list[str]:
+    """Recommendations for an anomaly from its type, and the thresholds it breaches"""
+    if anomaly_data["type"] != "performance_threshold":
+        return list(PLAYBOOKS.get(anomaly_data["type"], DEFAULT_PLAYBOOK))[
+            :MAX_RECOMMENDATIONS
+        ]
+
+    recommendations = [
+        THRESHOLD_PLAYBOOKS[threshold]
+        for threshold in breached_thresholds(anomaly_data)
+    ]
+    return (recommendations or list(DEFAULT_PLAYBOOK))[:MAX_RECOMMENDATIONS]
+
+
+def breached_thresholds(anomaly_data: dict[str, Any]) -> list[str]:
+    """Platform thresholds (min_ctr, max_cpa, min_roas) a threshold anomaly breaches"""
+    metric_data = anomaly_data.get("metric_data", {})
+    thresholds = metric_data.get("thresholds", {})
+    values = metric_data.get("current_values", {})
+    breached = {
+        "min_ctr": values.get("ctr", 0) < thresholds.get("min_ctr", 0),
+        "max_cpa": values.get("cpa", 0) > thresholds.get("max_cpa", float("inf")),
+        "min_roas": values.get("roas", 0) < thresholds.get("min_roas", 0),
+    }
+    return [threshold for threshold, hit in breached.items() if hit]
+
+
+def incident_rule_based_recommendations(platform: str, analysis_type: str) -> list[str]:
+    """Recommendations for an anomaly many campaigns of a platform raised at once"""
+    return [
+        (
+            f"Check the {platform} status page and changelog for an outage or policy "
+            "change"
+        ),
+        *PLAYBOOKS.get(analysis_type, DEFAULT_PLAYBOOK),
+    ][:MAX_RECOMMENDATIONS]
+
+
+def anomaly_fingerprint(
+    platform: str,
+    objective: str,
+    anomaly_data: dict[str, Any],
+) -> str:
+    """Normalized key of the anomalies that get the same recommendations
+
+    Anomalies match on platform, objective, type, metric and severity and on their
+    change percentage rounded down to ANALYTICS_RECOMMENDATION_CACHE_BUCKET_PERCENT, or
+    for threshold anomalies on the thresholds they breach.
+    """
+    if anomaly_data["type"] == "performance_threshold":
+        change = "+".join(breached_thresholds(anomaly_data))
+    else:
+        percent = _change_percent(anomaly_data.get("metric_data", {}))
+        bucket = settings.ANALYTICS_RECOMMENDATION_CACHE_BUCKET_PERCENT
+        change = (
+            "" if percent is None else str(int(math.floor(percent / bucket) * bucket))
+        )
+    parts = (
+        platform,
+        objective,
+        anomaly_data["type"],
+        anomaly_data["metric"],
+        anomaly_data["severity"],
+        change,
+    )
+    return ":".join(
+        "_".join(str(part).lower().replace(":", " ").split()) for part in parts
+    )
+
+
+def _change_percent(metric_data: dict[str, Any]) -> float | None:
+    """Signed change of the anomalous value against its baseline, in percent"""
+    if "drop_percentage" in metric_data:
+        return -metric_data["drop_percentage"]
+    if "increase_percentage" in metric_data:
+        return metric_data["increase_percentage"]
+    recent, baseline = (
+        metric_data.get("recent_value"),
+        metric_data.get("baseline_value"),
+    )
+    if recent is None or not baseline:
+        return None
+    return (recent - baseline) / baseline * 100
+
+
+def cached_recommendations(fingerprints: Iterable[str]) -> dict[str, list[str]]:
+    """LLM recommendations cached for anomaly fingerprints, counting hits and misses"""
+    fingerprints = set(fingerprints)
+    if not settings.ANALYTICS_RECOMMENDATION_CACHE or not fingerprints:
+        return {}
+
+    keys = {
+        RECOMMENDATION_CACHE_KEY.format(fingerprint=fingerprint): fingerprint
+        for fingerprint in fingerprints
+    }
+    cached = {
+        keys[key]: recommendations
+        for key, recommendations in cache.get_many(list(keys)).items()
+    }
+    RECOMMENDATION_CACHE_LOOKUPS.labels("hit").inc(len(cached))
+    RECOMMENDATION_CACHE_LOOKUPS.labels("miss").inc(len(fingerprints) - len(cached))
+    if cached:
+        _touch_index(cached)
+    return cached
+
+
+def cache_recommendations(recommendations: dict[str, list[str]]):
+    """Cache LLM recommendations by anomaly fingerprint
+
+    The least recently used entries beyond the size bound are evicted.
+    """
+    if not settings.ANALYTICS_RECOMMENDATION_CACHE or not recommendations:
+        return
+
+    cache.set_many(
+        {
+            RECOMMENDATION_CACHE_KEY.format(
+                fingerprint=fingerprint,
+            ): fingerprint_recommendations
+            for fingerprint, fingerprint_recommendations in recommendations.items()
+        },
+        timeout=settings.ANALYTICS_RECOMMENDATION_CACHE_TTL_SECONDS,
+    )
+    evicted = _touch_index(
+        recommendations,
+        settings.ANALYTICS_RECOMMENDATION_CACHE_MAX_ENTRIES,
+    )
+    if evicted:
+        cache.delete_many(
+            [
+                RECOMMENDATION_CACHE_KEY.format(fingerprint=fingerprint)
+                for fingerprint in evicted
+            ],
+        )
+
+
+def _touch_index(
+    fingerprints: Iterable[str],
+    max_entries: int | None = None,
+) -> list[str]:
+    """Mark fingerprints as used and return those evicted to keep ``max_entries``
+
+    Fingerprints whose entries expired are dropped from the index on the way.
+    """
+    now = time.time()
+    index = cache.make_key(RECOMMENDATION_CACHE_INDEX)
+    try:
+        redis = get_redis_connection("default")
+        pipeline = redis.pipeline()
+        pipeline.zadd(index, dict.fromkeys(fingerprints, now))
+        pipeline.zremrangebyscore(
+            index,
+            "-inf",
+            now - settings.ANALYTICS_RECOMMENDATION_CACHE_TTL_SECONDS,
+        )
+        pipeline.zcard(index)
+        size = pipeline.execute()[-1]
+        if max_entries is None or size <= max_entries:
+            return []
+        return [
+            fingerprint.decode()
+            for fingerprint, _ in redis.zpopmin(index, size - max_entries)
+        ]
+    except RedisError as exc:
+        logger.warning("Could not update the recommendation cache index: %s", exc)
+        return []
@@ -0,0 +1,75 @@
+"""Cadence tiers deciding how often and on which queue campaigns are analyzed"""
+
+from collections.abc import Iterable
+from datetime import date
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db.models import Avg
+
+from analytics.models import Campaign
+from analytics.models import DailyMetric
+
+
+def campaign_daily_spend(campaign_ids: Iterable[int], as_of: date) -> dict[int, float]:
+    """Expected daily spend of campaigns, the higher of recent spend and budget pace
+
+    The budget pace is a thirtieth of the budget, as for the spend detector;
+    recent spend covers the ANALYTICS_TIER_SPEND_DAYS days up to ``as_of``.
+    """
+    campaign_ids = list(campaign_ids)
+    recent_spend = dict(
+        DailyMetric.objects.filter(
+            campaign_id__in=campaign_ids,
+            date__gt=as_of - timedelta(days=settings.ANALYTICS_TIER_SPEND_DAYS),
+            date__lte=as_of,
+        )
+        .values("campaign_id")
+        .annotate(average=Avg("spend"))
+        .values_list("campaign_id", "average"),
+    )
+    return {
+        campaign_id: max(float(budget) / 30, float(recent_spend.get(campaign_id) or 0))
+        for campaign_id, budget in Campaign.objects.filter(
+            id__in=campaign_ids,
+        ).values_list("id", "budget")
+    }
+
+
+def tier_for_spend(daily_spend: float) -> dict[str, Any]:
+    """First cadence tier, from the most expensive, whose minimum daily spend is met"""
+    for tier in settings.ANALYTICS_CADENCE_TIERS:
+        if daily_spend >= tier["min_daily_spend"]:
+            return tier
+    return settings.ANALYTICS_CADENCE_TIERS[-1]
+
+
+def assign_cadence_tiers(
+    campaign_ids: Iterable[int],
+    as_of: date,
+) -> dict[str, list[int]]:
+    """Campaign IDs per cadence tier name, in the order of the tiers"""
+    assigned: dict[str, list[int]] = {
+        tier["name"]: [] for tier in settings.ANALYTICS_CADENCE_TIERS
+    }
+    for campaign_id, daily_spend in sorted(
+        campaign_daily_spend(campaign_ids, as_of).items(),
+    ):
+        assigned[tier_for_spend(daily_spend)["name"]].append(campaign_id)
+    return assigned
+
+
+def campaign_queue(campaign_id: int, as_of: date) -> str:
+    """Queue of the cadence tier a single campaign belongs to"""
+    daily_spend = campaign_daily_spend([campaign_id], as_of).get(campaign_id, 0.0)
+    return tier_for_spend(daily_spend)["queue"]
+
+
+def due_tiers(hour: int) -> list[dict[str, Any]]:
+    """Cadence tiers whose analysis is due in the given hour of the day"""
+    return [
+        tier
+        for tier in settings.ANALYTICS_CADENCE_TIERS
+        if hour % tier["interval_hours"] == 0
+    ]
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from django.dispatch import receiver
+
+from analytics.detection import refresh_metric_segments
+from analytics.models import Campaign
+from analytics.models import DailyMetric
+
+# Sent with the ``campaign_ids`` of the campaigns that received new daily metrics.
+# Saving a DailyMetric sends it; bulk imports that bypass the model signals should send
+# it themselves.
+daily_metrics_ingested = Signal()
+
+
+@receiver(post_save, sender=DailyMetric)
+@receiver(post_delete, sender=DailyMetric)
+def refresh_campaign_rollups(sender, instance, *, raw=False, **kwargs):
+    """Recompute a campaign's rollups in the background once its metrics change"""
+    # Fixture loads are rolled up afterwards by the refresh_campaign_metric_rollups task
+    if raw:
+        return
+
+    from analytics.tasks import enqueue_rollup_refresh
+
+    campaign_id = instance.campaign_id
+    transaction.on_commit(lambda: enqueue_rollup_refresh(campaign_id))
+
+
+@receiver(post_save, sender=DailyMetric)
+def refresh_daily_metric_segments(sender, instance, *, raw=False, **kwargs):
+    """Keep the metric's device and geography segments in sync with its breakdowns"""
+    # Fixture loads are segmented afterwards by the refresh_daily_metric_segments task
+    if raw:
+        return
+    metric_id = instance.id
+    transaction.on_commit(lambda: refresh_metric_segments([metric_id]))
+
+
+@receiver(post_save, sender=DailyMetric)
+@receiver(post_delete, sender=DailyMetric)
+def reset_campaign_high_water_mark(sender, instance, *, created=False, **kwargs):
+    """Make a campaign eligible for analysis again once a metric is edited or deleted"""
+    if created:
+        return
+    Campaign.objects.filter(id=instance.campaign_id).update(
+        last_analyzed_metric_id=None,
+        last_analyzed_metric_date=None,
+    )
+
+
+@receiver(post_save, sender=DailyMetric)
+def announce_ingested_metric(sender, instance, *, created=False, raw=False, **kwargs):
+    """Announce a new daily metric once its transaction commits"""
+    # Fixture loads are analyzed by the scheduled sweep
+    if not created or raw:
+        return
+    campaign_id = instance.campaign_id
+    transaction.on_commit(
+        lambda: daily_metrics_ingested.send(
+            sender=DailyMetric,
+            campaign_ids=[campaign_id],
+        ),
+    )
+
+
+@receiver(daily_metrics_ingested)
+def analyze_ingested_campaigns(sender, campaign_ids, **kwargs):
+    """Analyze campaigns shortly after new metrics land rather than at the sweep"""
+    if not settings.ANALYTICS_INGEST_ANALYSIS:
+        return
+
+    from analytics.tasks import enqueue_campaign_analysis
+
+    for campaign_id in set(campaign_ids):
+        enqueue_campaign_analysis(campaign_id)
@@ -1,337 +1,1923 @@
 from config import celery_app
-from datetime import datetime, timedelta
+from celery import chord
+from celery.exceptions import SoftTimeLimitExceeded
+from datetime import date, datetime, timedelta
 from django.conf import settings
-from django.db import transaction
-from analytics.models import Campaign, DailyMetric, AnalysisResult
-import statistics
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models import OuterRef
+from django.db.models import Subquery
+from django.utils import timezone
+from analytics.detection import (
+    QuantileSketch,
+    detect_anomalies_range,
+    merge_sketches,
+    refresh_metric_rollups,
+    refresh_metric_segments,
+    refresh_seasonal_profiles,
+    run_detection,
+    sketch_metrics,
+    update_metric_sketches,
+)
+from analytics.detection.anomalies import ALERT_SEVERITIES
+from analytics.instrumentation import (
+    Profiler,
+    QueryStats,
+    StageTimer,
+    check_query_budget,
+)
+from analytics.leases import LeaseGroup
+from analytics.metrics import (
+    ALERTS_CREATED,
+    ANALYSIS_RUN_SECONDS,
+    ANALYSIS_STAGE_SECONDS,
+    CAMPAIGNS_ANALYZED,
+    LLM_PROMPT_TOKENS,
+    LLM_REQUEST_FAILURES,
+    LLM_REQUEST_SECONDS,
+    NOTIFICATION_PUBLISH_SECONDS,
+)
+from analytics.models import (
+    AnalysisCheckpoint,
+    AnalysisResult,
+    AnalysisRun,
+    Campaign,
+    DailyMetric,
+    Incident,
+    MetricSketch,
+)
+from analytics.prompts import (
+    estimate_tokens,
+    recommendation_prompts,
+    response_max_tokens,
+)
+from analytics.recommendations import (
+    MAX_RECOMMENDATIONS,
+    anomaly_fingerprint,
+    cache_recommendations,
+    cached_recommendations,
+    incident_rule_based_recommendations,
+    rule_based_recommendations,
+)
+from analytics.scheduling import assign_cadence_tiers, campaign_queue, due_tiers
+import asyncio
 import logging
+import math
+import random
 import httpx
 import json
 import aio_pika
-from typing import List, Dict, Any
+from typing import Any
 
 logger = logging.getLogger(__name__)
 
+ROLLUP_REFRESH_CHUNK_SIZE = 1000
+SEASONAL_PROFILE_CHUNK_SIZE = 1000
+SEGMENT_REFRESH_CHUNK_SIZE = 5000
+# Moves the high-water marks of all of a run's campaigns in one statement
+HIGH_WATER_MARK_UPDATE = """
+UPDATE campaigns
+SET last_analyzed_metric_id = marks.metric_id,
+    last_analyzed_metric_date = marks.metric_date
+FROM unnest(%s::bigint[], %s::bigint[], %s::date[])
+    AS marks (campaign_id, metric_id, metric_date)
+WHERE campaigns.id = marks.campaign_id
+"""
+# Queries saving one checkpoint chunk: the alert upsert, the checkpoint insert and
+# update and, within an outer transaction, a savepoint and its release
+CHECKPOINT_CHUNK_QUERIES = 5
+ANALYSIS_RESULT_KEY_FIELDS = [
+    'campaign',
+    'analysis_type',
+    'metric_affected',
+    'date_detected',
+]
+ANALYSIS_RESULT_UPDATE_FIELDS = ['severity', 'description']
+BACKFILL_CHUNK_DAYS = {'day': 1, 'week': 7}
+# Anomaly types a platform-wide cause can raise across campaigns at once
+CORRELATED_ANOMALY_TYPES = (
+    'ctr_drop',
+    'cpc_spike',
+    'spend_spike',
+    'conversion_drop',
+    'segment_share_drop',
+)
+# Affected campaigns described to the LLM in an incident's prompt
+INCIDENT_PROMPT_CAMPAIGNS = 10
+INGEST_ANALYSIS_CACHE_KEY = 'analytics:ingest-analysis:{campaign_id}'
+ROLLUP_REFRESH_CACHE_KEY = 'analytics:rollup-refresh:{campaign_id}'
+ANALYSIS_SWEEP_LEASE = 'run:analyze-campaign-performance'
+DISPATCH_LEASE = 'run:dispatch-campaign-analysis'
+
 @celery_app.task(bind=True, max_retries=3)
-def analyze_campaign_performance(self, campaign_id=None, days_back=7):
+def analyze_campaign_performance(
+    self,
+    campaign_id=None,
+    days_back=7,
+    backend=None,
+    force=False,
+    profile=False,
+):
     """
     Automated analysis task that detects anomalies and performance issues.
-    
+
+    The detectors run across all analyzed campaigns at once, either as array
+    operations over a single metrics query ("python"), as window-function
+    queries inside Postgres ("sql") or from the metric rollups ("rollup").
+
+    Campaigns without new daily metrics since their last analysis are skipped
+    unless a specific campaign is requested or ``force`` is set. A sweep of all
+    campaigns is skipped while another one holds its lease.
+
     Args:
         campaign_id: Specific campaign to analyze (None for all active campaigns)
         days_back: Number of days to look back for analysis
+        backend: Detection backend (None for settings.ANALYTICS_DETECTION_BACKEND)
+        force: Analyze campaigns even if their metrics did not change
+        profile: Profile the run and store the report on its AnalysisRun
     
     Returns:
-        dict: Analysis summary with alerts generated
+        int: ID of the AnalysisRun recording the analysis
+    """
+    try:
+        analysis_run = _start_analysis_run(
+            self.name,
+            self.request.id,
+            datetime.now().date(),
+            backend,
+        )
+        with LeaseGroup(
+            self.request.id,
+            settings.ANALYTICS_LEASE_TTL_SECONDS,
+        ) as run_lease:
+            # Only one sweep of all campaigns runs at a time
+            if not campaign_id and not run_lease.acquire([ANALYSIS_SWEEP_LEASE]):
+                logger.info(
+                    "Skipping analysis, another sweep of all campaigns is running",
+                )
+                _finish_analysis_run(analysis_run, AnalysisRun.STATUS_SKIPPED)
+                return analysis_run.id
+
+            # Get campaigns to analyze
+            campaigns = Campaign.objects.filter(status='active')
+            if campaign_id:
+                campaigns = campaigns.filter(id=campaign_id)
+            elif not force:
+                campaigns = campaigns.with_new_metrics()
+
+            return _analyze_campaigns(
+                campaigns,
+                analysis_run,
+                days_back,
+                profile=profile,
+            )
+        
+    except Exception as exc:
+        logger.error(f"Analysis task failed: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60)
+
+
+def enqueue_campaign_analysis(campaign_id):
+    """
+    Schedule a debounced analysis of one campaign after new daily metrics landed for it.
+
+    The first ingestion of a debounce window schedules the run at the end of the
+    window; metrics landing meanwhile are picked up by that same run.
+
+    Args:
+        campaign_id: Campaign that received new daily metrics
+
+    Returns:
+        bool: Whether a new run was scheduled
+    """
+    debounce = settings.ANALYTICS_INGEST_DEBOUNCE_SECONDS
+    if not cache.add(
+        INGEST_ANALYSIS_CACHE_KEY.format(campaign_id=campaign_id),
+        1,
+        timeout=debounce,
+    ):
+        return False
+
+    # Ingestion-triggered runs keep the interactive queue free for analysts
+    analyze_campaign_performance.apply_async(
+        kwargs={'campaign_id': campaign_id},
+        countdown=debounce,
+        queue=campaign_queue(campaign_id, datetime.now().date()),
+    )
+    logger.info(
+        f"Scheduled analysis of campaign {campaign_id} in {debounce}s "
+        "after new metrics",
+    )
+    return True
+
+
+@celery_app.task
+def dispatch_campaign_analysis(
+    days_back=7,
+    backend=None,
+    shard_size=None,
+    max_shards=None,
+    force=False,
+    tiers=None,
+    profile=False,
+):
+    """
+    Coordinator that fans the analysis of all active campaigns out to the workers.
+
+    Active campaign IDs are assigned to cadence tiers by their budget and recent
+    spend; the campaigns of the tiers due this hour are split into shards
+    analyzed by analyze_campaign_shard tasks on their tier's queue, running as
+    a chord. Every shard records its own AnalysisRun under the dispatch's run,
+    whose totals merge_shard_runs fills in once all shards are done. Campaigns
+    without new daily metrics since their last analysis are not dispatched, and
+    campaigns of tiers that are not due keep them for their tier's next run.
+    Concurrent dispatches are skipped while one holds its lease.
+
+    Args:
+        days_back: Number of days to look back for analysis
+        backend: Detection backend (None for settings.ANALYTICS_DETECTION_BACKEND)
+        shard_size: Campaigns per shard (None for settings.ANALYTICS_SHARD_SIZE)
+        max_shards: Upper bound on the number of shards of a tier, i.e. on the
+            workers one run occupies (None for settings.ANALYTICS_SHARD_CONCURRENCY)
+        force: Dispatch campaigns even if their metrics did not change
+        tiers: Names of the cadence tiers to dispatch (None for the tiers due this hour)
+        profile: Profile every shard and store the reports on their AnalysisRuns
+
+    Returns:
+        int: ID of the AnalysisRun the shards are recorded under
+    """
+    analysis_run = _start_analysis_run(
+        dispatch_campaign_analysis.name,
+        dispatch_campaign_analysis.request.id,
+        datetime.now().date(),
+        backend,
+    )
+    with LeaseGroup(None, settings.ANALYTICS_LEASE_TTL_SECONDS) as run_lease:
+        if not run_lease.acquire([DISPATCH_LEASE]):
+            logger.info("Skipping dispatch, another dispatch is running")
+            _finish_analysis_run(analysis_run, AnalysisRun.STATUS_SKIPPED)
+            return analysis_run.id
+        _dispatch_campaign_analysis(
+            analysis_run,
+            days_back,
+            backend,
+            shard_size,
+            max_shards,
+            force,
+            tiers,
+            profile,
+        )
+    return analysis_run.id
+
+
+def _dispatch_campaign_analysis(
+    analysis_run,
+    days_back,
+    backend,
+    shard_size,
+    max_shards,
+    force,
+    tiers,
+    profile,
+):
+    """Assign campaigns to cadence tiers and send due tiers' shards to their queues"""
+    now = datetime.now()
+    analysis_date = now.date().isoformat()
+    if tiers is None:
+        dispatched_tiers = due_tiers(now.hour)
+    else:
+        dispatched_tiers = [
+            tier for tier in settings.ANALYTICS_CADENCE_TIERS if tier['name'] in tiers
+        ]
+
+    campaigns = Campaign.objects.filter(status='active')
+    if not force:
+        campaigns = campaigns.with_new_metrics()
+    campaigns_by_tier = assign_cadence_tiers(
+        campaigns.order_by('id').values_list('id', flat=True),
+        now.date(),
+    )
+
+    shards = []
+    for tier in dispatched_tiers:
+        shards.extend(
+            analyze_campaign_shard.s(
+                shard,
+                analysis_date,
+                days_back,
+                backend,
+                analysis_run.id,
+                profile,
+            ).set(queue=tier['queue'])
+            for shard in _split_into_shards(
+                campaigns_by_tier[tier['name']],
+                shard_size or settings.ANALYTICS_SHARD_SIZE,
+                max_shards or settings.ANALYTICS_SHARD_CONCURRENCY,
+            )
+        )
+
+    tier_campaigns = {
+        tier['name']: len(campaigns_by_tier[tier['name']]) for tier in dispatched_tiers
+    }
+    logger.info(
+        f"Dispatched {sum(tier_campaigns.values())} campaigns in {len(shards)} shards: "
+        f"{tier_campaigns}",
+    )
+
+    if shards:
+        chord(shards)(merge_shard_runs.s(analysis_run.id))
+    else:
+        _finish_analysis_run(analysis_run, AnalysisRun.STATUS_COMPLETED)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def analyze_campaign_shard(
+    self,
+    campaign_ids,
+    analysis_date,
+    days_back=7,
+    backend=None,
+    parent_run_id=None,
+    profile=False,
+):
+    """
+    Worker task analyzing one shard of active campaigns.
+
+    Args:
+        campaign_ids: Campaigns of the shard
+        analysis_date: ISO date the analysis is run for
+        days_back: Number of days to look back for analysis
+        backend: Detection backend (None for settings.ANALYTICS_DETECTION_BACKEND)
+        parent_run_id: AnalysisRun of the dispatch the shard belongs to
+        profile: Profile the shard and store the report on its AnalysisRun
+
+    Returns:
+        int: ID of the AnalysisRun recording the shard
+    """
+    try:
+        analysis_run = _start_analysis_run(
+            self.name,
+            self.request.id,
+            date.fromisoformat(analysis_date),
+            backend,
+            parent_run_id,
+        )
+        campaigns = Campaign.objects.filter(status='active', id__in=campaign_ids)
+        return _analyze_campaigns(campaigns, analysis_run, days_back, profile=profile)
+
+    except Exception as exc:
+        logger.error(f"Analysis shard failed: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60)
+
+
+@celery_app.task
+def merge_shard_runs(shard_run_ids, parent_run_id):
+    """Total the counts and stage timings of the shard runs into their dispatch's run"""
+    analysis_run = AnalysisRun.objects.get(id=parent_run_id)
+    shard_runs = list(AnalysisRun.objects.filter(id__in=shard_run_ids))
+    for field in (
+        'campaigns_scanned',
+        'campaigns_skipped',
+        'rows_read',
+        'alerts_generated',
+    ):
+        setattr(
+            analysis_run,
+            field,
+            sum(getattr(shard_run, field) for shard_run in shard_runs),
+        )
+
+    stage_seconds = {}
+    for shard_run in shard_runs:
+        for stage, seconds in shard_run.stage_seconds.items():
+            stage_seconds[stage] = round(stage_seconds.get(stage, 0.0) + seconds, 4)
+    analysis_run.stage_seconds = stage_seconds
+    _finish_analysis_run(analysis_run, AnalysisRun.STATUS_COMPLETED)
+
+    logger.info(
+        f"Sharded analysis complete. Generated {analysis_run.alerts_generated} alerts.",
+    )
+    return analysis_run.id
+
+
+@celery_app.task(bind=True, max_retries=3)
+def retry_campaign_analysis(
+    self,
+    run_id,
+    campaign_id,
+    analysis_date,
+    days_back=7,
+    backend=None,
+):
+    """
+    Retry the alerts of a single campaign that failed within an analysis run.
+
+    Anomalies the campaign's checkpoint already records as persisted are skipped.
+
+    Args:
+        run_id: Task ID of the run the campaign failed in
+        campaign_id: Campaign to retry
+        analysis_date: ISO date the run analyzed
+        days_back: Number of days to look back for analysis
+        backend: Detection backend (None for settings.ANALYTICS_DETECTION_BACKEND)
+
+    Returns:
+        int: ID of the AnalysisRun recording the retry
+    """
+    try:
+        analysis_run = _start_analysis_run(
+            self.name,
+            run_id,
+            date.fromisoformat(analysis_date),
+            backend,
+        )
+        campaigns = Campaign.objects.filter(status='active', id=campaign_id)
+        return _analyze_campaigns(
+            campaigns,
+            analysis_run,
+            days_back,
+            resume_failed=True,
+        )
+
+    except Exception as exc:
+        logger.error(f"Campaign analysis retry failed: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60)
+
+
+@celery_app.task
+def purge_analysis_checkpoints(retention_days=None):
+    """Delete the checkpoints of analysis runs older than the retention period"""
+    retention_days = retention_days or settings.ANALYTICS_CHECKPOINT_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = AnalysisCheckpoint.objects.filter(updated_at__lt=cutoff).delete()
+    logger.info(f"Purged {deleted} analysis checkpoints")
+    return {'checkpoints_deleted': deleted}
+
+
+@celery_app.task
+def backfill_campaign_analysis(
+    start_date,
+    end_date,
+    chunk='day',
+    days_back=7,
+    campaign_id=None,
+):
+    """
+    Coordinator that recomputes the alerts of past days in parallel.
+
+    The date range is split into day or week chunks analyzed by
+    backfill_analysis_chunk tasks running as a chord. Alerts are upserted on
+    their natural key; backfilled alerts get no LLM recommendations and send
+    no notifications.
+
+    Args:
+        start_date: First ISO date to analyze
+        end_date: Last ISO date to analyze
+        chunk: Dates per worker task, "day" or "week"
+        days_back: Number of days to look back for analysis
+        campaign_id: Specific campaign to backfill (None for all active campaigns)
+
+    Returns:
+        dict: Number of days and chunks dispatched
+    """
+    if chunk not in BACKFILL_CHUNK_DAYS:
+        msg = f"Unknown backfill chunk: {chunk}"
+        raise ValueError(msg)
+
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    chunks = _split_date_range(start, end, BACKFILL_CHUNK_DAYS[chunk])
+
+    if chunks:
+        chord(
+            backfill_analysis_chunk.s(chunk_start, chunk_end, days_back, campaign_id)
+            for chunk_start, chunk_end in chunks
+        )(merge_backfill_summaries.s())
+
+    logger.info(
+        f"Dispatched backfill of {start_date} to {end_date} in {len(chunks)} chunks",
+    )
+    return {
+        'status': 'dispatched',
+        'days': max((end - start).days + 1, 0),
+        'chunks': len(chunks),
+    }
+
+
+@celery_app.task(bind=True, max_retries=3)
+def backfill_analysis_chunk(self, start_date, end_date, days_back=7, campaign_id=None):
+    """
+    Worker task backfilling the alerts of one chunk of past days.
+
+    The metrics of the whole chunk are loaded once and the detectors run for
+    every day of it in memory.
+
+    Args:
+        start_date: First ISO date of the chunk
+        end_date: Last ISO date of the chunk
+        days_back: Number of days to look back for analysis
+        campaign_id: Specific campaign to backfill (None for all active campaigns)
+
+    Returns:
+        dict: Number of days analyzed and alerts saved
     """
     try:
-        # Get campaigns to analyze
         campaigns = Campaign.objects.filter(status='active')
         if campaign_id:
             campaigns = campaigns.filter(id=campaign_id)
-        
-        analysis_date = datetime.now().date()
-        lookback_date = analysis_date - timedelta(days=days_back)
-        
-        alerts_generated = []
-        
-        for campaign in campaigns:
-            logger.info(f"Analyzing campaign: {campaign.name}")
-            
-            # Get recent metrics
-            recent_metrics = DailyMetric.objects.filter(
-                campaign=campaign,
-                date__gte=lookback_date,
-                date__lte=analysis_date
-            ).order_by('-date')
-            
-            if recent_metrics.count() < 3:
-                continue  # Need at least 3 days of data
-            
-            # Perform anomaly detection
-            ctr_anomaly = _detect_ctr_anomaly(recent_metrics)
-            cpc_anomaly = _detect_cpc_anomaly(recent_metrics)
-            spend_anomaly = _detect_spend_anomaly(recent_metrics, campaign)
-            conversion_anomaly = _detect_conversion_anomaly(recent_metrics)
-            
-            # Check performance thresholds
-            performance_alert = _check_performance_thresholds(recent_metrics, campaign)
-            
-            # Generate alerts for significant findings
-            for anomaly in [ctr_anomaly, cpc_anomaly, spend_anomaly, conversion_anomaly, performance_alert]:
-                if anomaly and anomaly['severity'] in ['medium', 'high', 'critical']:
-                    alert = _create_analysis_result(campaign, anomaly, analysis_date)
-                    if alert:
-                        alerts_generated.append(alert)
-        
-        logger.info(f"Analysis complete. Generated {len(alerts_generated)} alerts.")
-        
+        campaigns_by_id = {campaign.id: campaign for campaign in campaigns}
+
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        anomalies_by_date = detect_anomalies_range(
+            campaigns,
+            campaigns_by_id,
+            start,
+            end,
+            days_back,
+        )
+
+        results = [
+            _new_analysis_result(
+                campaigns_by_id[anomaly_campaign_id],
+                anomaly_data,
+                analysis_date,
+                [],
+            )
+            for analysis_date, anomalies in anomalies_by_date.items()
+            for anomaly_campaign_id, campaign_anomalies in anomalies.items()
+            for anomaly_data in campaign_anomalies
+        ]
+        AnalysisResult.objects.bulk_create(
+            results,
+            update_conflicts=True,
+            unique_fields=ANALYSIS_RESULT_KEY_FIELDS,
+            update_fields=ANALYSIS_RESULT_UPDATE_FIELDS,
+        )
+
+        logger.info(f"Backfilled {len(results)} alerts from {start_date} to {end_date}")
         return {
-            'status': 'success',
-            'campaigns_analyzed': campaigns.count(),
-            'alerts_generated': len(alerts_generated),
-            'alert_details': [
-                {
-                    'campaign': alert.campaign.name,
-                    'severity': alert.severity,
-                    'metric': alert.metric_affected,
-                    'description': alert.description
-                } for alert in alerts_generated
-            ]
+            'days_analyzed': (end - start).days + 1,
+            'alerts_saved': len(results),
         }
-        
+
     except Exception as exc:
-        logger.error(f"Analysis task failed: {str(exc)}")
+        logger.error(f"Analysis backfill chunk failed: {str(exc)}")
         raise self.retry(exc=exc, countdown=60)
 
 
-def _detect_ctr_anomaly(metrics):
-    """Detect CTR anomalies using statistical analysis"""
-    ctr_values = [float(m.ctr) for m in metrics if m.ctr > 0]
-    if len(ctr_values) < 3:
+@celery_app.task
+def merge_backfill_summaries(summaries):
+    """Merge the per-chunk backfill summaries into a single backfill summary"""
+    days_analyzed = sum(summary['days_analyzed'] for summary in summaries)
+    alerts_saved = sum(summary['alerts_saved'] for summary in summaries)
+    logger.info(
+        f"Backfill complete. Saved {alerts_saved} alerts for {days_analyzed} days.",
+    )
+    return {
+        'status': 'success',
+        'days_analyzed': days_analyzed,
+        'alerts_saved': alerts_saved,
+    }
+
+
+@celery_app.task
+def enrich_recommendations(result_prompts=None, incident_prompts=None):
+    """
+    Replace the rule-based recommendations of alerts and incidents with the LLM
+    service's.
+
+    Analysis runs save their alerts with rule-based recommendations and queue
+    this task on the llm queue, so neither detection nor its database writes
+    wait on the LLM service or its rate limits. A prompt asks for the
+    recommendations of one or more anomaly fingerprints, those of a campaign
+    in one structured response, and every alert sharing a fingerprint gets its
+    recommendations, which are cached for later alerts with the fingerprint.
+    The alerts of an enriched incident get its recommendations too. Targets
+    whose request fails keep their rule-based recommendations.
+
+    Args:
+        result_prompts: [prompt, [[analysis result ids, anomaly fingerprint], ...]]
+            pairs, with the fingerprints in the order the prompt lists their anomalies
+        incident_prompts: [incident id, prompt] pairs
+
+    Returns:
+        dict: Number of alerts and incidents enriched
+    """
+    result_prompts = result_prompts or []
+    incident_prompts = incident_prompts or []
+    responses = _request_llm_responses(
+        [prompt for prompt, _ in result_prompts]
+        + [prompt for _, prompt in incident_prompts],
+        [len(groups) for _, groups in result_prompts] + [1] * len(incident_prompts),
+    )
+
+    fingerprint_recommendations = {}
+    result_recommendations = {}
+    for (_, groups), response in zip(
+        result_prompts,
+        responses[: len(result_prompts)],
+        strict=True,
+    ):
+        for (result_ids, fingerprint), recommendations in zip(
+            groups,
+            _parse_recommendations(response, len(groups)),
+            strict=True,
+        ):
+            if recommendations:
+                fingerprint_recommendations[fingerprint] = recommendations
+                result_recommendations.update(
+                    dict.fromkeys(result_ids, recommendations),
+                )
+    incident_recommendations = {}
+    for (incident_id, _), response in zip(
+        incident_prompts,
+        responses[len(result_prompts) :],
+        strict=True,
+    ):
+        recommendations = _parse_recommendations(response, 1)[0]
+        if recommendations:
+            incident_recommendations[incident_id] = recommendations
+    cache_recommendations(fingerprint_recommendations)
+
+    results = list(AnalysisResult.objects.filter(id__in=list(result_recommendations)))
+    for result in results:
+        result.recommendations = result_recommendations[result.id]
+    AnalysisResult.objects.bulk_update(results, ['recommendations'])
+
+    incidents = list(Incident.objects.filter(id__in=list(incident_recommendations)))
+    for incident in incidents:
+        incident.recommendations = incident_recommendations[incident.id]
+    Incident.objects.bulk_update(incidents, ['recommendations'])
+    # The alerts of all enriched incidents copy their incident's in one statement
+    AnalysisResult.objects.filter(
+        incident_id__in=[incident.id for incident in incidents],
+    ).update(
+        recommendations=Subquery(
+            Incident.objects.filter(id=OuterRef('incident_id')).values(
+                'recommendations',
+            ),
+        ),
+    )
+
+    logger.info(
+        f"Enriched {len(results)} alerts and {len(incidents)} incidents "
+        "with LLM recommendations",
+    )
+    return {
+        'results_enriched': len(results),
+        'incidents_enriched': len(incidents),
+    }
+
+
+def _split_into_shards(
+    campaign_ids: list[int],
+    shard_size: int,
+    max_shards: int,
+) -> list[list[int]]:
+    """Split campaign IDs into shards, growing the shard size to stay in max_shards"""
+    shard_size = max(shard_size, math.ceil(len(campaign_ids) / max_shards))
+    return [
+        campaign_ids[start : start + shard_size]
+        for start in range(0, len(campaign_ids), shard_size)
+    ]
+
+
+def _split_date_range(start_date, end_date, chunk_days) -> list[tuple]:
+    """Split an inclusive date range into (start, end) ISO date pairs of chunk_days days
+
+    The last chunk may be shorter.
+    """
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        chunks.append((chunk_start.isoformat(), chunk_end.isoformat()))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def _analyze_campaigns(
+    campaigns,
+    analysis_run,
+    days_back,
+    resume_failed=False,
+    profile=False,
+):
+    """
+    Analyze the given campaigns that no concurrent run is working on and record the run.
+
+    A Redis lease per campaign is claimed under the run ID and renewed by a
+    heartbeat until the campaigns are analyzed, so overlapping runs (a slow
+    sweep and the next one, a shard and an ingestion-triggered run) skip the
+    campaigns another run has claimed instead of analyzing them twice.
+    Every query of the run is counted against the task's query budget, and
+    with ``profile`` or ANALYTICS_PROFILE_RUNS the run is profiled. Failures
+    are recorded on the run before they propagate.
+
+    Returns the ID of the AnalysisRun.
+    """
+    timer = StageTimer()
+    query_stats = QueryStats()
+    profiler = Profiler(enabled=profile or settings.ANALYTICS_PROFILE_RUNS)
+    try:
+        with profiler, connection.execute_wrapper(query_stats):
+            _analyze_leased_campaigns(
+                campaigns,
+                analysis_run,
+                timer,
+                days_back,
+                resume_failed,
+            )
+        check_query_budget(
+            analysis_run.task,
+            query_stats,
+            _analysis_query_budget(analysis_run),
+        )
+    except Exception as exc:
+        _finish_analysis_run(
+            analysis_run,
+            AnalysisRun.STATUS_FAILED,
+            timer,
+            query_stats,
+            profiler,
+            error=str(exc),
+        )
+        raise
+
+    _finish_analysis_run(
+        analysis_run,
+        AnalysisRun.STATUS_COMPLETED,
+        timer,
+        query_stats,
+        profiler,
+    )
+    return analysis_run.id
+
+
+def _analysis_query_budget(analysis_run):
+    """Query budget of an analysis task execution
+
+    The task's entry in ANALYTICS_QUERY_BUDGETS covers saving its alerts in one
+    checkpoint chunk; every further chunk its campaigns take adds the queries
+    saving one.
+    """
+    budget = settings.ANALYTICS_QUERY_BUDGETS.get(analysis_run.task)
+    if budget is None:
         return None
-    
-    recent_ctr = ctr_values[0]  # Most recent
-    baseline_ctr = statistics.mean(ctr_values[1:])  # Previous days average
-    
-    # Check for significant drops (>40% decrease)
-    if recent_ctr < baseline_ctr * 0.6:
-        drop_percent = ((baseline_ctr - recent_ctr) / baseline_ctr) * 100
-        return {
-            'type': 'ctr_drop',
-            'severity': 'high' if drop_percent > 60 else 'medium',
-            'metric': 'ctr',
-            'description': f"CTR dropped by {drop_percent:.1f}% - possible ad fatigue or audience saturation",
-            'metric_data': {
-                'recent_value': recent_ctr,
-                'baseline_value': baseline_ctr,
-                'drop_percentage': drop_percent,
-                'historical_values': ctr_values
-            }
+    chunks = math.ceil(
+        analysis_run.campaigns_scanned / settings.ANALYTICS_CHECKPOINT_CHUNK_SIZE,
+    )
+    return budget + CHECKPOINT_CHUNK_QUERIES * max(chunks - 1, 0)
+
+
+def _analyze_leased_campaigns(campaigns, analysis_run, timer, days_back, resume_failed):
+    """Lease the campaigns and analyze the ones no other run holds"""
+    with timer.stage('query'):
+        lease_names = {
+            f'campaign:{campaign_id}': campaign_id
+            for campaign_id in campaigns.values_list('id', flat=True)
         }
-    
-    return None
+    with LeaseGroup(
+        analysis_run.run_id,
+        settings.ANALYTICS_LEASE_TTL_SECONDS,
+    ) as leases:
+        claimed_ids = [lease_names[name] for name in leases.acquire(lease_names)]
+        if len(claimed_ids) < len(lease_names):
+            logger.info(
+                f"Skipping {len(lease_names) - len(claimed_ids)} campaigns "
+                "claimed by another run",
+            )
+        analysis_run.campaigns_skipped = len(lease_names) - len(claimed_ids)
 
+        _analyze_claimed_campaigns(
+            Campaign.objects.filter(id__in=claimed_ids),
+            analysis_run,
+            timer,
+            days_back,
+            resume_failed,
+        )
 
-def _detect_cpc_anomaly(metrics):
-    """Detect CPC spikes that indicate increased competition or bidding issues"""
-    cpc_values = [float(m.cpc) for m in metrics if m.cpc > 0]
-    if len(cpc_values) < 3:
-        return None
-    
-    recent_cpc = cpc_values[0]
-    baseline_cpc = statistics.mean(cpc_values[1:])
-    
-    # Check for significant increases (>50% increase)
-    if recent_cpc > baseline_cpc * 1.5:
-        increase_percent = ((recent_cpc - baseline_cpc) / baseline_cpc) * 100
-        return {
-            'type': 'cpc_spike',
-            'severity': 'critical' if increase_percent > 100 else 'medium',
-            'metric': 'cpc',
-            'description': f"CPC increased by {increase_percent:.1f}% - competition surge or bidding issues",
-            'metric_data': {
-                'recent_value': recent_cpc,
-                'baseline_value': baseline_cpc,
-                'increase_percentage': increase_percent,
-                'historical_values': cpc_values
-            }
+
+def _analyze_claimed_campaigns(
+    campaigns,
+    analysis_run,
+    timer,
+    days_back,
+    resume_failed,
+):
+    """
+    Detect anomalies of the given campaigns and create alerts for significant findings.
+
+    Progress is checkpointed per campaign under the run ID, committed with the
+    alerts of every chunk of ANALYTICS_CHECKPOINT_CHUNK_SIZE campaigns: campaigns
+    completed by an earlier attempt of the run are skipped, their alerts notified
+    if that attempt stopped before notifying them, and campaigns whose alerts fail
+    to build or save are retried on their own by retry_campaign_analysis instead
+    of failing the run.
+    The metric high-water mark of every fully analyzed campaign is advanced so
+    that later runs can skip it until new metrics arrive. Alerts are upserted on
+    their natural key, so anomalies already raised for the day are not
+    recommended on or notified again. New alerts are saved and notified with
+    rule-based recommendations, and enrich_recommendations replaces them with
+    the LLM service's from the llm queue. Anomalies that many campaigns of a
+    platform raise at once are collapsed into an incident, which gets one
+    recommendation request and one notification for all of its alerts.
+
+    Counts and stage timings are recorded on ``analysis_run``.
+    """
+    run_id, analysis_date, backend = (
+        analysis_run.run_id,
+        analysis_run.analysis_date,
+        analysis_run.backend,
+    )
+
+    with timer.stage('query'):
+        campaigns_by_id = {campaign.id: campaign for campaign in campaigns}
+        logger.info(
+            f"Analyzing {len(campaigns_by_id)} campaigns with the {backend} backend",
+        )
+
+        # Captured before detection so that metrics landing mid-run are analyzed by the
+        # next run
+        metric_marks = {
+            mark['campaign_id']: mark
+            for mark in DailyMetric.objects.filter(
+                campaign_id__in=list(campaigns_by_id),
+            )
+            .values('campaign_id')
+            .annotate(latest_id=Max('id'), latest_date=Max('date'))
         }
-    
-    return None
 
+    # Run the detectors across all campaigns at once
+    query_stats = QueryStats()
+    with timer.stage('detection'), connection.execute_wrapper(query_stats):
+        anomalies = run_detection(
+            campaigns,
+            campaigns_by_id,
+            analysis_date,
+            days_back,
+            backend=backend,
+        )
+    analysis_run.campaigns_scanned = len(campaigns_by_id)
+    analysis_run.rows_read = query_stats.rows
 
-def _detect_spend_anomaly(metrics, campaign):
-    """Detect unusual spending patterns"""
-    spend_values = [float(m.spend) for m in metrics if m.spend > 0]
-    if len(spend_values) < 3:
-        return None
-    
-    recent_spend = spend_values[0]
-    baseline_spend = statistics.mean(spend_values[1:])
-    daily_budget = float(campaign.budget) / 30  # Approximate daily budget
-    
-    # Check for spend spikes (>200% of baseline or >150% of daily budget)
-    if recent_spend > baseline_spend * 2 or recent_spend > daily_budget * 1.5:
-        return {
-            'type': 'spend_spike',
-            'severity': 'high',
-            'metric': 'spend',
-            'description': f"Daily spend of ${recent_spend:.2f} is unusually high (baseline: ${baseline_spend:.2f})",
-            'metric_data': {
-                'recent_value': recent_spend,
-                'baseline_value': baseline_spend,
-                'daily_budget': daily_budget,
-                'budget_utilization': (recent_spend / daily_budget) * 100,
-                'historical_values': spend_values
-            }
+    with timer.stage('query'):
+        checkpoints = {
+            checkpoint.campaign_id: checkpoint
+            for checkpoint in AnalysisCheckpoint.objects.filter(
+                run_id=run_id,
+                campaign_id__in=list(anomalies),
+            )
         }
-    
-    return None
+        skipped_statuses = {AnalysisCheckpoint.STATUS_COMPLETED}
+        if not resume_failed:
+            # Failed campaigns are handled by their own retry task
+            skipped_statuses.add(AnalysisCheckpoint.STATUS_FAILED)
 
+        pending = {}
+        for anomaly_campaign_id, campaign_anomalies in anomalies.items():
+            checkpoint = checkpoints.setdefault(
+                anomaly_campaign_id,
+                AnalysisCheckpoint(run_id=run_id, campaign_id=anomaly_campaign_id),
+            )
+            if checkpoint.status not in skipped_statuses:
+                pending[anomaly_campaign_id] = campaign_anomalies
+        analysis_run.campaigns_skipped += len(anomalies) - len(pending)
 
-def _detect_conversion_anomaly(metrics):
-    """Detect conversion rate drops that might indicate landing page or tracking issues"""
-    conversion_rates = []
-    for m in metrics:
-        if m.clicks > 0:
-            conv_rate = (m.conversions / m.clicks) * 100
-            conversion_rates.append(conv_rate)
-    
-    if len(conversion_rates) < 3:
-        return None
-    
-    recent_conv_rate = conversion_rates[0]
-    baseline_conv_rate = statistics.mean(conversion_rates[1:])
-    
-    # Check for significant drops (>50% decrease)
-    if recent_conv_rate < baseline_conv_rate * 0.5 and baseline_conv_rate > 1:
-        drop_percent = ((baseline_conv_rate - recent_conv_rate) / baseline_conv_rate) * 100
-        return {
-            'type': 'conversion_drop',
-            'severity': 'critical',
-            'metric': 'conversion_rate',
-            'description': f"Conversion rate dropped by {drop_percent:.1f}% - landing page or tracking issues suspected",
-            'metric_data': {
-                'recent_value': recent_conv_rate,
-                'baseline_value': baseline_conv_rate,
-                'drop_percentage': drop_percent,
-                'historical_values': conversion_rates,
-                'clicks': metrics[0].clicks,
-                'conversions': metrics[0].conversions
-            }
+        # Alerts an earlier attempt of the run saved but did not notify
+        unnotified_result_ids = [
+            result_id
+            for campaign_id, checkpoint in checkpoints.items()
+            if campaign_id not in pending
+            and checkpoint.status == AnalysisCheckpoint.STATUS_COMPLETED
+            and not checkpoint.notified
+            for result_id in checkpoint.result_ids
+        ]
+
+        # Alerts already raised for the day are updated without new recommendations or
+        # notifications
+        existing_keys = set(
+            AnalysisResult.objects.filter(
+                campaign_id__in=list(pending),
+                date_detected=analysis_date,
+            ).values_list('campaign_id', 'analysis_type', 'metric_affected'),
+        )
+
+    with timer.stage('alerts'):
+        # New incidents and alerts to enrich with LLM recommendations, as (incident,
+        # prompt) pairs and (alert, anomaly, fingerprint) triples
+        incident_requests = []
+        alert_requests = []
+        incidents, new_incidents, linked_campaigns = _correlate_incidents(
+            pending,
+            campaigns_by_id,
+            analysis_date,
+            incident_requests,
+        )
+
+        # Generate alerts for significant findings
+        results_by_campaign = {}
+        for anomaly_campaign_id, campaign_anomalies in pending.items():
+            checkpoint = checkpoints[anomaly_campaign_id]
+            checkpoint.attempts += 1
+            try:
+                results_by_campaign[anomaly_campaign_id] = _build_analysis_results(
+                    campaigns_by_id[anomaly_campaign_id],
+                    campaign_anomalies,
+                    analysis_date,
+                    existing_keys,
+                    incidents,
+                    alert_requests,
+                )
+            except SoftTimeLimitExceeded:
+                # Let the run retry and resume from its checkpoints
+                raise
+            except Exception as e:
+                logger.error(
+                    f"Failed to prepare alerts for campaign {anomaly_campaign_id}: "
+                    f"{str(e)}",
+                )
+                checkpoint.status = AnalysisCheckpoint.STATUS_FAILED
+                checkpoint.error = f"Failed to prepare alerts: {str(e)}"
+
+        # Alerts like earlier ones get their cached LLM recommendations without a
+        # request
+        alert_requests = _apply_cached_recommendations(alert_requests)
+
+    with timer.stage('db_write'):
+        created_results = _save_analysis_result_chunks(
+            results_by_campaign,
+            [checkpoints[campaign_id] for campaign_id in pending],
+            existing_keys,
+            [*ANALYSIS_RESULT_UPDATE_FIELDS, 'incident'],
+        )
+        # Alerts of campaigns whose chunk failed to save are requested on retry
+        alert_requests = [
+            request
+            for request in alert_requests
+            if checkpoints[request[0].campaign_id].status
+            == AnalysisCheckpoint.STATUS_COMPLETED
+        ]
+
+    # Alerts are saved with rule-based recommendations; the LLM service's replace them
+    # later
+    _enqueue_recommendation_enrichment(alert_requests, incident_requests)
+
+    for result in created_results:
+        ALERTS_CREATED.labels(result.severity, result.analysis_type).inc()
+
+    with timer.stage('notification'):
+        notified_results = list(created_results)
+        if unnotified_result_ids:
+            notified_results += AnalysisResult.objects.filter(
+                id__in=unnotified_result_ids,
+            ).select_related('campaign', 'incident')
+
+        # Alerts of an incident are covered by its notification
+        pending_result_ids = {result.id for result, _, _ in alert_requests}
+        # New incidents list the campaigns of the earlier alerts linked to them too
+        campaigns_by_incident = {
+            incident_id: list(campaigns)
+            for incident_id, campaigns in linked_campaigns.items()
         }
-    
-    return None
+        incidents_by_id = {incident.id: incident for incident in incidents.values()}
+        for result in notified_results:
+            if result.incident_id is None:
+                _send_anomaly_notification(
+                    result.campaign,
+                    result,
+                    preliminary=result.id in pending_result_ids,
+                )
+            else:
+                campaigns_by_incident.setdefault(result.incident_id, []).append(
+                    result.campaign,
+                )
+                incidents_by_id.setdefault(result.incident_id, result.incident)
+        for incident in new_incidents:
+            _send_incident_notification(
+                incident,
+                campaigns_by_incident.get(incident.id, []),
+            )
+        # Campaigns joining an incident an earlier run or another shard opened get an
+        # update
+        new_incident_ids = {incident.id for incident in new_incidents}
+        for incident_id, incident_campaigns in campaigns_by_incident.items():
+            if incident_id not in new_incident_ids:
+                _send_incident_notification(
+                    incidents_by_id[incident_id],
+                    incident_campaigns,
+                    update=True,
+                )
 
+        notified_ids = [
+            checkpoint.pk
+            for checkpoint in checkpoints.values()
+            if checkpoint.status == AnalysisCheckpoint.STATUS_COMPLETED
+            and not checkpoint.notified
+        ]
+        if notified_ids:
+            AnalysisCheckpoint.objects.filter(pk__in=notified_ids).update(
+                notified=True,
+            )
 
-def _check_performance_thresholds(metrics, campaign):
-    """Check if key metrics are below acceptable thresholds"""
-    if not metrics:
-        return None
-    
-    latest_metric = metrics.first()
-    
-    # Platform-specific thresholds
-    thresholds = {
-        'Facebook': {'min_ctr': 1.0, 'max_cpa': 50, 'min_roas': 2.0},
-        'Google': {'min_ctr': 2.0, 'max_cpa': 40, 'min_roas': 3.0}, 
-        'Instagram': {'min_ctr': 1.2, 'max_cpa': 45, 'min_roas': 2.5},
-        'LinkedIn': {'min_ctr': 0.8, 'max_cpa': 100, 'min_roas': 2.0},
-        'YouTube': {'min_ctr': 3.0, 'max_cpa': 30, 'min_roas': 2.5}
+    for campaign_id in pending:
+        if checkpoints[campaign_id].status == AnalysisCheckpoint.STATUS_FAILED:
+            _schedule_campaign_retry(
+                checkpoints[campaign_id],
+                analysis_date,
+                days_back,
+                backend,
+            )
+
+    with timer.stage('db_write'):
+        unfinished = {
+            campaign_id for campaign_id, checkpoint in checkpoints.items()
+            if checkpoint.status != AnalysisCheckpoint.STATUS_COMPLETED
+        }
+        _advance_high_water_marks(
+            [
+                campaign
+                for campaign in campaigns_by_id.values()
+                if campaign.id not in unfinished
+            ],
+            metric_marks,
+        )
+
+    # Alerts persisted by this and by earlier attempts of the run
+    analysis_run.alerts_generated = sum(
+        len(checkpoint.result_ids) for checkpoint in checkpoints.values()
+    )
+    logger.info(f"Analysis complete. Generated {analysis_run.alerts_generated} alerts.")
+
+
+def _start_analysis_run(task, run_id, analysis_date, backend=None, parent_id=None):
+    """Record the start of an analysis task execution"""
+    return AnalysisRun.objects.create(
+        run_id=run_id or '',
+        task=task,
+        parent_id=parent_id,
+        analysis_date=analysis_date,
+        backend=backend or settings.ANALYTICS_DETECTION_BACKEND,
+    )
+
+
+def _finish_analysis_run(
+    analysis_run,
+    status,
+    timer=None,
+    query_stats=None,
+    profiler=None,
+    error='',
+):
+    """Record the outcome, counts, stage timings and profile of an analysis task run
+
+    Executions that analyzed campaigns themselves (those passing their ``timer``)
+    also export their stage timings and campaign count, which coordinators
+    totalling their shards must not count again.
+    """
+    analysis_run.status = status
+    analysis_run.error = error
+    analysis_run.finished_at = timezone.now()
+    ANALYSIS_RUN_SECONDS.labels(analysis_run.task, status).observe(
+        (analysis_run.finished_at - analysis_run.started_at).total_seconds(),
+    )
+    if timer is not None:
+        analysis_run.stage_seconds = timer.rounded()
+        for stage, seconds in timer.seconds.items():
+            ANALYSIS_STAGE_SECONDS.labels(analysis_run.task, stage).observe(seconds)
+        CAMPAIGNS_ANALYZED.labels(analysis_run.task).inc(analysis_run.campaigns_scanned)
+    if query_stats is not None:
+        analysis_run.query_count = query_stats.count
+        analysis_run.query_seconds = round(query_stats.seconds, 4)
+    if profiler is not None:
+        analysis_run.profile = profiler.report
+    analysis_run.save()
+
+
+def _correlate_incidents(pending, campaigns_by_id, analysis_date, incident_requests):
+    """Collapse anomalies raised at once across a platform's campaigns into incidents
+
+    Anomalies sharing platform, type and metric join the day's incident if one
+    exists, or open it when at least ANALYTICS_INCIDENT_MIN_CAMPAIGNS campaigns
+    raise them. Alerts earlier runs saved for the day outside an incident count
+    towards that threshold too, since ingestion-triggered runs analyze a single
+    campaign, and are linked to the incident they help open. Shards of a run
+    open the incident only once, with rule-based recommendations; the shard that
+    creates it requests the LLM's by appending the new incident and its prompt
+    to ``incident_requests``.
+
+    Returns the incidents by (platform, type, metric), the ones created by this call
+    and the campaigns of the earlier alerts linked to them, by incident ID.
+    """
+    groups = {}
+    for campaign_id, campaign_anomalies in pending.items():
+        campaign = campaigns_by_id[campaign_id]
+        for anomaly_data in campaign_anomalies:
+            if anomaly_data['type'] in CORRELATED_ANOMALY_TYPES:
+                key = (campaign.platform, anomaly_data['type'], anomaly_data['metric'])
+                groups.setdefault(key, []).append((campaign, anomaly_data))
+    if not groups:
+        return {}, [], {}
+
+    incidents = {
+        (incident.platform, incident.analysis_type, incident.metric_affected): incident
+        for incident in Incident.objects.filter(
+            date_detected=analysis_date,
+            platform__in={platform for platform, _, _ in groups},
+        )
+        if (incident.platform, incident.analysis_type, incident.metric_affected)
+        in groups
     }
-    
-    platform_thresholds = thresholds.get(campaign.platform, thresholds['Facebook'])
-    
-    issues = []
-    metric_data = {
-        'platform': campaign.platform,
-        'thresholds': platform_thresholds,
-        'current_values': {
-            'ctr': latest_metric.ctr,
-            'cpa': latest_metric.cpa,
-            'roas': latest_metric.roas
+
+    # Alerts earlier runs raised for the day without opening an incident
+    earlier_results = {}
+    unopened = {key for key in groups if key not in incidents}
+    if unopened:
+        for result in (
+            AnalysisResult.objects.filter(
+                date_detected=analysis_date,
+                incident__isnull=True,
+                campaign__platform__in={platform for platform, _, _ in unopened},
+                analysis_type__in={analysis_type for _, analysis_type, _ in unopened},
+                metric_affected__in={metric for _, _, metric in unopened},
+            )
+            .exclude(campaign_id__in=list(pending))
+            .select_related('campaign')
+        ):
+            key = (
+                result.campaign.platform,
+                result.analysis_type,
+                result.metric_affected,
+            )
+            if key in unopened:
+                earlier_results.setdefault(key, []).append(result)
+
+    opened = {}
+    for key, group in groups.items():
+        if key in incidents:
+            continue
+        members = group + [
+            (
+                result.campaign,
+                {'severity': result.severity, 'description': result.description},
+            )
+            for result in earlier_results.get(key, [])
+        ]
+        if len(members) < settings.ANALYTICS_INCIDENT_MIN_CAMPAIGNS:
+            continue
+        groups[key] = members
+
+        platform, analysis_type, metric = key
+        opened[key] = Incident(
+            platform=platform,
+            analysis_type=analysis_type,
+            metric_affected=metric,
+            date_detected=analysis_date,
+            severity=max(
+                (anomaly_data['severity'] for _, anomaly_data in members),
+                key=ALERT_SEVERITIES.index,
+            ),
+            description=(
+                f"{len(members)} {platform} campaigns raised {analysis_type} "
+                f"on {metric} at once"
+            ),
+            recommendations=incident_rule_based_recommendations(
+                platform,
+                analysis_type,
+            ),
+        )
+    if not opened:
+        return incidents, [], {}
+
+    # Incidents are opened in bulk; one a concurrent shard opened first keeps that
+    # shard's creation time
+    Incident.objects.bulk_create(opened.values(), ignore_conflicts=True)
+    new_incidents = []
+    linked_results = []
+    linked_campaigns = {}
+    for incident in Incident.objects.filter(
+        date_detected=analysis_date,
+        platform__in={platform for platform, _, _ in opened},
+    ):
+        key = (incident.platform, incident.analysis_type, incident.metric_affected)
+        if key not in opened:
+            continue
+        if incident.created_at == opened[key].created_at:
+            incident_requests.append(
+                (incident, _incident_recommendation_prompt(incident, groups[key])),
+            )
+            new_incidents.append(incident)
+            for result in earlier_results.get(key, []):
+                result.incident = incident
+                result.recommendations = incident.recommendations
+                linked_results.append(result)
+                linked_campaigns.setdefault(incident.id, []).append(result.campaign)
+            logger.warning(f"Opened incident {incident.id}: {incident.description}")
+        incidents[key] = incident
+
+    if linked_results:
+        AnalysisResult.objects.bulk_update(
+            linked_results,
+            ['incident', 'recommendations'],
+        )
+
+    return incidents, new_incidents, linked_campaigns
+
+
+def _build_analysis_results(
+    campaign,
+    anomalies,
+    analysis_date,
+    existing_keys,
+    incidents=None,
+    alert_requests=None,
+):
+    """Build the campaign's alerts with rule-based recommendations
+
+    Alerts not raised yet are appended to ``alert_requests`` with their anomalies and
+    anomaly fingerprints, to be enriched with the LLM service's recommendations once
+    saved. Alerts belonging to an incident share its recommendations instead, and
+    recommendations of existing alerts are kept on conflict.
+    """
+    incidents = incidents or {}
+    results = []
+    for anomaly_data in anomalies:
+        incident = incidents.get(
+            (campaign.platform, anomaly_data['type'], anomaly_data['metric']),
+        )
+        key = (campaign.id, anomaly_data['type'], anomaly_data['metric'])
+        result = _new_analysis_result(
+            campaign,
+            anomaly_data,
+            analysis_date,
+            incident.recommendations
+            if incident is not None
+            else rule_based_recommendations(anomaly_data),
+            incident,
+        )
+        if incident is None and key not in existing_keys and alert_requests is not None:
+            alert_requests.append(
+                (
+                    result,
+                    anomaly_data,
+                    anomaly_fingerprint(
+                        campaign.platform,
+                        campaign.objective,
+                        anomaly_data,
+                    ),
+                ),
+            )
+        results.append(result)
+    return results
+
+
+def _new_analysis_result(
+    campaign,
+    anomaly_data,
+    analysis_date,
+    recommendations,
+    incident=None,
+):
+    """Build an unsaved analysis result for an anomaly"""
+    return AnalysisResult(
+        analysis_type=anomaly_data['type'],
+        campaign=campaign,
+        date_detected=analysis_date,
+        severity=anomaly_data['severity'],
+        metric_affected=anomaly_data['metric'],
+        description=anomaly_data['description'],
+        recommendations=recommendations,
+        incident=incident,
+    )
+
+
+def _save_analysis_result_chunks(
+    results_by_campaign,
+    checkpoints,
+    existing_keys,
+    update_fields=None,
+):
+    """Save the alerts and checkpoints of a run in chunks of campaigns
+
+    Every chunk of ANALYTICS_CHECKPOINT_CHUNK_SIZE campaigns commits its alerts
+    together with its checkpoints, so a run stopped midway resumes after the
+    chunks it saved. The campaigns of a chunk that fails to save are
+    checkpointed as failed instead, to be retried on their own.
+
+    Returns the alerts that did not exist before the run.
+    """
+    chunk_size = settings.ANALYTICS_CHECKPOINT_CHUNK_SIZE
+    created_results = []
+    for start in range(0, len(checkpoints), chunk_size):
+        chunk = checkpoints[start:start + chunk_size]
+        chunk_results = {
+            checkpoint.campaign_id: results_by_campaign[checkpoint.campaign_id]
+            for checkpoint in chunk
+            if checkpoint.campaign_id in results_by_campaign
         }
+        # Checkpoint state to restore if the chunk rolls back
+        saved_state = [
+            (
+                checkpoint.pk,
+                list(checkpoint.completed_types),
+                list(checkpoint.result_ids),
+            )
+            for checkpoint in chunk
+        ]
+        try:
+            created_results += _save_analysis_results(
+                chunk_results,
+                chunk,
+                existing_keys,
+                update_fields,
+            )
+        except SoftTimeLimitExceeded:
+            # Let the run retry and resume from the chunks it saved
+            raise
+        except Exception as e:
+            logger.error(f"Failed to save alerts of {len(chunk)} campaigns: {str(e)}")
+            for checkpoint, (pk, completed_types, result_ids) in zip(
+                chunk,
+                saved_state,
+                strict=True,
+            ):
+                checkpoint.pk = pk
+                checkpoint.completed_types = completed_types
+                checkpoint.result_ids = result_ids
+                if checkpoint.status != AnalysisCheckpoint.STATUS_FAILED:
+                    checkpoint.status = AnalysisCheckpoint.STATUS_FAILED
+                    checkpoint.error = f"Failed to save alerts: {str(e)}"
+            for results in chunk_results.values():
+                for result in results:
+                    result.pk = None
+            _save_checkpoints(chunk)
+    return created_results
+
+
+@transaction.atomic
+def _save_analysis_results(
+    results_by_campaign,
+    checkpoints,
+    existing_keys,
+    update_fields=None,
+):
+    """Upsert the alerts of campaigns in one statement and record them in checkpoints
+
+    Returns the alerts that did not exist before.
+    """
+    results = [result for results in results_by_campaign.values() for result in results]
+    AnalysisResult.objects.bulk_create(
+        results,
+        update_conflicts=True,
+        unique_fields=ANALYSIS_RESULT_KEY_FIELDS,
+        update_fields=update_fields or ANALYSIS_RESULT_UPDATE_FIELDS,
+    )
+
+    created_results = []
+    for checkpoint in checkpoints:
+        if checkpoint.campaign_id not in results_by_campaign:
+            continue
+        for result in results_by_campaign[checkpoint.campaign_id]:
+            checkpoint.completed_types.append(result.analysis_type)
+            if (
+                result.campaign_id,
+                result.analysis_type,
+                result.metric_affected,
+            ) not in existing_keys:
+                checkpoint.result_ids.append(result.id)
+                created_results.append(result)
+        checkpoint.status = AnalysisCheckpoint.STATUS_COMPLETED
+        checkpoint.error = ''
+    _save_checkpoints(checkpoints)
+
+    logger.info(
+        f"Saved {len(results)} analysis results, {len(created_results)} of them new",
+    )
+    return created_results
+
+
+def _save_checkpoints(checkpoints):
+    """Insert the new checkpoints and update the others"""
+    checkpoint_fields = [
+        'status',
+        'attempts',
+        'completed_types',
+        'result_ids',
+        'error',
+        'updated_at',
+    ]
+    now = timezone.now()
+    for checkpoint in checkpoints:
+        # bulk_update does not apply auto_now
+        checkpoint.updated_at = now
+    AnalysisCheckpoint.objects.bulk_create(
+        [checkpoint for checkpoint in checkpoints if checkpoint.pk is None],
+    )
+    AnalysisCheckpoint.objects.bulk_update(
+        [checkpoint for checkpoint in checkpoints if checkpoint.pk is not None],
+        checkpoint_fields,
+    )
+
+
+def _advance_high_water_marks(campaigns, metric_marks):
+    """Record the latest daily metric covered by the analysis of each campaign
+
+    The marks are written in a single UPDATE joined to arrays of the new marks, so
+    the query count stays the same whatever the number of campaigns.
+    """
+    updated = []
+    for campaign in campaigns:
+        mark = metric_marks.get(campaign.id)
+        if mark is None or mark['latest_id'] == campaign.last_analyzed_metric_id:
+            continue
+        campaign.last_analyzed_metric_id = mark['latest_id']
+        campaign.last_analyzed_metric_date = mark['latest_date']
+        updated.append(campaign)
+    if not updated:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            HIGH_WATER_MARK_UPDATE,
+            [
+                [campaign.id for campaign in updated],
+                [campaign.last_analyzed_metric_id for campaign in updated],
+                [campaign.last_analyzed_metric_date for campaign in updated],
+            ],
+        )
+
+
+def _schedule_campaign_retry(checkpoint, analysis_date, days_back, backend):
+    """Retry a failed campaign on its own unless it ran out of attempts"""
+    if checkpoint.attempts >= settings.ANALYTICS_CAMPAIGN_MAX_ATTEMPTS:
+        logger.error(
+            f"Giving up on campaign {checkpoint.campaign_id} "
+            f"after {checkpoint.attempts} attempts",
+        )
+        return
+
+    logger.warning(
+        f"Scheduling a retry of campaign {checkpoint.campaign_id} "
+        f"for run {checkpoint.run_id}",
+    )
+    retry_campaign_analysis.apply_async(
+        (
+            checkpoint.run_id,
+            checkpoint.campaign_id,
+            analysis_date.isoformat(),
+            days_back,
+            backend,
+        ),
+        countdown=60,
+    )
+
+
+def enqueue_rollup_refresh(campaign_id):
+    """
+    Schedule a debounced rebuild of one campaign's rollups after its metrics changed.
+
+    The rebuild recomputes the rollups from the campaign's trailing metrics
+    rather than applying the change to them. The first change of a debounce
+    window schedules it at the end of the window; changes landing meanwhile are
+    picked up by that same rebuild.
+
+    Args:
+        campaign_id: Campaign whose daily metrics were written or deleted
+
+    Returns:
+        bool: Whether a new rebuild was scheduled
+    """
+    debounce = settings.ANALYTICS_ROLLUP_REFRESH_DEBOUNCE_SECONDS
+    if not cache.add(
+        ROLLUP_REFRESH_CACHE_KEY.format(campaign_id=campaign_id),
+        1,
+        timeout=debounce,
+    ):
+        return False
+
+    refresh_campaign_metric_rollups.apply_async(
+        kwargs={'campaign_ids': [campaign_id]},
+        countdown=debounce,
+    )
+    return True
+
+
+@celery_app.task
+def refresh_campaign_metric_rollups(campaign_ids=None):
+    """
+    Rebuild the CampaignMetricRollup rows of campaigns from their daily metrics.
+
+    Every DailyMetric write schedules this task for its campaign through
+    enqueue_rollup_refresh, which recomputes the rollups instead of updating them
+    incrementally. Called without campaigns, it covers bulk loads (fixtures,
+    imports) and serves as a nightly reconciliation.
+
+    Args:
+        campaign_ids: Campaigns to refresh (None for every campaign with metrics)
+
+    Returns:
+        dict: Number of campaigns and rollups refreshed
+    """
+    if campaign_ids is None:
+        campaign_ids = list(
+            DailyMetric.objects.values_list('campaign_id', flat=True)
+            .distinct()
+            .order_by('campaign_id'),
+        )
+
+    rollups_refreshed = 0
+    for start in range(0, len(campaign_ids), ROLLUP_REFRESH_CHUNK_SIZE):
+        rollups_refreshed += refresh_metric_rollups(
+            campaign_ids[start : start + ROLLUP_REFRESH_CHUNK_SIZE],
+        )
+
+    logger.info(
+        f"Refreshed {rollups_refreshed} metric rollups "
+        f"for {len(campaign_ids)} campaigns",
+    )
+    return {
+        'campaigns_refreshed': len(campaign_ids),
+        'rollups_refreshed': rollups_refreshed,
     }
+
+
+@celery_app.task
+def refresh_daily_metric_segments(metric_ids=None):
+    """
+    Rebuild the DailyMetricSegment rows of daily metrics from their breakdowns.
+
+    Segments are kept up to date on every DailyMetric write; this task covers
+    bulk loads (fixtures, imports) that bypass the model signals.
+
+    Args:
+        metric_ids: Daily metrics to refresh (None for every metric without segments)
+
+    Returns:
+        dict: Number of metrics and segments refreshed
+    """
+    if metric_ids is None:
+        metric_ids = list(
+            DailyMetric.objects.filter(segments__isnull=True)
+            .values_list('id', flat=True)
+            .order_by('id'),
+        )
+
+    segments_refreshed = 0
+    for start in range(0, len(metric_ids), SEGMENT_REFRESH_CHUNK_SIZE):
+        segments_refreshed += refresh_metric_segments(
+            metric_ids[start : start + SEGMENT_REFRESH_CHUNK_SIZE],
+        )
+
+    logger.info(
+        f"Refreshed {segments_refreshed} segments of {len(metric_ids)} daily metrics",
+    )
+    return {
+        'metrics_refreshed': len(metric_ids),
+        'segments_refreshed': segments_refreshed,
+    }
+
+
+@celery_app.task
+def refresh_campaign_seasonal_profiles():
+    """
+    Nightly recomputation of the cached day-of-week profiles of all active campaigns.
+
+    Returns:
+        dict: Number of profiles refreshed
+    """
+    if not settings.ANALYTICS_SEASONAL_BASELINES:
+        return {'profiles_refreshed': 0}
+
+    campaign_ids = list(
+        Campaign.objects.filter(status='active')
+        .order_by('id')
+        .values_list('id', flat=True),
+    )
+    today = datetime.now().date()
+    for start in range(0, len(campaign_ids), SEASONAL_PROFILE_CHUNK_SIZE):
+        refresh_seasonal_profiles(
+            campaign_ids[start : start + SEASONAL_PROFILE_CHUNK_SIZE],
+            today,
+        )
+
+    logger.info(f"Refreshed seasonal profiles of {len(campaign_ids)} campaigns")
+    return {'profiles_refreshed': len(campaign_ids)}
+
+
+@celery_app.task
+def refresh_metric_sketches(shard_rows=None):
+    """
+    Coordinator that adds the daily metrics created since the last refresh to the metric
+    sketches.
+
+    The new metric ids are split into ranges sketched by sketch_metric_shard
+    tasks running as a chord; merge_metric_sketch_shards merges their sketches
+    into the stored MetricSketch rows, so the history is never rescanned.
+
+    Args:
+        shard_rows: Metric ids per shard (None for settings.ANALYTICS_SKETCH_SHARD_ROWS)
+
+    Returns:
+        dict: Range of metric ids and number of shards dispatched
+    """
+    start_id = MetricSketch.objects.aggregate(last=Max('last_metric_id'))['last'] or 0
+    end_id = DailyMetric.objects.aggregate(last=Max('id'))['last'] or 0
+    shard_rows = shard_rows or settings.ANALYTICS_SKETCH_SHARD_ROWS
+    shards = [
+        (min_id, min(min_id + shard_rows, end_id))
+        for min_id in range(start_id, end_id, shard_rows)
+    ]
+
+    if shards:
+        chord(
+            sketch_metric_shard.s(min_id, max_id) for min_id, max_id in shards
+        )(merge_metric_sketch_shards.s(start_id, end_id))
+
+    logger.info(
+        f"Dispatched sketching of metrics {start_id + 1} to {end_id} "
+        f"in {len(shards)} shards",
+    )
+    return {
+        'status': 'dispatched',
+        'start_id': start_id,
+        'end_id': end_id,
+        'shards': len(shards),
+    }
+
+
+@celery_app.task
+def sketch_metric_shard(min_id, max_id):
+    """Sketch the metrics with ids in (min_id, max_id] by platform, objective, metric"""
+    return [
+        [platform, objective, metric, sketch.to_dict()]
+        for (platform, objective, metric), sketch in sketch_metrics(
+            min_id,
+            max_id,
+        ).items()
+    ]
+
+
+@celery_app.task
+def merge_metric_sketch_shards(shards, start_id, end_id):
+    """Merge the sketches of all shards into the stored metric sketches"""
+    sketches = merge_sketches(
+        [
+            {
+                (platform, objective, metric): QuantileSketch.from_dict(sketch)
+                for platform, objective, metric, sketch in shard
+            }
+            for shard in shards
+        ]
+    )
+    stored = update_metric_sketches(sketches, start_id, end_id)
+    if stored is None:
+        logger.warning(
+            f"Metric sketches no longer end at metric {start_id}, "
+            f"discarding metrics up to {end_id}",
+        )
+        return {'status': 'skipped'}
+
+    logger.info(f"Metric sketches now cover metrics up to {end_id} ({stored} sketches)")
+    return {
+        'status': 'success',
+        'last_metric_id': end_id,
+        'sketches': stored,
+    }
+
+
+def _incident_recommendation_prompt(incident: Incident, members: list[tuple]) -> str:
+    """Prompt asking the LLM service for the recommendations of a platform incident"""
+    affected = "\n".join(
+        f"- {campaign.name}: {anomaly_data['description']}"
+        for campaign, anomaly_data in members[:INCIDENT_PROMPT_CAMPAIGNS]
+    )
+    prompt = f"""
+    Platform: {incident.platform}
+    Issue Type: {incident.analysis_type}
+    Severity: {incident.severity}
+    Metric Affected: {incident.metric_affected}
+    Description: {incident.description}
     
-    if latest_metric.ctr < platform_thresholds['min_ctr']:
-        issues.append(f"CTR ({latest_metric.ctr}%) below threshold ({platform_thresholds['min_ctr']}%)")
-    
-    if latest_metric.cpa > platform_thresholds['max_cpa']:
-        issues.append(f"CPA (${latest_metric.cpa}) above threshold (${platform_thresholds['max_cpa']})")
-    
-    if latest_metric.roas < platform_thresholds['min_roas']:
-        issues.append(f"ROAS ({latest_metric.roas}) below threshold ({platform_thresholds['min_roas']})")
-    
-    if issues:
-        return {
-            'type': 'performance_threshold',
-            'severity': 'medium',
-            'metric': 'multiple',
-            'description': f"Performance below thresholds: {'; '.join(issues)}",
-            'metric_data': metric_data
-        }
+    Affected Campaigns:
+    {affected}
     
-    return None
+    The same anomaly appeared across these campaigns on the same day, which points to a 
+    platform-wide cause rather than to the individual campaigns. Provide 3-4 specific, 
+    actionable recommendations for handling it across the affected campaigns. Format 
+    each recommendation as a separate item.
+    """
+    return prompt
 
+def _apply_cached_recommendations(alert_requests: list[tuple]) -> list[tuple]:
+    """Give alerts the LLM recommendations cached under their fingerprint
 
-@transaction.atomic
-def _create_analysis_result(campaign, anomaly_data, analysis_date):
-    """Create and save analysis result to database with LLM recommendations and notifications"""
-    try:
-        # Get LLM recommendations based on the detailed metric data
-        llm_recommendations = _get_llm_recommendations(campaign, anomaly_data)
-        
-        analysis_result = AnalysisResult.objects.create(
-            analysis_type=anomaly_data['type'],
-            campaign=campaign,
-            date_detected=analysis_date,
-            severity=anomaly_data['severity'],
-            metric_affected=anomaly_data['metric'],
-            description=anomaly_data['description'],
-            recommendations=llm_recommendations
+    Returns the requests still needed.
+    """
+    cached = cached_recommendations(fingerprint for _, _, fingerprint in alert_requests)
+    remaining = []
+    for result, anomaly_data, fingerprint in alert_requests:
+        if fingerprint in cached:
+            result.recommendations = cached[fingerprint]
+        else:
+            remaining.append((result, anomaly_data, fingerprint))
+    return remaining
+
+
+def _enqueue_recommendation_enrichment(
+    alert_requests: list[tuple],
+    incident_requests: list[tuple],
+):
+    """Queue the LLM enrichment of the saved alerts and new incidents of a run
+
+    Alerts sharing an anomaly fingerprint are requested once, with the anomaly
+    of the first of them. With ANALYTICS_LLM_BATCHED_PROMPTS the fingerprints
+    a campaign requests go in one prompt, so its context is sent once, as
+    long as the prompt fits ANALYTICS_LLM_PROMPT_TOKEN_BUDGET.
+    Incidents are enriched first, then alerts in batches of
+    ANALYTICS_ENRICHMENT_BATCH_SIZE prompts. Alerts of campaigns that failed
+    were not saved and are left out.
+    """
+    incident_prompts = [[incident.id, prompt] for incident, prompt in incident_requests]
+
+    fingerprint_groups = {}
+    for result, anomaly_data, fingerprint in alert_requests:
+        if result.id is not None:
+            fingerprint_groups.setdefault(
+                fingerprint,
+                (result.campaign, anomaly_data, []),
+            )[2].append(result.id)
+    prompt_groups = {}
+    for fingerprint, (campaign, anomaly_data, result_ids) in fingerprint_groups.items():
+        key = campaign.id if settings.ANALYTICS_LLM_BATCHED_PROMPTS else fingerprint
+        prompt_groups.setdefault(key, (campaign, []))[1].append(
+            (anomaly_data, [result_ids, fingerprint]),
         )
-        
-        # Send notification
-        _send_anomaly_notification(campaign, analysis_result)
-        
-        logger.info(f"Created analysis result: {analysis_result.id} for campaign {campaign.name}")
-        return analysis_result
-        
-    except Exception as e:
-        logger.error(f"Failed to create analysis result: {str(e)}")
-        return None
+    result_prompts = []
+    for campaign, groups in prompt_groups.values():
+        # Anomalies that overrun the prompt token budget together are split across
+        # prompts
+        start = 0
+        for prompt, anomaly_count in recommendation_prompts(
+            campaign,
+            [anomaly_data for anomaly_data, _ in groups],
+        ):
+            result_prompts.append(
+                [prompt, [group for _, group in groups[start : start + anomaly_count]]],
+            )
+            start += anomaly_count
 
-def _get_llm_recommendations(campaign: Campaign, anomaly_data: Dict[str, Any]) -> List[str]:
-    """Get recommendations from LLM service based on detailed metric data"""
-    try:
-        # Prepare the prompt for the LLM with detailed metric data
-        prompt = f"""
-        Campaign: {campaign.name}
-        Platform: {campaign.platform}
-        Issue Type: {anomaly_data['type']}
-        Severity: {anomaly_data['severity']}
-        Metric Affected: {anomaly_data['metric']}
-        Description: {anomaly_data['description']}
-        
-        Metric Data:
-        {json.dumps(anomaly_data.get('metric_data', {}), indent=2)}
-        
-        Based on this campaign anomaly and the detailed metric data provided, provide 3-4 specific, 
-        actionable recommendations for improving campaign performance. Focus on practical steps 
-        that can be taken immediately. Format each recommendation as a separate item.
-        """
-        
-        # Call LLM service
-        response = httpx.post(
-            "http://llm:8000/chat",
-            json={
-                "messages": [
-                    {"role": "system", "content": "You are a digital marketing expert providing campaign optimization advice based on detailed metric analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 100
-            },
-            timeout=10.0
+    if incident_prompts:
+        enrich_recommendations.delay(incident_prompts=incident_prompts)
+    batch_size = settings.ANALYTICS_ENRICHMENT_BATCH_SIZE
+    for start in range(0, len(result_prompts), batch_size):
+        enrich_recommendations.delay(
+            result_prompts=result_prompts[start : start + batch_size],
         )
+
+def _request_llm_responses(
+    prompts: list[str],
+    anomaly_counts: list[int],
+) -> list[str | None]:
+    """Send prompts to the LLM service concurrently and return the text of each response
+
+    At most ANALYTICS_LLM_CONCURRENCY requests are in flight at a time, and
+    requests the service rate limits (429) are retried after the delay it asks
+    for or an exponential backoff. Responses may spend enough tokens on the
+    recommendations of every anomaly their prompt covers. Prompts whose
+    request fails get None.
+    """
+    if not prompts:
+        return []
+    return asyncio.run(_gather_llm_responses(prompts, anomaly_counts))
+
+async def _gather_llm_responses(
+    prompts: list[str],
+    anomaly_counts: list[int],
+) -> list[str | None]:
+    semaphore = asyncio.Semaphore(settings.ANALYTICS_LLM_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        return await asyncio.gather(
+            *(
+                _fetch_llm_response(
+                    client,
+                    semaphore,
+                    prompt,
+                    response_max_tokens(anomaly_count),
+                )
+                for prompt, anomaly_count in zip(prompts, anomaly_counts, strict=True)
+            )
+        )
+
+async def _fetch_llm_response(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    prompt: str,
+    max_tokens: int,
+) -> str | None:
+    LLM_PROMPT_TOKENS.observe(estimate_tokens(prompt))
+    try:
+        for attempt in range(settings.ANALYTICS_LLM_MAX_RETRIES + 1):
+            # Call LLM service
+            async with semaphore:
+                with LLM_REQUEST_SECONDS.time():
+                    response = await client.post(
+                        "http://llm:8000/chat",
+                        json={
+                            "messages": [
+                                {
+                                    "role": "system",
+                                    "content": (
+                                        "You are a digital marketing expert "
+                                        "providing campaign optimization advice "
+                                        "based on detailed metric analysis."
+                                    ),
+                                },
+                                {"role": "user", "content": prompt},
+                            ],
+                            "temperature": 0.7,
+                            "max_tokens": max_tokens,
+                        },
+                    )
+            if (
+                response.status_code != 429
+                or attempt == settings.ANALYTICS_LLM_MAX_RETRIES
+            ):
+                break
+            # Back off without holding a slot, so requests that are not rate limited go
+            # ahead
+            await asyncio.sleep(_llm_retry_delay(response, attempt))
         response.raise_for_status()
-        
+        return response.json()['response']
+
+    except SoftTimeLimitExceeded:
+        raise
+    except Exception as e:
+        LLM_REQUEST_FAILURES.labels(type(e).__name__).inc()
+        logger.error(f"Failed to get LLM recommendations: {str(e)}")
+        return None
+
+def _parse_recommendations(response: str | None, anomaly_count: int) -> list[list[str]]:
+    """Recommendations of each anomaly a prompt covers, from the LLM service's response
+
+    Prompts for one anomaly are answered with a recommendation per line, and
+    batched prompts with a JSON object of recommendation lists keyed by
+    anomaly number. Anomalies the response misses get no recommendations.
+    """
+    if response is None:
+        return [[] for _ in range(anomaly_count)]
+
+    if anomaly_count == 1:
         # Parse and format recommendations
-        llm_response = response.json()
         recommendations = [
-            rec.strip() for rec in llm_response['response'].split('\n')
+            rec.strip() for rec in response.split('\n')
             if rec.strip() and not rec.strip().startswith(('Based on', 'Here are', 'Recommendations:'))
         ]
-        
-        return recommendations[:4]  # Limit to top 4 recommendations
-        
-    except Exception as e:
-        logger.error(f"Failed to get LLM recommendations: {str(e)}")
-        return []
+        return [recommendations[:MAX_RECOMMENDATIONS]]
 
-def _send_anomaly_notification(campaign: Campaign, analysis_result: AnalysisResult):
-    """Send notification about the anomaly via RabbitMQ"""
+    try:
+        # Models wrap the object in prose or code fences now and then
+        parsed = json.loads(response[response.index('{'):response.rindex('}') + 1])
+    except ValueError:
+        logger.error(f"Failed to parse batched LLM recommendations: {response[:200]!r}")
+        return [[] for _ in range(anomaly_count)]
+
+    recommendations = []
+    for number in range(1, anomaly_count + 1):
+        items = parsed.get(str(number)) if isinstance(parsed, dict) else None
+        if not isinstance(items, list):
+            items = []
+        recommendations.append(
+            [item.strip() for item in items if isinstance(item, str) and item.strip()][
+                :MAX_RECOMMENDATIONS
+            ]
+        )
+    return recommendations
+
+def _llm_retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying a rate limited request
+
+    That is its Retry-After, or a jittered backoff without one.
+    """
+    retry_after = response.headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        return float(retry_after)
+    # Jitter keeps requests rate limited together from all retrying at once
+    return (
+        settings.ANALYTICS_LLM_RETRY_BACKOFF_SECONDS
+        * 2**attempt
+        * random.uniform(0.5, 1.0)
+    )
+
+def _send_anomaly_notification(
+    campaign: Campaign,
+    analysis_result: AnalysisResult,
+    preliminary: bool = False,
+):
+    """Send notification about the anomaly via RabbitMQ
+
+    Preliminary notifications go out before the LLM service's recommendations
+    replace the rule-based ones and say so.
+    """
     try:
         # Prepare notification message
         notification = {
@@ -349,16 +1935,94 @@ def _send_anomaly_notification(campaign: Campaign, analysis_result: AnalysisResu
             Description:
             {analysis_result.description}
             
-            Recommendations:
+            {_recommendations_heading(preliminary)}
             {chr(10).join(f'- {rec}' for rec in analysis_result.recommendations)}
             
             Please review and take appropriate action.
             """
         }
         
-        # Send message to RabbitMQ using synchronous client
-        import pika
+        _publish_notification(notification)
+        logger.info(f"Sent notification for analysis result: {analysis_result.id}")
         
+    except Exception as e:
+        logger.error(f"Failed to send notification: {str(e)}")
+
+def _send_incident_notification(
+    incident: Incident,
+    campaigns: list[Campaign],
+    update: bool = False,
+):
+    """Send a single notification about an incident and its campaigns via RabbitMQ
+
+    Updates announce campaigns that joined an incident after it was opened
+    and list only those campaigns. Incidents still carrying their rule-based
+    recommendations are announced with them marked as preliminary.
+    """
+    try:
+        preliminary = incident.recommendations == incident_rule_based_recommendations(
+            incident.platform, incident.analysis_type,
+        )
+        affected = chr(10).join(
+            f'- {campaign.name}: {settings.FRONTEND_URL}dashboard/{campaign.id}'
+            for campaign in campaigns
+        )
+        title = 'Platform Incident Update' if update else 'Platform Incident'
+        scope = (
+            f"{len(campaigns)} more campaigns"
+            if update
+            else f"{len(campaigns)} campaigns"
+        )
+        notification = {
+            "to_email": settings.DEFAULT_NOTIFICATION_EMAIL,
+            "subject": (
+                f"{title}: {incident.severity.upper()} - {incident.platform} "
+                f"{incident.analysis_type} across {scope}"
+            ),
+            "body": f"""
+            {title}: {incident.severity.upper()}
+            
+            Platform: {incident.platform}
+            Issue Type: {incident.analysis_type}
+            Metric Affected: {incident.metric_affected}
+            
+            Description:
+            {incident.description}
+            
+            {'Newly Affected Campaigns' if update else 'Affected Campaigns'}:
+            {affected}
+            
+            {_recommendations_heading(preliminary)}
+            {chr(10).join(f'- {rec}' for rec in incident.recommendations)}
+            
+            Please review and take appropriate action.
+            """
+        }
+
+        _publish_notification(notification)
+        logger.info(
+            f"Sent {'update ' if update else ''}notification "
+            f"for incident: {incident.id}",
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to send incident notification: {str(e)}")
+
+def _recommendations_heading(preliminary: bool) -> str:
+    """Heading of a notification's recommendations, marking rule-based ones"""
+    if preliminary:
+        return (
+            'Preliminary Recommendations (tailored recommendations will replace them '
+            'on the dashboard shortly):'
+        )
+    return 'Recommendations:'
+
+def _publish_notification(notification: dict[str, Any]):
+    """Publish a notification message to RabbitMQ"""
+    # Send message to RabbitMQ using synchronous client
+    import pika
+    
+    with NOTIFICATION_PUBLISH_SECONDS.time():
         # Connect to RabbitMQ
         connection = pika.BlockingConnection(
             pika.ConnectionParameters(
@@ -367,17 +2031,12 @@ def _send_anomaly_notification(campaign: Campaign, analysis_result: AnalysisResu
                 credentials=pika.PlainCredentials('guest', 'guest')
             )
         )
-        
+    
         channel = connection.channel()
         channel.basic_publish(
             exchange='',
             routing_key='notifications',
             body=json.dumps(notification).encode()
         )
-        
+    
         connection.close()
-        
-        logger.info(f"Sent notification for analysis result: {analysis_result.id}")
-        
-    except Exception as e:
-        logger.error(f"Failed to send notification: {str(e)}")
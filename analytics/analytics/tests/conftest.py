@@ -0,0 +1,25 @@
+import uuid
+
+import pytest
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+@pytest.fixture
+def redis_cache(settings):
+    """The Redis cache under a key prefix of the test's own, skipping without Redis"""
+    try:
+        get_redis_connection("default").ping()
+    except RedisError:
+        pytest.skip("Redis is not reachable")
+
+    settings.CACHES = {
+        "default": {
+            **settings.CACHES["default"],
+            "KEY_PREFIX": f"test-{uuid.uuid4().hex}",
+        },
+    }
+    yield cache
+    # django-redis matches the pattern within the key prefix only
+    cache.delete_pattern("*")
@@ -0,0 +1,148 @@
+from datetime import date
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from analytics.detection import BACKENDS
+from analytics.detection import DEFAULT_THRESHOLDS
+from analytics.detection.detectors import conversion_drop_mask
+from analytics.detection.detectors import cpc_spike_mask
+from analytics.detection.detectors import ctr_drop_mask
+from analytics.detection.detectors import series_stats
+from analytics.detection.detectors import spend_spike_mask
+from analytics.detection.detectors import threshold_mask
+from analytics.models import Campaign
+
+# Analysis dates of the parity test, spread over the fixture's metrics history
+PARITY_START = date(2024, 1, 4)
+PARITY_END = date(2024, 7, 2)
+PARITY_STEP_DAYS = 3
+
+# Valid counts of three rows: too short a window, the shortest usable one and a full one
+COUNTS = np.array([2, 3, 7])
+
+
+def _alert_set(backend: str) -> set[tuple]:
+    """Anomalies a backend raises on the parity dates, as comparable tuples"""
+    campaigns = Campaign.objects.filter(status="active")
+    campaigns_by_id = {campaign.id: campaign for campaign in campaigns}
+    found = set()
+    analysis_date = PARITY_START
+    while analysis_date <= PARITY_END:
+        anomalies = BACKENDS[backend](
+            campaigns,
+            campaigns_by_id,
+            analysis_date,
+            7,
+            DEFAULT_THRESHOLDS,
+        )
+        found.update(
+            (
+                analysis_date,
+                campaign_id,
+                anomaly["type"],
+                anomaly["severity"],
+                anomaly["description"],
+            )
+            for campaign_id, campaign_anomalies in anomalies.items()
+            for anomaly in campaign_anomalies
+        )
+        analysis_date += timedelta(days=PARITY_STEP_DAYS)
+    return found
+
+
+@pytest.mark.postgres
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor != "postgresql",
+    reason="The sql backend runs Postgres window functions",
+)
+def test_sql_backend_raises_the_python_backends_alerts():
+    call_command("loaddata", "marketing_data", verbosity=0)
+
+    python_alerts = _alert_set("python")
+
+    assert python_alerts
+    assert _alert_set("sql") == python_alerts
+
+
+def test_series_stats_compares_latest_valid_value_with_the_others():
+    values = np.array([[0.0, 5.0, 4.0, 0.0, 6.0]])
+    valid = values > 0
+
+    recent, baseline, counts = series_stats(values, valid)
+
+    assert recent.tolist() == [5.0]
+    assert baseline.tolist() == [5.0]
+    assert counts.tolist() == [3]
+
+
+def test_series_stats_rescales_deseasonalized_baseline_to_latest_weekday():
+    values = np.array([[9.0, 4.0, 6.0]])
+    seasonal = np.array([[1.5, 1.0, 2.0]])
+
+    _, baseline, _ = series_stats(values, values > 0, seasonal)
+
+    # (4 / 1 + 6 / 2) / 2 = 3.5 on a flat day, 5.25 on the latest day's weekday
+    assert baseline.tolist() == pytest.approx([5.25])
+
+
+def test_drop_masks_need_three_values_and_a_drop_past_the_factor():
+    baseline = np.full(3, 10.0)
+    dropped = np.full(3, 5.0)
+
+    assert ctr_drop_mask(dropped, baseline, COUNTS).tolist() == [False, True, True]
+    assert not ctr_drop_mask(np.full(3, 6.0), baseline, COUNTS).any()
+
+    assert conversion_drop_mask(np.full(3, 4.0), baseline, COUNTS).tolist() == [
+        False,
+        True,
+        True,
+    ]
+    # Conversion drops from a baseline rate of 1% or less are noise
+    low_baseline = np.full(3, 1.0)
+    assert not conversion_drop_mask(np.zeros(3), low_baseline, COUNTS).any()
+
+
+def test_spike_masks_need_three_values_and_a_spike_past_the_factor():
+    baseline = np.full(3, 10.0)
+
+    assert cpc_spike_mask(np.full(3, 16.0), baseline, COUNTS).tolist() == [
+        False,
+        True,
+        True,
+    ]
+    assert not cpc_spike_mask(np.full(3, 15.0), baseline, COUNTS).any()
+
+    budget = np.array([100.0, 100.0, 10.0])
+    # Above 200% of the baseline, or only above 150% of the daily budget
+    recent = np.array([21.0, 21.0, 16.0])
+    assert spend_spike_mask(recent, baseline, COUNTS, budget).tolist() == [
+        False,
+        True,
+        True,
+    ]
+    at_limits = np.array([20.0, 20.0, 15.0])
+    assert not spend_spike_mask(at_limits, baseline, COUNTS, budget).any()
+
+
+def test_threshold_mask_applies_each_campaigns_platform_thresholds():
+    campaigns = [
+        Campaign(platform="Google", objective="conversions"),
+        Campaign(platform="LinkedIn", objective="conversions"),
+        # Unknown platforms are held to the default platform's thresholds
+        Campaign(platform="Snapchat", objective="conversions"),
+    ]
+    ctr = np.full(3, 1.5)
+    cpa = np.full(3, 30.0)
+    roas = np.full(3, 3.0)
+
+    assert threshold_mask(campaigns, ctr, cpa, roas).tolist() == [True, False, False]
+    assert threshold_mask(campaigns, ctr, cpa * 2, roas).tolist() == [
+        True,
+        False,
+        True,
+    ]
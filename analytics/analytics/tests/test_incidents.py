@@ -0,0 +1,108 @@
+from datetime import date
+
+import pytest
+
+from analytics import tasks
+from analytics.models import AnalysisResult
+from analytics.models import Campaign
+from analytics.models import Incident
+
+ANALYSIS_DATE = date(2024, 6, 30)
+KEY = ("Facebook", "ctr_drop", "ctr")
+CTR_DROP = {
+    "type": "ctr_drop",
+    "metric": "ctr",
+    "severity": "high",
+    "description": "CTR dropped by 45.0% compared to recent average",
+}
+
+
+def _campaigns(count: int) -> dict[int, Campaign]:
+    campaigns = [
+        Campaign.objects.create(
+            name=f"Campaign {number}",
+            platform="Facebook",
+            objective="conversions",
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            budget=5000,
+            audience_segment="All",
+            status="active",
+        )
+        for number in range(count)
+    ]
+    return {campaign.id: campaign for campaign in campaigns}
+
+
+def _correlate(campaigns_by_id: dict[int, Campaign]):
+    requests = []
+    pending = {campaign_id: [dict(CTR_DROP)] for campaign_id in campaigns_by_id}
+    incidents, new_incidents, linked = tasks._correlate_incidents(  # noqa: SLF001
+        pending,
+        campaigns_by_id,
+        ANALYSIS_DATE,
+        requests,
+    )
+    return incidents, new_incidents, linked, requests
+
+
+@pytest.mark.django_db
+def test_incident_opens_once_enough_campaigns_raise_an_anomaly(settings):
+    settings.ANALYTICS_INCIDENT_MIN_CAMPAIGNS = 3
+
+    incidents, new_incidents, _, requests = _correlate(_campaigns(3))
+
+    assert new_incidents == [incidents[KEY]]
+    assert incidents[KEY].description.startswith("3 Facebook campaigns")
+    assert [incident for incident, _ in requests] == new_incidents
+
+
+@pytest.mark.django_db
+def test_no_incident_below_the_campaign_threshold(settings):
+    settings.ANALYTICS_INCIDENT_MIN_CAMPAIGNS = 3
+
+    incidents, new_incidents, _, requests = _correlate(_campaigns(2))
+
+    assert (incidents, new_incidents, requests) == ({}, [], [])
+    assert not Incident.objects.exists()
+
+
+@pytest.mark.django_db
+def test_alerts_of_earlier_runs_count_towards_an_incident(settings):
+    settings.ANALYTICS_INCIDENT_MIN_CAMPAIGNS = 3
+    earlier, *current = _campaigns(3).values()
+    earlier_alert = AnalysisResult.objects.create(
+        analysis_type="ctr_drop",
+        campaign=earlier,
+        date_detected=ANALYSIS_DATE,
+        severity="medium",
+        metric_affected="ctr",
+        description="CTR dropped by 42.0% compared to recent average",
+        recommendations=[],
+    )
+
+    current_by_id = {campaign.id: campaign for campaign in current}
+
+    incidents, _, linked, _ = _correlate(current_by_id)
+
+    earlier_alert.refresh_from_db()
+    assert earlier_alert.incident == incidents[KEY]
+    assert linked == {incidents[KEY].id: [earlier]}
+
+
+@pytest.mark.django_db
+def test_campaigns_join_the_days_open_incident(settings):
+    settings.ANALYTICS_INCIDENT_MIN_CAMPAIGNS = 3
+    incident = Incident.objects.create(
+        platform="Facebook",
+        analysis_type="ctr_drop",
+        metric_affected="ctr",
+        date_detected=ANALYSIS_DATE,
+        severity="high",
+        description="3 Facebook campaigns raised ctr_drop on ctr at once",
+    )
+
+    incidents, new_incidents, _, requests = _correlate(_campaigns(1))
+
+    assert incidents == {KEY: incident}
+    assert (new_incidents, requests) == ([], [])
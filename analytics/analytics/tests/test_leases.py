@@ -0,0 +1,39 @@
+import time
+
+from analytics.leases import LeaseGroup
+
+# Short enough for leases to expire within a test, long enough to claim them first
+TTL_SECONDS = 0.3
+
+
+def test_leases_are_claimed_once_except_by_the_same_run(redis_cache):
+    first = LeaseGroup("run-a", TTL_SECONDS)
+    assert first.acquire(["campaign:1", "campaign:2"]) == ["campaign:1", "campaign:2"]
+
+    other = LeaseGroup("run-b", TTL_SECONDS)
+    assert other.acquire(["campaign:2", "campaign:3"]) == ["campaign:3"]
+
+    # A retry of the run passes the same token and reclaims its leases
+    retry = LeaseGroup("run-a", TTL_SECONDS)
+    assert retry.acquire(["campaign:1"]) == ["campaign:1"]
+
+
+def test_leases_expire_without_renewal(redis_cache):
+    first = LeaseGroup("run-a", TTL_SECONDS)
+    first.acquire(["campaign:1"])
+
+    time.sleep(TTL_SECONDS * 2)
+
+    assert LeaseGroup("run-b", TTL_SECONDS).acquire(["campaign:1"]) == ["campaign:1"]
+    assert first.renew() == 0
+    assert first.release() == 0
+
+
+def test_heartbeat_keeps_leases_until_released(redis_cache):
+    with LeaseGroup("run-a", TTL_SECONDS) as leases:
+        leases.acquire(["campaign:1"])
+        time.sleep(TTL_SECONDS * 3)
+
+        assert LeaseGroup("run-b", TTL_SECONDS).acquire(["campaign:1"]) == []
+
+    assert LeaseGroup("run-b", TTL_SECONDS).acquire(["campaign:1"]) == ["campaign:1"]
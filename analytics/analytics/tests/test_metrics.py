@@ -0,0 +1,84 @@
+import socket
+import subprocess
+import sys
+import urllib.request
+from http import HTTPStatus
+
+from django.conf import settings
+from prometheus_client.parser import text_string_to_metric_families
+
+from analytics.metrics import ALERTS_CREATED
+from analytics.metrics import render_metrics
+from analytics.metrics import start_worker_exporter
+
+# Increments a counter from a process of its own, as Celery's prefork children do
+CHILD_SCRIPT = (
+    "from analytics.metrics import CAMPAIGNS_ANALYZED; "
+    "CAMPAIGNS_ANALYZED.labels('{task}').inc({amount})"
+)
+
+
+def _sample_value(exposition: str, name: str, labels: dict[str, str]) -> float | None:
+    """Value of the sample of ``name`` with ``labels`` in an exposition, if any"""
+    for family in text_string_to_metric_families(exposition):
+        for sample in family.samples:
+            if sample.name == name and sample.labels == labels:
+                return sample.value
+    return None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _record_in_child(multiproc_dir, task: str, amount: int):
+    subprocess.run(  # noqa: S603
+        [sys.executable, "-c", CHILD_SCRIPT.format(task=task, amount=amount)],
+        cwd=settings.BASE_DIR,
+        env={"PROMETHEUS_MULTIPROC_DIR": str(multiproc_dir), "PATH": ""},
+        check=True,
+    )
+
+
+def test_metrics_view_exposes_counters(client):
+    name = "analytics_alerts_created_total"
+    labels = {"severity": "high", "analysis_type": "ctr_drop"}
+    before = _sample_value(client.get("/metrics").content.decode(), name, labels) or 0
+
+    ALERTS_CREATED.labels(**labels).inc()
+
+    response = client.get("/metrics")
+    assert response.status_code == HTTPStatus.OK
+    assert response["Content-Type"].startswith("text/plain")
+    assert _sample_value(response.content.decode(), name, labels) == before + 1
+
+
+def test_render_metrics_aggregates_pool_processes(tmp_path, monkeypatch):
+    amounts = [2, 3]
+    for amount in amounts:
+        _record_in_child(tmp_path, "analyze_campaign_performance", amount)
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+    exposition = render_metrics().decode()
+
+    labels = {"task": "analyze_campaign_performance"}
+    total = _sample_value(exposition, "analytics_campaigns_analyzed_total", labels)
+    assert total == sum(amounts)
+
+
+def test_worker_exporter_serves_pool_process_metrics(tmp_path, monkeypatch):
+    amount = 4
+    _record_in_child(tmp_path, "analyze_campaign_shard", amount)
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    port = _free_port()
+
+    start_worker_exporter(port)
+    url = f"http://127.0.0.1:{port}/metrics"
+    with urllib.request.urlopen(url, timeout=5) as response:
+        exposition = response.read().decode()
+
+    labels = {"task": "analyze_campaign_shard"}
+    total = _sample_value(exposition, "analytics_campaigns_analyzed_total", labels)
+    assert total == amount
@@ -0,0 +1,36 @@
+from prometheus_client import REGISTRY
+
+from analytics.recommendations import cache_recommendations
+from analytics.recommendations import cached_recommendations
+
+LOOKUPS = "analytics_recommendation_cache_lookups_total"
+
+
+def _lookups(result: str) -> float:
+    return REGISTRY.get_sample_value(LOOKUPS, {"result": result}) or 0
+
+
+def test_cache_returns_hits_and_counts_misses(redis_cache):
+    cache_recommendations({"facebook:ctr_drop": ["Refresh the creative"]})
+    hits, misses = _lookups("hit"), _lookups("miss")
+
+    cached = cached_recommendations(["facebook:ctr_drop", "google:cpc_spike"])
+
+    assert cached == {"facebook:ctr_drop": ["Refresh the creative"]}
+    assert _lookups("hit") == hits + 1
+    assert _lookups("miss") == misses + 1
+
+
+def test_cache_evicts_least_recently_used_entries(redis_cache, settings):
+    settings.ANALYTICS_RECOMMENDATION_CACHE_MAX_ENTRIES = 2
+    cache_recommendations({"first": ["a"]})
+    cache_recommendations({"second": ["b"]})
+    # Reading the first entry makes the second the least recently used one
+    cached_recommendations(["first"])
+
+    cache_recommendations({"third": ["c"]})
+
+    assert cached_recommendations(["first", "second", "third"]) == {
+        "first": ["a"],
+        "third": ["c"],
+    }
@@ -1,16 +1,78 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 
+from .instrumentation import Profiler, query_budget
+from .metrics import API_REQUEST_SECONDS, render_metrics
 from .models import AnalysisResult
 from .serializers import AnalysisResultSerializer, AnalysisResultListSerializer
 
+logger = logging.getLogger(__name__)
+
+
+# Scrapes never touch the database, so they do not open a connection for a request
+# transaction
+@transaction.non_atomic_requests
+def metrics(request):
+    """Prometheus metrics of this process"""
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+
+class InstrumentedViewMixin:
+    """Times a view, holds it to its query budget and profiles requests asking for it
+
+    Request latency is recorded per route. The budget is the view's entry in
+    ANALYTICS_QUERY_BUDGETS. With ANALYTICS_PROFILE_VIEWS, requests with
+    ``?profile=1`` are profiled and their report and query counts are logged
+    and returned in headers.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        name = f"{type(self).__module__}.{type(self).__name__}"
+        route = request.resolver_match.route if request.resolver_match else name
+        profiled = (
+            settings.ANALYTICS_PROFILE_VIEWS and request.GET.get('profile') == '1'
+        )
+        status = 500
+        start = time.perf_counter()
+        try:
+            with (
+                Profiler(enabled=profiled) as profiler,
+                query_budget(name) as query_stats,
+            ):
+                response = super().dispatch(request, *args, **kwargs)
+            status = response.status_code
+        finally:
+            API_REQUEST_SECONDS.labels(route, request.method, status).observe(
+                time.perf_counter() - start,
+            )
+
+        if profiled:
+            logger.info(
+                "%s ran %d queries in %.3fs\n%s",
+                name,
+                query_stats.count,
+                query_stats.seconds,
+                profiler.report,
+            )
+            response['X-Query-Count'] = str(query_stats.count)
+            response['X-Query-Seconds'] = f"{query_stats.seconds:.4f}"
+        return response
+
 
-class AnalysisResultListView(ListAPIView):
+class AnalysisResultListView(InstrumentedViewMixin, ListAPIView):
     """Returns the list of analysis results with filtering capabilities"""
 
     serializer_class = AnalysisResultListSerializer
 
     def get_queryset(self):
-        queryset = AnalysisResult.objects.all()
+        # The serializers show the campaign name of every result
+        queryset = AnalysisResult.objects.select_related('campaign')
         
         # Get query parameters
         severity = self.request.query_params.get('severity')
@@ -34,8 +96,8 @@ class AnalysisResultListView(ListAPIView):
         return queryset.order_by('-date_detected')
 
 
-class AnalysisResultDetailView(RetrieveAPIView):
+class AnalysisResultDetailView(InstrumentedViewMixin, RetrieveAPIView):
     """Returns a single analysis result by ID"""
     serializer_class = AnalysisResultSerializer
-    queryset = AnalysisResult.objects.all()
+    queryset = AnalysisResult.objects.select_related('campaign')
     lookup_field = 'id'
@@ -3,6 +3,8 @@ import os
 from celery import Celery
 from celery.schedules import crontab
 from celery.signals import setup_logging
+from celery.signals import worker_init
+from celery.signals import worker_process_shutdown
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
@@ -20,13 +22,51 @@ def config_loggers(*args, **kwargs):
     dictConfig(settings.LOGGING)
 
 
+@worker_init.connect
+def start_metrics_exporter(*args, **kwargs):
+    from django.conf import settings
+
+    from analytics.metrics import start_worker_exporter
+
+    if settings.ANALYTICS_METRICS_WORKER_PORT:
+        start_worker_exporter(settings.ANALYTICS_METRICS_WORKER_PORT)
+
+
+@worker_process_shutdown.connect
+def drop_pool_process_metrics(pid=None, *args, **kwargs):
+    from analytics.metrics import mark_process_dead
+
+    mark_process_dead(pid)
+
+
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
 
-# Schedule the analytics task to run every day at 06:20
+# Schedule the analytics task to run every hour, fanned out across the workers, as a
+# reconciliation sweep behind the analyses triggered by metric ingestion
 app.conf.beat_schedule = {
     'analyze-campaign-performance': {
-        'task': 'analytics.tasks.analyze_campaign_performance',
+        'task': 'analytics.tasks.dispatch_campaign_analysis',
         'schedule': crontab(minute=3),
     },
+    'refresh-campaign-metric-rollups': {
+        'task': 'analytics.tasks.refresh_campaign_metric_rollups',
+        'schedule': crontab(hour=2, minute=15),
+    },
+    'refresh-daily-metric-segments': {
+        'task': 'analytics.tasks.refresh_daily_metric_segments',
+        'schedule': crontab(hour=2, minute=10),
+    },
+    'refresh-metric-sketches': {
+        'task': 'analytics.tasks.refresh_metric_sketches',
+        'schedule': crontab(hour=2, minute=20),
+    },
+    'refresh-seasonal-profiles': {
+        'task': 'analytics.tasks.refresh_campaign_seasonal_profiles',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'purge-analysis-checkpoints': {
+        'task': 'analytics.tasks.purge_analysis_checkpoints',
+        'schedule': crontab(hour=2, minute=45),
+    },
 }
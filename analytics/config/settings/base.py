@@ -193,6 +193,19 @@ CELERY_WORKER_SEND_TASK_EVENTS = True
 CELERY_TASK_SEND_SENT_EVENT = True
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#worker-hijack-root-logger
 CELERY_WORKER_HIJACK_ROOT_LOGGER = False
+# https://docs.celeryq.dev/en/stable/userguide/routing.html#automatic-routing
+# Analyst-requested runs get their own queue so they never wait behind batch work; the shards of
+# the hourly sweep are sent to the queue of their campaigns' cadence tier (ANALYTICS_CADENCE_TIERS)
+CELERY_TASK_ROUTES = {
+    "analytics.tasks.analyze_campaign_performance": {"queue": "interactive"},
+    "analytics.tasks.analyze_campaign_shard": {"queue": "bulk"},
+    "analytics.tasks.retry_campaign_analysis": {"queue": "bulk"},
+    "analytics.tasks.backfill_analysis_chunk": {"queue": "bulk"},
+    "analytics.tasks.sketch_metric_shard": {"queue": "bulk"},
+    "analytics.tasks.refresh_campaign_metric_rollups": {"queue": "bulk"},
+    # LLM enrichment only waits on the network and is kept off the analysis workers
+    "analytics.tasks.enrich_recommendations": {"queue": "llm"},
+}
 # django-rest-framework
 # -------------------------------------------------------------------------------
 # django-rest-framework - https://www.django-rest-framework.org/api-guide/settings/
@@ -235,6 +248,99 @@ SPECTACULAR_SETTINGS = {
 # ------------------------------------------------------------------------------
 FRONTEND_URL = "http://localhost:3000/"
 DEFAULT_NOTIFICATION_EMAIL = env("DEFAULT_NOTIFICATION_EMAIL", default="alerts@example.com")
+# Execution backend of the anomaly detectors: "python" (NumPy), "sql" (Postgres window functions)
+# or "rollup" (CampaignMetricRollup baselines, recomputed in the background after metric writes)
+ANALYTICS_DETECTION_BACKEND = env("ANALYTICS_DETECTION_BACKEND", default="python")
+# Campaigns per shard of the scheduled analysis fan-out
+ANALYTICS_SHARD_SIZE = env.int("ANALYTICS_SHARD_SIZE", default=500)
+# Maximum number of shards (and therefore concurrently busy workers) per scheduled run
+ANALYTICS_SHARD_CONCURRENCY = env.int("ANALYTICS_SHARD_CONCURRENCY", default=16)
+# Attempts per campaign before a failing campaign is no longer retried on its own
+ANALYTICS_CAMPAIGN_MAX_ATTEMPTS = env.int("ANALYTICS_CAMPAIGN_MAX_ATTEMPTS", default=3)
+# Seconds a run's leases on campaigns outlive the worker holding them without a heartbeat
+ANALYTICS_LEASE_TTL_SECONDS = env.int("ANALYTICS_LEASE_TTL_SECONDS", default=120)
+# Campaigns whose alerts and checkpoints an analysis run commits together, so that a run
+# stopped midway keeps the chunks it saved
+ANALYTICS_CHECKPOINT_CHUNK_SIZE = env.int("ANALYTICS_CHECKPOINT_CHUNK_SIZE", default=200)
+# Days analysis run checkpoints are kept for
+ANALYTICS_CHECKPOINT_RETENTION_DAYS = env.int("ANALYTICS_CHECKPOINT_RETENTION_DAYS", default=7)
+# Compare the latest day against its weekday's baseline from the cached day-of-week profiles.
+# Only the python backend and backfills apply them: with this on, analysis runs with the sql or
+# rollup backend fail instead of comparing against flat baselines. Threshold replays keep flat
+# baselines, so their results differ from the python backend's.
+ANALYTICS_SEASONAL_BASELINES = env.bool("ANALYTICS_SEASONAL_BASELINES", default=False)
+# Weeks of metrics the day-of-week profiles are computed from
+ANALYTICS_SEASONAL_PROFILE_WEEKS = env.int("ANALYTICS_SEASONAL_PROFILE_WEEKS", default=12)
+# Hold campaigns to percentiles of their platform's sketched CTR, CPA and ROAS instead of the static thresholds
+ANALYTICS_PERCENTILE_THRESHOLDS = env.bool("ANALYTICS_PERCENTILE_THRESHOLDS", default=False)
+# Percentile of its metric every platform threshold is set at
+ANALYTICS_THRESHOLD_PERCENTILES = {"min_ctr": 10, "max_cpa": 90, "min_roas": 10}
+# Daily metric ids per shard of the metric sketch refresh
+ANALYTICS_SKETCH_SHARD_ROWS = env.int("ANALYTICS_SKETCH_SHARD_ROWS", default=100000)
+# Scan the device and geography breakdowns for collapsing segment shares
+ANALYTICS_SEGMENT_ANOMALIES = env.bool("ANALYTICS_SEGMENT_ANOMALIES", default=True)
+# Seconds a campaign's metric writes are collected for before its rollups are recomputed, kept
+# below ANALYTICS_INGEST_DEBOUNCE_SECONDS so that ingestion-triggered runs read fresh rollups
+ANALYTICS_ROLLUP_REFRESH_DEBOUNCE_SECONDS = env.int("ANALYTICS_ROLLUP_REFRESH_DEBOUNCE_SECONDS", default=5)
+# Analyze a campaign as soon as new daily metrics land for it, besides the hourly sweep
+ANALYTICS_INGEST_ANALYSIS = env.bool("ANALYTICS_INGEST_ANALYSIS", default=True)
+# Seconds metrics landing for a campaign are gathered for before its analysis runs
+ANALYTICS_INGEST_DEBOUNCE_SECONDS = env.int("ANALYTICS_INGEST_DEBOUNCE_SECONDS", default=30)
+# Cadence tiers of the hourly sweep, from the most expensive: campaigns whose expected daily spend
+# reaches min_daily_spend are analyzed every interval_hours hours on the tier's queue
+ANALYTICS_CADENCE_TIERS = [
+    {"name": "high_spend", "min_daily_spend": 250, "interval_hours": 1, "queue": "high_spend"},
+    {"name": "standard", "min_daily_spend": 50, "interval_hours": 3, "queue": "bulk"},
+    {"name": "low_spend", "min_daily_spend": 0, "interval_hours": 6, "queue": "bulk"},
+]
+# Days of recent spend the cadence tiers are assigned from
+ANALYTICS_TIER_SPEND_DAYS = env.int("ANALYTICS_TIER_SPEND_DAYS", default=7)
+# Profile every analysis run with cProfile and store the report on its AnalysisRun
+ANALYTICS_PROFILE_RUNS = env.bool("ANALYTICS_PROFILE_RUNS", default=False)
+# Let API requests ask for a profile with ?profile=1, logged together with their query counts
+ANALYTICS_PROFILE_VIEWS = env.bool("ANALYTICS_PROFILE_VIEWS", default=False)
+# Functions listed in a profile report, by cumulative time
+ANALYTICS_PROFILE_LINES = 40
+# Most queries an analysis task execution or an API request may run, whatever the number of campaigns or rows.
+# Analysis tasks saving their alerts in more than one checkpoint chunk get the few queries saving each further
+# chunk on top (CHECKPOINT_CHUNK_QUERIES in analytics.tasks).
+ANALYTICS_QUERY_BUDGETS = {
+    "analytics.tasks.analyze_campaign_performance": 40,
+    "analytics.tasks.analyze_campaign_shard": 40,
+    "analytics.tasks.retry_campaign_analysis": 40,
+    "analytics.views.AnalysisResultListView": 2,
+    "analytics.views.AnalysisResultDetailView": 2,
+}
+# Raise instead of logging a warning when a query budget is exceeded
+ANALYTICS_QUERY_BUDGET_STRICT = env.bool("ANALYTICS_QUERY_BUDGET_STRICT", default=False)
+# Campaigns of a platform raising the same anomaly on the same day that are collapsed into one incident
+ANALYTICS_INCIDENT_MIN_CAMPAIGNS = env.int("ANALYTICS_INCIDENT_MIN_CAMPAIGNS", default=3)
+# Recommendation requests an enrichment task keeps in flight to the LLM service at once
+ANALYTICS_LLM_CONCURRENCY = env.int("ANALYTICS_LLM_CONCURRENCY", default=8)
+# Retries of a recommendation request the LLM service rate limited (429)
+ANALYTICS_LLM_MAX_RETRIES = env.int("ANALYTICS_LLM_MAX_RETRIES", default=3)
+# Backoff before the first retry of a rate limited request without Retry-After, doubling with every retry
+ANALYTICS_LLM_RETRY_BACKOFF_SECONDS = env.float("ANALYTICS_LLM_RETRY_BACKOFF_SECONDS", default=1.0)
+# Ask for the recommendations of all of a campaign's new alerts in one prompt with a JSON response
+ANALYTICS_LLM_BATCHED_PROMPTS = env.bool("ANALYTICS_LLM_BATCHED_PROMPTS", default=True)
+# Estimated tokens a recommendation prompt may take before its metric data is compacted further or split
+ANALYTICS_LLM_PROMPT_TOKEN_BUDGET = env.int("ANALYTICS_LLM_PROMPT_TOKEN_BUDGET", default=800)
+# Response tokens allowed for each recommendation requested from the LLM service
+ANALYTICS_LLM_TOKENS_PER_RECOMMENDATION = env.int("ANALYTICS_LLM_TOKENS_PER_RECOMMENDATION", default=40)
+# Recommendation prompts one enrichment task sends
+ANALYTICS_ENRICHMENT_BATCH_SIZE = env.int("ANALYTICS_ENRICHMENT_BATCH_SIZE", default=100)
+# Reuse LLM recommendations for alerts whose anomaly fingerprint matches an earlier alert's
+ANALYTICS_RECOMMENDATION_CACHE = env.bool("ANALYTICS_RECOMMENDATION_CACHE", default=True)
+# Width of the change percentage buckets anomaly fingerprints round to
+ANALYTICS_RECOMMENDATION_CACHE_BUCKET_PERCENT = env.int("ANALYTICS_RECOMMENDATION_CACHE_BUCKET_PERCENT", default=10)
+# Seconds cached LLM recommendations are reused for
+ANALYTICS_RECOMMENDATION_CACHE_TTL_SECONDS = env.int(
+    "ANALYTICS_RECOMMENDATION_CACHE_TTL_SECONDS", default=7 * 24 * 3600,
+)
+# Most fingerprints kept in the recommendation cache, evicting the least recently used
+ANALYTICS_RECOMMENDATION_CACHE_MAX_ENTRIES = env.int("ANALYTICS_RECOMMENDATION_CACHE_MAX_ENTRIES", default=10000)
+# Port Celery workers serve their Prometheus metrics on (0 disables the exporter)
+ANALYTICS_METRICS_WORKER_PORT = env.int("ANALYTICS_METRICS_WORKER_PORT", default=9808)
 
 # STATIC
 # ------------------------------------------------------------------------------
@@ -14,3 +14,8 @@ SECRET_KEY = env(
 )
 # https://docs.djangoproject.com/en/dev/ref/settings/#test-runner
 TEST_RUNNER = "django.test.runner.DiscoverRunner"
+
+# ANALYTICS
+# ------------------------------------------------------------------------------
+# Exceeded query budgets fail tests instead of logging warnings
+ANALYTICS_QUERY_BUDGET_STRICT = True
@@ -6,6 +6,8 @@ from drf_spectacular.views import SpectacularSwaggerView
 from rest_framework.routers import DefaultRouter
 from rest_framework.routers import SimpleRouter
 
+from analytics.views import metrics
+
 router = DefaultRouter() if settings.DEBUG else SimpleRouter()
 
 urlpatterns = router.urls
@@ -21,6 +23,8 @@ urlpatterns = [
     ),
     # API urls
     path("analytics/", include("analytics.urls")),
+    # Prometheus metrics
+    path("metrics", metrics, name="metrics"),
     *urlpatterns,
 ]
 